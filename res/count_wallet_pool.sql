@@ -0,0 +1,2 @@
+SELECT COUNT(*)
+FROM wallet_pool
\ No newline at end of file
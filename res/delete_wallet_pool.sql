@@ -0,0 +1,2 @@
+DELETE FROM wallet_pool
+WHERE rowid = ?
\ No newline at end of file
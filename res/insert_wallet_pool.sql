@@ -0,0 +1,2 @@
+INSERT INTO wallet_pool (address, privkey)
+VALUES (?, ?)
\ No newline at end of file
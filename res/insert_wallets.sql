@@ -0,0 +1,2 @@
+INSERT OR IGNORE INTO wallets (user_id, address, privkey)
+VALUES (?, ?, ?)
\ No newline at end of file
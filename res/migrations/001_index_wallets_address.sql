@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS idx_wallets_address ON wallets (address)
\ No newline at end of file
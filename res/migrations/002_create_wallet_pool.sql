@@ -0,0 +1,5 @@
+CREATE TABLE IF NOT EXISTS wallet_pool (
+	address TEXT NOT NULL,
+	privkey TEXT NOT NULL,
+	date_time DATETIME DEFAULT CURRENT_TIMESTAMP
+)
\ No newline at end of file
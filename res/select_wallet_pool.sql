@@ -0,0 +1,4 @@
+SELECT rowid, address, privkey
+FROM wallet_pool
+ORDER BY rowid
+LIMIT ?
\ No newline at end of file
@@ -0,0 +1,3 @@
+SELECT user_id, privkey
+FROM wallets
+WHERE user_id IN ({{ids}})
\ No newline at end of file
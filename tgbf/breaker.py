@@ -0,0 +1,108 @@
+import time
+import logging
+import threading
+
+from typing import Dict
+
+
+class CircuitOpenError(ConnectionError):
+
+    def __init__(self, name: str, retry_in: float):
+        """ Raised instead of sending a request to an upstream that is down """
+
+        super().__init__(f"Service '{name}' is currently not available. "
+                         f"Please try again in {int(retry_in) + 1} seconds")
+
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, name: str, failure_threshold=5, reset_timeout=30):
+        """ Stops sending requests to an upstream after 'failure_threshold'
+        failures in a row. While the circuit is open, requests fail
+        immediately with 'CircuitOpenError'. After 'reset_timeout' seconds
+        a single request will be let through (half-open). If it succeeds,
+        the circuit is closed again, otherwise it opens again """
+
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = None
+        self.rejected = 0
+        self.last_error = None
+
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """ Raise 'CircuitOpenError' if no request should be sent now """
+
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+
+            retry_in = self.opened + self.reset_timeout - time.monotonic()
+
+            if self.state == self.OPEN and retry_in <= 0:
+                self.state = self.HALF_OPEN
+
+            # Only one trial request while half-open
+            if self.state == self.HALF_OPEN and not self._trial:
+                self._trial = True
+                return
+
+            self.rejected += 1
+
+        raise CircuitOpenError(self.name, max(retry_in, 0))
+
+    def success(self):
+        """ Record successful request """
+
+        with self._lock:
+            if self.state != self.CLOSED:
+                logging.warning(f"Circuit for '{self.name}' closed again")
+
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial = False
+
+    def failure(self, error: str = None):
+        """ Record failed request """
+
+        with self._lock:
+            self.failures += 1
+            self.last_error = error
+
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logging.warning(f"Circuit for '{self.name}' opened: {error}")
+
+                self.state = self.OPEN
+                self.opened = time.monotonic()
+                self._trial = False
+
+    def get_stats(self) -> Dict:
+        """ Return current state of the circuit """
+
+        with self._lock:
+            retry_in = None
+
+            if self.state != self.CLOSED:
+                retry_in = max(self.opened + self.reset_timeout - time.monotonic(), 0)
+
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "last_error": self.last_error,
+                "retry_in": retry_in
+            }
@@ -0,0 +1,251 @@
+import time
+import logging
+import threading
+
+from enum import IntEnum
+from typing import Dict
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from telegram import Bot
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+
+class Priority(IntEnum):
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+class TokenBucket:
+
+    def __init__(self, rate: float, capacity: float = None):
+        """ Allows 'rate' actions per second with bursts of up to 'capacity' """
+
+        self.rate = rate
+        self.capacity = capacity if capacity else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def wait_time(self, now: float) -> float:
+        """ Return seconds until the next action is allowed """
+
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        """ Use up one action """
+        self.tokens -= 1
+
+
+class Delivery:
+
+    def __init__(self, chat_id: int, text: str, priority: Priority, kwargs: Dict):
+        """ Message that is waiting to be sent """
+
+        self.chat_id = chat_id
+        self.text = text
+        self.priority = priority
+        self.kwargs = kwargs
+        self.attempts = 0
+        self.not_before = 0.0
+        self.future = Future()
+
+
+class Broadcaster(threading.Thread):
+
+    def __init__(self, bot: Bot, rate=30, chat_rate=1, group_rate=0.33, workers=4, max_retries=3):
+        """ Queue for outgoing messages that respects the rate limits of
+        Telegram: 'rate' messages per second overall, 'chat_rate' messages
+        per second to a single user and 'group_rate' messages per second to
+        a single group. Messages with higher priority are sent first.
+
+        If Telegram answers with 'RetryAfter', sending is paused for the
+        given time. Messages that failed because of that or because of
+        network errors will be sent again up to 'max_retries' times.
+
+        'send()' returns a future with the sent message. If the message
+        couldn't be delivered, the future holds the exception """
+
+        threading.Thread.__init__(self, name="Broadcaster", daemon=True)
+
+        self.bot = bot
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+
+        self._lanes = {priority: deque() for priority in Priority}
+        self._global = TokenBucket(rate)
+        # Chat ID -> TokenBucket
+        self._chats: Dict[int, TokenBucket] = dict()
+        self._paused_until = 0.0
+
+        self._cond = threading.Condition()
+        self._halt = threading.Event()
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Broadcast")
+
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.rate_limited = 0
+
+    def send(self, chat_id: int, text: str, priority: Priority = Priority.NORMAL, **kwargs) -> Future:
+        """ Add message to the queue and return a future with the result.
+        Keyword arguments are passed on to 'send_message' """
+
+        delivery = Delivery(chat_id, text, priority, kwargs)
+
+        with self._cond:
+            self._lanes[priority].append(delivery)
+
+            if self.ident is None and not self._halt.is_set():
+                self.start()
+
+            self._cond.notify()
+
+        return delivery.future
+
+    def run(self) -> None:
+        """ Send queued messages as fast as the rate limits allow """
+
+        while not self._halt.is_set():
+            with self._cond:
+                delivery, wait = self._next()
+
+                if delivery is None:
+                    self._cond.wait(wait)
+                    continue
+
+            try:
+                self._executor.submit(self._deliver, delivery)
+            except RuntimeError:
+                # Executor is shut down
+                delivery.future.cancel()
+
+    def stop(self):
+        """ Stop sending. Queued messages will be cancelled """
+
+        self._halt.set()
+
+        with self._cond:
+            for lane in self._lanes.values():
+                for delivery in lane:
+                    delivery.future.cancel()
+                lane.clear()
+
+            self._cond.notify()
+
+        self._executor.shutdown(wait=False)
+
+    def get_stats(self) -> Dict:
+        """ Return number of queued, sent and failed messages """
+
+        with self._cond:
+            return {
+                "queued": {p.name.lower(): len(lane) for p, lane in self._lanes.items()},
+                "sent": self.sent,
+                "failed": self.failed,
+                "retried": self.retried,
+                "rate_limited": self.rate_limited,
+                "paused": max(self._paused_until - time.monotonic(), 0)
+            }
+
+    def _next(self):
+        """ Return (message that can be sent now, None) or (None, seconds
+        to wait). Wait time is None if there are no messages. Needs lock """
+
+        now = time.monotonic()
+
+        if now < self._paused_until:
+            return None, self._paused_until - now
+
+        wait = self._global.wait_time(now)
+
+        if wait:
+            return None, wait
+
+        wait = None
+
+        for lane in self._lanes.values():
+            for delivery in lane:
+                bucket = self._get_bucket(delivery.chat_id)
+
+                if now < delivery.not_before:
+                    delivery_wait = delivery.not_before - now
+                else:
+                    delivery_wait = bucket.wait_time(now)
+
+                if not delivery_wait:
+                    lane.remove(delivery)
+                    self._global.take()
+                    bucket.take()
+                    return delivery, None
+
+                wait = delivery_wait if wait is None else min(wait, delivery_wait)
+
+        self._prune(now)
+        return None, wait
+
+    def _get_bucket(self, chat_id: int) -> TokenBucket:
+        """ Return rate limit of given chat. Group IDs are negative """
+
+        if chat_id not in self._chats:
+            rate = self.group_rate if int(chat_id) < 0 else self.chat_rate
+            self._chats[chat_id] = TokenBucket(rate, capacity=1)
+        return self._chats[chat_id]
+
+    def _prune(self, now: float):
+        """ Remove rate limits of chats that could send again anyway """
+
+        if len(self._chats) > 1000:
+            self._chats = {i: b for i, b in self._chats.items() if b.wait_time(now)}
+
+    def _deliver(self, delivery: Delivery):
+        """ Send message and set its result """
+
+        delivery.attempts += 1
+
+        try:
+            message = self.bot.send_message(delivery.chat_id, delivery.text, **delivery.kwargs)
+        except RetryAfter as e:
+            logging.warning(f"Rate limited by Telegram for {e.retry_after} seconds")
+
+            with self._cond:
+                self.rate_limited += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+
+            self._retry(delivery, e, 0)
+        except BadRequest as e:
+            self._fail(delivery, e)
+        except NetworkError as e:
+            self._retry(delivery, e, 2 ** delivery.attempts)
+        except Exception as e:
+            self._fail(delivery, e)
+        else:
+            with self._cond:
+                self.sent += 1
+            delivery.future.set_result(message)
+
+    def _retry(self, delivery: Delivery, error: Exception, delay: float):
+        """ Queue message again or fail if it was sent too often """
+
+        if delivery.attempts > self.max_retries:
+            self._fail(delivery, error)
+            return
+
+        with self._cond:
+            self.retried += 1
+            delivery.not_before = time.monotonic() + delay
+            self._lanes[delivery.priority].appendleft(delivery)
+            self._cond.notify()
+
+    def _fail(self, delivery: Delivery, error: Exception):
+        """ Set error as result of message """
+
+        with self._cond:
+            self.failed += 1
+
+        logging.warning(f"Message to {delivery.chat_id} could not be sent: {error}")
+        delivery.future.set_exception(error)
@@ -0,0 +1,54 @@
+import threading
+
+from collections import OrderedDict
+
+
+class LRUCache:
+
+    def __init__(self, max_size=1000):
+        """ Thread-safe dictionary that holds at most 'max_size'
+        entries. If it's full, the least recently used entry
+        will be removed to make room for a new one """
+
+        self.max_size = max_size
+
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """ Return cached value for given key """
+
+        with self._lock:
+            if key not in self._data:
+                return default
+
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        """ Save value for given key """
+
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def remove(self, key):
+        """ Remove cached value for given key """
+
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """ Remove all cached values """
+
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
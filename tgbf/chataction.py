@@ -0,0 +1,108 @@
+import time
+import logging
+import threading
+
+from typing import Dict, Tuple
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from telegram import Bot, ChatAction
+
+
+class ChatActions(threading.Thread):
+
+    def __init__(self, interval=4, workers=2):
+        """ Sends chat actions (like 'typing...') in the background so that
+        handlers don't have to wait for Telegram. An action is sent at most
+        once every 'interval' seconds per chat. Telegram shows it for five
+        seconds, so it stays visible without sending it for every command.
+
+        Actions of chats that are registered with 'typing()' will be sent
+        again every 'interval' seconds until the handler is done """
+
+        threading.Thread.__init__(self, name="ChatActions", daemon=True)
+
+        self.interval = interval
+
+        # (chat ID, action) -> time action was sent
+        self._sent: Dict[Tuple[int, str], float] = dict()
+        # Chat ID -> (bot, number of running handlers)
+        self._active: Dict[int, Tuple[Bot, int]] = dict()
+
+        self._lock = threading.Lock()
+        self._halt = threading.Event()
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ChatAction")
+
+    def send(self, bot: Bot, chat_id: int, action: str = ChatAction.TYPING):
+        """ Send chat action in the background unless it was sent recently """
+
+        now = time.monotonic()
+
+        with self._lock:
+            if now - self._sent.get((chat_id, action), 0) < self.interval:
+                return
+
+            self._sent[(chat_id, action)] = now
+
+        try:
+            self._executor.submit(self._send, bot, chat_id, action)
+        except RuntimeError:
+            # Executor is shut down
+            pass
+
+    @contextmanager
+    def typing(self, bot: Bot, chat_id: int):
+        """ Show 'typing...' in the given chat while the block is executed """
+
+        with self._lock:
+            _, count = self._active.get(chat_id, (bot, 0))
+            self._active[chat_id] = (bot, count + 1)
+
+            if self.ident is None and not self._halt.is_set():
+                self.start()
+
+        self.send(bot, chat_id)
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                _, count = self._active[chat_id]
+
+                if count > 1:
+                    self._active[chat_id] = (bot, count - 1)
+                else:
+                    del self._active[chat_id]
+
+    def run(self) -> None:
+        """ Refresh actions of chats with running handlers """
+
+        while not self._halt.wait(1):
+            with self._lock:
+                active = [(chat_id, bot) for chat_id, (bot, _) in self._active.items()]
+
+                # Forget actions that aren't visible anymore
+                now = time.monotonic()
+                self._sent = {k: t for k, t in self._sent.items() if now - t < self.interval}
+
+            for chat_id, bot in active:
+                self.send(bot, chat_id)
+
+    def stop(self):
+        """ Stop sending chat actions """
+
+        self._halt.set()
+        self._executor.shutdown(wait=False)
+
+    @staticmethod
+    def _send(bot: Bot, chat_id: int, action: str):
+        """ Send chat action and ignore errors """
+
+        try:
+            bot.send_chat_action(chat_id=chat_id, action=action)
+        except Exception as e:
+            logging.debug(f"Can't send chat action to {chat_id}: {e}")
+
+
+# Shared by all plugins
+actions = ChatActions()
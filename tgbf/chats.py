@@ -0,0 +1,105 @@
+import time
+import threading
+
+from typing import Dict
+from telegram import Bot, Chat
+from tgbf.cache import LRUCache
+
+
+class ChatInfo:
+
+    def __init__(self, chat_id: int, chat_type: str, title: str = None):
+        """ Cached metadata of a Telegram chat """
+
+        self.id = chat_id
+        self.type = chat_type
+        self.title = title
+        self.member_count = None
+        self.updated = time.monotonic()
+        self.counted = None
+
+    @property
+    def private(self) -> bool:
+        """ Return TRUE if this is a private chat with the bot """
+        return self.type == Chat.PRIVATE
+
+
+class ChatCache:
+
+    def __init__(self, ttl=3600, max_size=10000):
+        """ Chat type, title and member count of known chats. Chats are
+        added and refreshed from incoming updates, so that no request to
+        Telegram is needed to find out if a chat is private. Chats that
+        are unknown or weren't updated for 'ttl' seconds will be
+        retrieved from Telegram """
+
+        self.ttl = ttl
+
+        # Chat ID -> ChatInfo
+        self._chats = LRUCache(max_size)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def update(self, chat: Chat):
+        """ Add or refresh chat from a Telegram chat object """
+
+        if not chat or not chat.type:
+            return
+
+        info = self._chats.get(chat.id)
+
+        if info and info.type == chat.type:
+            info.title = chat.title
+            info.updated = time.monotonic()
+        else:
+            self._chats.set(chat.id, ChatInfo(chat.id, chat.type, chat.title))
+
+    def get(self, chat_id: int, bot: Bot) -> ChatInfo:
+        """ Return info for given chat. Retrieve it if it's unknown or too old """
+
+        info = self._chats.get(chat_id)
+
+        if info and time.monotonic() - info.updated < self.ttl:
+            with self._lock:
+                self.hits += 1
+            return info
+
+        with self._lock:
+            self.misses += 1
+
+        self.update(bot.get_chat(chat_id))
+        return self._chats.get(chat_id)
+
+    def is_private(self, chat_id: int, bot: Bot) -> bool:
+        """ Return TRUE if given chat is a private chat with the bot """
+        return self.get(chat_id, bot).private
+
+    def get_member_count(self, chat_id: int, bot: Bot) -> int:
+        """ Return number of members of given chat """
+
+        info = self.get(chat_id, bot)
+
+        if info.counted is None or time.monotonic() - info.counted >= self.ttl:
+            info.member_count = bot.get_chat_member_count(chat_id)
+            info.counted = time.monotonic()
+
+        return info.member_count
+
+    def remove(self, chat_id: int):
+        """ Forget given chat (for example if its ID changed) """
+        self._chats.remove(chat_id)
+
+    def get_stats(self) -> Dict:
+        """ Return number of known chats and hit rate """
+
+        with self._lock:
+            requests = self.hits + self.misses
+
+            return {
+                "chats": len(self._chats),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0
+            }
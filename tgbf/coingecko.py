@@ -0,0 +1,190 @@
+import time
+import logging
+import threading
+
+from typing import Callable, Dict
+from pycoingecko import CoinGeckoAPI
+from tgbf.sessions import get_session
+from tgbf.singleflight import flights
+
+
+_api = None
+_api_lock = threading.Lock()
+
+
+def get_api() -> CoinGeckoAPI:
+    """ Return shared CoinGecko client that uses the pooled
+    session for the CoinGecko host instead of its own one
+    and coalesces identical requests """
+
+    global _api
+
+    with _api_lock:
+        if _api is None:
+            api = CoinGeckoAPI()
+            api.session = get_session(api.api_base_url)
+            api.request_timeout = api.session.timeout
+
+            # Identical requests that are sent at the same time share one request
+            request = api._CoinGeckoAPI__request
+            api._CoinGeckoAPI__request = lambda *args: flights.do(("coingecko", repr(args)), request, *args)
+
+            _api = api
+
+        return _api
+
+
+class CacheEntry:
+
+    def __init__(self, fetch: Callable, ttl: float):
+        """ Cached CoinGecko response and the function to refresh it """
+
+        self.fetch = fetch
+        self.ttl = ttl
+        self.value = None
+        self.updated = None
+        self.accessed = time.monotonic()
+        self.lock = threading.Lock()
+
+    @property
+    def age(self):
+        """ Seconds since the value was retrieved or None """
+        return time.monotonic() - self.updated if self.updated is not None else None
+
+    @property
+    def fresh(self) -> bool:
+        """ Return TRUE if the value is younger than its TTL """
+        return self.updated is not None and self.age < self.ttl
+
+
+class MarketData:
+
+    def __init__(self, coin_ttl=60, chart_ttl=300, idle_timeout=3600):
+        """ Shared cache for CoinGecko market data. Coin documents are kept
+        for 'coin_ttl' and market charts for 'chart_ttl' seconds. 'refresh()'
+        renews expired entries in the background so that users get data
+        from memory. Entries that weren't requested for 'idle_timeout'
+        seconds will be removed instead.
+
+        If CoinGecko can't be reached (for example if we are rate limited)
+        the last retrieved data will be returned, no matter how old it is """
+
+        self.coin_ttl = coin_ttl
+        self.chart_ttl = chart_ttl
+        self.idle_timeout = idle_timeout
+
+        # Cache key -> CacheEntry
+        self._entries: Dict[tuple, CacheEntry] = dict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.errors = 0
+
+    def get_coin(self, coin_id: str) -> Dict:
+        """ Return coin document (name, market data, tickers, ...) """
+
+        def fetch():
+            return get_api().get_coin_by_id(
+                coin_id,
+                localization="false",
+                community_data="false",
+                developer_data="false",
+                sparkline="false")
+
+        return self._get(("coin", coin_id), fetch, self.coin_ttl)
+
+    def get_market_chart(self, coin_id: str, vs_currency: str, days) -> Dict:
+        """ Return historical prices, market caps and volumes """
+
+        def fetch():
+            return get_api().get_coin_market_chart_by_id(coin_id, vs_currency, days)
+
+        return self._get(("chart", coin_id, vs_currency, str(days)), fetch, self.chart_ttl)
+
+    def refresh(self):
+        """ Renew expired entries and remove entries that weren't used """
+
+        now = time.monotonic()
+
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if now - entry.accessed > self.idle_timeout:
+                    del self._entries[key]
+
+            expired = [(k, e) for k, e in self._entries.items() if not e.fresh]
+
+        for key, entry in expired:
+            try:
+                self._update(entry)
+            except Exception as e:
+                logging.warning(f"Can't refresh CoinGecko data {key}: {e}")
+
+    def get_stats(self) -> Dict:
+        """ Return hit rate and age of all cached entries """
+
+        with self._lock:
+            requests = self.hits + self.misses
+
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "errors": self.errors,
+                "hit_rate": self.hits / requests if requests else 0,
+                "entries": {"/".join(k): e.age for k, e in self._entries.items()}
+            }
+
+    def _get(self, key: tuple, fetch: Callable, ttl: float):
+        """ Return cached value for given key or retrieve it """
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                entry = CacheEntry(fetch, ttl)
+                self._entries[key] = entry
+
+            entry.accessed = time.monotonic()
+
+            if entry.fresh:
+                self.hits += 1
+                return entry.value
+
+            self.misses += 1
+
+        try:
+            return self._update(entry)
+        except Exception:
+            if entry.updated is None:
+                raise
+
+            with self._lock:
+                self.stale += 1
+
+            logging.warning(f"Serving CoinGecko data {key} that is {int(entry.age)} seconds old")
+            return entry.value
+
+    def _update(self, entry: CacheEntry):
+        """ Retrieve new value for given entry. If another thread
+        is already doing that, wait for it and use its value """
+
+        with entry.lock:
+            if entry.fresh:
+                return entry.value
+
+            try:
+                value = entry.fetch()
+            except Exception:
+                with self._lock:
+                    self.errors += 1
+                raise
+
+            entry.value = value
+            entry.updated = time.monotonic()
+            return value
+
+
+# Shared by all plugins
+market = MarketData()
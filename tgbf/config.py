@@ -2,23 +2,107 @@ import os
 import json
 import logging
 
-from threading import Thread
-from watchgod import watch, Change
+from threading import Thread, Event, Lock, RLock
 from collections.abc import Callable
 
 
-class ConfigManager(Thread):
+class ConfigWatcher(Thread):
 
-    # JSON content
-    _cfg = dict()
-    # Config file path
-    _cfg_file = None
-    # Function to trigger on changes
-    _callback = None
-    # Pass changed key & value args to callback?
-    _callback_pass_args = False
-    # Ignore reloading config?
-    _ignore = False
+    def __init__(self, interval=1):
+        """ Single thread that watches all configuration files for
+        changes. Files are checked every 'interval' seconds for a new
+        modification time and the registered callback for a changed
+        file will be executed in this thread """
+
+        Thread.__init__(self, name="ConfigWatcher", daemon=True)
+
+        self.interval = interval
+
+        # File path -> [modification time, callback]
+        self._files = dict()
+
+        self._lock = Lock()
+        self._halt = Event()
+
+    def watch(self, file_path, callback: Callable):
+        """ Start watching given file. The callback will be executed
+        without arguments if the file got modified """
+
+        with self._lock:
+            self._files[file_path] = [self._get_mtime(file_path), callback]
+
+        if not self.is_alive() and not self._halt.is_set():
+            self.start()
+
+    def unwatch(self, file_path):
+        """ Stop watching given file """
+
+        with self._lock:
+            self._files.pop(file_path, None)
+
+    def refresh(self, file_path):
+        """ Remember current modification time of given file so that
+        changes that we did ourselves will not trigger the callback """
+
+        with self._lock:
+            if file_path in self._files:
+                self._files[file_path][0] = self._get_mtime(file_path)
+
+    def run(self) -> None:
+        """ Check all watched files for changes """
+
+        while not self._halt.wait(self.interval):
+            changed = list()
+
+            with self._lock:
+                for file_path, entry in self._files.items():
+                    mtime = self._get_mtime(file_path)
+
+                    if mtime != entry[0]:
+                        entry[0] = mtime
+                        changed.append(entry[1])
+
+            for callback in changed:
+                try:
+                    callback()
+                except Exception as e:
+                    logging.error(f"Config change callback failed: {repr(e)}")
+
+    def stop(self):
+        """ Stop watching files """
+        self._halt.set()
+
+    @staticmethod
+    def _get_mtime(file_path):
+        """ Return modification time of given file or None if it doesn't exist """
+        try:
+            return os.stat(file_path).st_mtime_ns
+        except OSError:
+            return None
+
+
+class ConfigManager:
+
+    # Watcher for all config files
+    _watcher = ConfigWatcher()
+
+    # Config file path -> ConfigManager
+    _instances = dict()
+    _instances_lock = Lock()
+
+    def __new__(cls, config_file, *args, **kwargs):
+        """ Return the existing instance for the given config file
+        or create a new one if there is none yet """
+
+        path = os.path.abspath(config_file) if config_file else None
+
+        with cls._instances_lock:
+            if path not in cls._instances:
+                instance = super().__new__(cls)
+                instance._initialized = False
+                cls._instances[path] = instance
+
+            return cls._instances[path]
 
     def __init__(self, config_file, callback: Callable = None, callback_pass_args=True):
         """ This class takes a JSON config file and makes it available
@@ -26,13 +110,17 @@ class ConfigManager(Thread):
          Values can also bet set or removed from the config. Setting
          and removing values will be written to the initial config file.
 
+         There is only one instance per config file. Creating another
+         ConfigManager for the same file will return the existing one
+         and add the provided callback to it.
+
          The config file will automatically be watched for changes
-         and re-read if something changes.
+         and re-read if something changes. All config files are
+         watched by the same thread.
 
          You can provide a callback function that will be triggered
          if the content of the config changes. The callback function
-         runs in it's own thread and will get following arguments if
-         callback_pass_args=True:
+         will get following arguments if callback_pass_args=True:
 
          config file content changes -> callback(self._cfg, None, None)
          new value set for key -> callback(self._cfg, value, *keys)
@@ -42,48 +130,69 @@ class ConfigManager(Thread):
          called without passing arguments.
          """
 
-        Thread.__init__(self)
+        with self._instances_lock:
+            if not self._initialized:
+                # JSON content
+                self._cfg = dict()
+                # Config file path
+                self._cfg_file = config_file
+                # Functions to trigger on changes and if
+                # changed key & value should be passed
+                self._callbacks = list()
+                # Lock for reading and writing the config
+                self._lock = RLock()
+
+                if config_file:
+                    self._watcher.watch(os.path.abspath(config_file), self.on_modified)
+                else:
+                    logging.error("ERROR: No config file provided")
 
-        if config_file:
-            self._cfg_file = config_file
-        else:
-            logging.error("ERROR: No config file provided")
+                self._initialized = True
 
-        self._callback = callback
-        self._callback_pass_args = callback_pass_args
+        self.add_callback(callback, callback_pass_args)
 
-        self.start()
+    def add_callback(self, callback: Callable, pass_args=True):
+        """ Add function that will be triggered on changes """
 
-    def run(self) -> None:
-        """ Watch for config file changes """
+        if callable(callback):
+            with self._lock:
+                if not any(cb == callback for cb, _ in self._callbacks):
+                    self._callbacks.append((callback, pass_args))
+
+    def remove_callback(self, callback: Callable):
+        """ Remove function that was triggered on changes """
 
-        for change in watch(self._cfg_file):
-            for status, location in change:
-                if status == Change.modified and location == self._cfg_file:
-                    self.on_modified()
+        with self._lock:
+            self._callbacks = [(cb, p) for cb, p in self._callbacks if cb != callback]
 
     def on_modified(self):
         """ Will be triggered if the config file has been changed manually.
-         Will also execute the callback method if there is one """
+         Will also execute the callback methods if there are any """
 
-        if self._ignore:
-            self._ignore = False
-        else:
-            self._read_cfg()
+        self._read_cfg()
+        self._execute_callbacks(None, None)
+
+    def _execute_callbacks(self, value, *keys):
+        """ Execute all callback methods """
 
-            if callable(self._callback):
-                if self._callback_pass_args:
-                    Thread(target=self._callback(self._cfg, None, None)).start()
+        for callback, pass_args in list(self._callbacks):
+            try:
+                if pass_args:
+                    callback(self._cfg, value, *keys)
                 else:
-                    Thread(target=self._callback()).start()
+                    callback()
+            except Exception as e:
+                err = f"Callback for '{self._cfg_file}' failed"
+                logging.error(f"{repr(e)} - {err}")
 
     def _read_cfg(self):
         """ Read the JSON content of a given configuration file """
 
         try:
             if os.path.isfile(self._cfg_file):
-                with open(self._cfg_file) as config_file:
-                    self._cfg = json.load(config_file)
+                with self._lock:
+                    with open(self._cfg_file) as config_file:
+                        self._cfg = json.load(config_file)
         except Exception as e:
             err = f"Can't read '{self._cfg_file}'"
             logging.error(f"{repr(e)} - {err}")
@@ -96,6 +205,9 @@ class ConfigManager(Thread):
                 os.makedirs(os.path.dirname(self._cfg_file))
             with open(self._cfg_file, "w") as config_file:
                 json.dump(self._cfg, config_file, indent=4)
+
+            # Don't trigger watcher for own changes
+            self._watcher.refresh(os.path.abspath(self._cfg_file))
         except Exception as e:
             err = f"Can't write '{self._cfg_file}'"
             logging.error(f"{repr(e)} - {err}")
@@ -123,7 +235,7 @@ class ConfigManager(Thread):
 
     def set(self, value, *keys):
         """ Set a new value for the given key(s) in the configuration file.
-        Will also execute the callback method if there is one """
+        Will also execute the callback methods if there are any """
 
         if not self._cfg:
             self._read_cfg()
@@ -131,28 +243,24 @@ class ConfigManager(Thread):
         if not keys:
             return
 
-        tmp_cfg = self._cfg
-
         try:
-            for key in keys[:-1]:
-                tmp_cfg = tmp_cfg.setdefault(key, {})
-            tmp_cfg[keys[-1]] = value
+            with self._lock:
+                tmp_cfg = self._cfg
 
-            self._ignore = True
-            self._write_cfg()
+                for key in keys[:-1]:
+                    tmp_cfg = tmp_cfg.setdefault(key, {})
+                tmp_cfg[keys[-1]] = value
 
-            if callable(self._callback):
-                if self._callback_pass_args:
-                    Thread(target=self._callback(self._cfg, value, *keys)).start()
-                else:
-                    Thread(target=self._callback()).start()
+                self._write_cfg()
+
+            self._execute_callbacks(value, *keys)
         except Exception as e:
             err = f"Can't set '{keys}' in '{self._cfg_file}'"
             logging.debug(f"{repr(e)} - {err}")
 
     def remove(self, *keys):
         """ Remove given key(s) from the configuration file.
-        Will also execute the callback method if there is one """
+        Will also execute the callback methods if there are any """
 
         if not self._cfg:
             self._read_cfg()
@@ -160,21 +268,22 @@ class ConfigManager(Thread):
         if not keys:
             return
 
-        tmp_cfg = self._cfg
-
         try:
-            for key in keys[:-1]:
-                tmp_cfg = tmp_cfg.setdefault(key, {})
-            del tmp_cfg[keys[-1]]
+            with self._lock:
+                tmp_cfg = self._cfg
 
-            self._ignore = True
-            self._write_cfg()
+                for key in keys[:-1]:
+                    tmp_cfg = tmp_cfg.setdefault(key, {})
+                del tmp_cfg[keys[-1]]
 
-            if callable(self._callback):
-                if self._callback_pass_args:
-                    Thread(target=self._callback(self._cfg, None, *keys)).start()
-                else:
-                    Thread(target=self._callback()).start()
+                self._write_cfg()
+
+            self._execute_callbacks(None, *keys)
         except KeyError as e:
             err = f"Can't remove key '{keys}' from '{self._cfg_file}'"
             logging.debug(f"{repr(e)} - {err}")
+
+    @classmethod
+    def stop_watching(cls):
+        """ Stop watching all config files for changes """
+        cls._watcher.stop()
@@ -11,6 +11,7 @@ DIR_CFG = "cfg"
 DIR_LOG = "log"
 DIR_DAT = "dat"
 DIR_TMP = "tmp"
+DIR_MIG = "migrations"
 
 # Project files
 FILE_DAT = "global.db"
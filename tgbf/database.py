@@ -0,0 +1,498 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+from typing import Dict, List, Tuple
+from contextlib import contextmanager
+from tgbf.config import ConfigManager
+
+
+class Database:
+
+    # Statements that don't need a commit afterwards
+    READ_ONLY = ("SELECT",)
+
+    # Value of 'PRAGMA auto_vacuum' for incremental mode
+    AUTO_VACUUM_INCREMENTAL = 2
+
+    # Table to keep track of applied migrations
+    CREATE_MIGRATIONS = """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER NOT NULL PRIMARY KEY,
+            name TEXT NOT NULL,
+            date_time DATETIME DEFAULT CURRENT_TIMESTAMP
+        )"""
+
+    def __init__(self, db_path, timeout=5, pragmas: Dict = None):
+        """ Pool of long-lived SQLite connections for a single database
+        file. Every thread gets its own connection (SQLite connections
+        shouldn't be shared between threads) that stays open until the
+        thread ends or the pool gets closed.
+
+        The given pragmas (for example 'journal_mode', 'synchronous'
+        or 'cache_size') will be set on every new connection """
+
+        self.db_path = db_path
+        self.timeout = timeout
+        self.pragmas = pragmas if pragmas else dict()
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections = dict()
+
+        # Create directory if it doesn't exist
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def connection(self) -> sqlite3.Connection:
+        """ Return the connection that belongs to the current thread.
+        If there is none yet then it will be created """
+
+        con = getattr(self._local, "con", None)
+
+        if con is None:
+            con = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+
+            for pragma, value in self.pragmas.items():
+                con.execute(f"PRAGMA {pragma} = {value}")
+
+            self._local.con = con
+
+            with self._lock:
+                # Idents of ended threads get reused. Close their connections first
+                self._close_orphans()
+                self._connections[threading.get_ident()] = (threading.current_thread(), con)
+
+            logging.debug(f"New connection to '{self.db_path}'")
+
+        return con
+
+    def execute(self, sql, *args):
+        """ Execute SQL statement and return all resulting rows.
+        Read-only statements will not be committed """
+
+        con = self.connection()
+        cur = con.cursor()
+
+        try:
+            cur.execute(sql, args)
+            data = cur.fetchall()
+
+            if not self.is_read_only(sql):
+                con.commit()
+
+            return data
+        except Exception:
+            con.rollback()
+            raise
+        finally:
+            cur.close()
+
+    @contextmanager
+    def transaction(self):
+        """ Context manager that returns the connection of the current
+        thread inside a transaction that already holds the write lock.
+        It will be committed on success and rolled back on errors """
+
+        con = self.connection()
+        con.execute("BEGIN IMMEDIATE")
+
+        try:
+            yield con
+            con.commit()
+        except Exception:
+            con.rollback()
+            raise
+
+    def execute_many(self, sql, rows: List):
+        """ Execute SQL statement once for every list of arguments
+        in 'rows' in one transaction. Return number of changed rows """
+
+        con = self.connection()
+
+        try:
+            cur = con.executemany(sql, rows)
+            con.commit()
+            return cur.rowcount
+        except Exception:
+            con.rollback()
+            raise
+
+    def execute_batch(self, batch: Dict[str, List]):
+        """ Execute every SQL statement in the given dictionary with
+        all its lists of arguments in one single transaction """
+
+        con = self.connection()
+
+        try:
+            for sql, rows in batch.items():
+                con.executemany(sql, rows)
+            con.commit()
+        except Exception:
+            con.rollback()
+            raise
+
+    def migrate(self, migrations: List[Tuple[int, str, str]]):
+        """ Apply all migrations (tuples of version, name and SQL
+        script) that weren't already applied. Every migration runs
+        in its own transaction and applied versions are saved in
+        table 'schema_migrations'. Return list of applied versions """
+
+        con = self.connection()
+        con.execute(self.CREATE_MIGRATIONS)
+        con.commit()
+
+        applied = {row[0] for row in con.execute("SELECT version FROM schema_migrations")}
+        new_versions = list()
+
+        for version, name, script in sorted(migrations):
+            if version in applied:
+                continue
+
+            try:
+                con.executescript(f"BEGIN;\n{script}\n;")
+                con.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES (?, ?)",
+                    (version, name))
+                con.commit()
+            except Exception:
+                con.rollback()
+                raise
+
+            new_versions.append(version)
+            logging.info(f"Migration '{name}' applied to '{self.db_path}'")
+
+        return new_versions
+
+    def delete_before(self, table, column, cutoff, batch_size=1000, rollup=None):
+        """ Delete all rows of the given table where the value of the
+        given column is lower than 'cutoff'. Rows will be deleted in
+        batches of around 'batch_size' rows, each in its own short
+        transaction so that other writers don't have to wait long.
+
+        If a rollup statement is provided, it will be executed in the
+        same transaction before each batch gets deleted. It gets the
+        upper bound of the batch as only argument and needs to include
+        all rows where the column value is lower than that argument.
+        Return number of deleted rows """
+
+        deleted = 0
+
+        while True:
+            res = self.execute(
+                f"SELECT {column} FROM {table} WHERE {column} < ? "
+                f"ORDER BY {column} LIMIT 1 OFFSET ?", cutoff, batch_size)
+
+            upper = res[0][0] if res else cutoff
+
+            # Make sure that every batch deletes something even
+            # if a lot of rows share the same column value
+            if upper != cutoff:
+                lowest = self.execute(f"SELECT MIN({column}) FROM {table}")[0][0]
+
+                if upper == lowest:
+                    res = self.execute(
+                        f"SELECT MIN({column}) FROM {table} "
+                        f"WHERE {column} > ? AND {column} < ?", lowest, cutoff)
+
+                    upper = res[0][0] if res[0][0] is not None else cutoff
+
+            con = self.connection()
+
+            try:
+                if rollup:
+                    con.execute(rollup, (upper,))
+                cur = con.execute(f"DELETE FROM {table} WHERE {column} < ?", (upper,))
+                con.commit()
+            except Exception:
+                con.rollback()
+                raise
+
+            deleted += cur.rowcount
+
+            if upper == cutoff:
+                return deleted
+
+            # Give other connections the chance to write
+            time.sleep(0.05)
+
+    def optimize(self, vacuum_pages=1000, convert=False):
+        """ Update statistics for the query planner and release up to
+        'vacuum_pages' unused pages if the database uses incremental
+        auto-vacuum. Databases that were created without it will only be
+        converted if 'convert' is TRUE. That needs a full VACUUM which
+        locks the database until it's done """
+
+        con = self.connection()
+
+        con.execute("PRAGMA analysis_limit = 1000")
+        con.execute("ANALYZE")
+        con.commit()
+
+        if con.execute("PRAGMA auto_vacuum").fetchone()[0] != self.AUTO_VACUUM_INCREMENTAL:
+            if convert:
+                logging.info(f"Converting '{self.db_path}' to incremental auto-vacuum")
+                con.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                con.execute("VACUUM")
+        elif vacuum_pages:
+            con.execute(f"PRAGMA incremental_vacuum({int(vacuum_pages)})").fetchall()
+            con.commit()
+
+    def close(self):
+        """ Close all connections of this pool """
+
+        with self._lock:
+            for _, con in self._connections.values():
+                try:
+                    con.close()
+                except Exception as e:
+                    logging.error(f"Can't close connection to '{self.db_path}': {e}")
+
+            self._connections.clear()
+
+        self._local = threading.local()
+
+    def _close_orphans(self):
+        """ Close connections of threads that don't exist anymore.
+        Needs to be called while holding the lock """
+
+        for ident, (thread, con) in list(self._connections.items()):
+            if not thread.is_alive():
+                con.close()
+                del self._connections[ident]
+
+    @classmethod
+    def is_read_only(cls, sql: str):
+        """ Return TRUE if given SQL statement doesn't modify data """
+        words = sql.lstrip().split(None, 1)
+        return bool(words) and words[0].upper() in cls.READ_ONLY
+
+
+class WriteBuffer(threading.Thread):
+
+    def __init__(self, max_rows=500, interval=5, max_retries=3):
+        """ Buffer for SQL statements that don't need to be executed
+        immediately. Statements are grouped per database and written
+        with 'executemany' in one transaction as soon as 'max_rows'
+        statements are pending or 'interval' seconds passed.
+
+        If a batch fails, its statements are executed one by one so that
+        only the failing ones get dropped. Statements that failed because
+        the database was locked will be tried again with the next flush,
+        up to 'max_retries' times """
+
+        threading.Thread.__init__(self, name="WriteBuffer", daemon=True)
+
+        self.max_rows = max_rows
+        self.interval = interval
+        self.max_retries = max_retries
+
+        # Database path -> (Database, {SQL statement -> [arguments]})
+        self._pending: Dict[str, tuple] = dict()
+        self._size = 0
+        # Database path -> number of failed flushes in a row
+        self._retries: Dict[str, int] = dict()
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._running = True
+
+        self.start()
+
+    def run(self) -> None:
+        """ Flush buffer periodically or if it's full """
+
+        while self._running:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def add(self, database: Database, sql, *args):
+        """ Add SQL statement to the buffer of the given database """
+
+        with self._lock:
+            if database.db_path not in self._pending:
+                self._pending[database.db_path] = (database, dict())
+
+            self._pending[database.db_path][1].setdefault(sql, list()).append(args)
+            self._size += 1
+
+            if self._size >= self.max_rows:
+                self._wakeup.set()
+
+    def flush(self, database: Database = None):
+        """ Write all pending statements to their databases. If a
+        database is provided then only that one will be flushed """
+
+        with self._flush_lock:
+            with self._lock:
+                if database:
+                    pending = dict()
+                    if database.db_path in self._pending:
+                        pending[database.db_path] = self._pending.pop(database.db_path)
+                else:
+                    pending = self._pending
+                    self._pending = dict()
+
+                for _, batch in pending.values():
+                    self._size -= sum(len(rows) for rows in batch.values())
+
+            for db_path, (db, batch) in pending.items():
+                failed = self._write(db, batch)
+
+                if not failed:
+                    self._retries.pop(db_path, None)
+                    continue
+
+                rows = sum(len(r) for r in failed.values())
+                retries = self._retries.get(db_path, 0) + 1
+
+                if retries > self.max_retries:
+                    self._retries.pop(db_path, None)
+                    logging.error(f"Dropped {rows} buffered statements for '{db_path}' after {self.max_retries} retries")
+                    continue
+
+                self._retries[db_path] = retries
+                logging.warning(f"Retrying {rows} buffered statements for '{db_path}' with next flush")
+                self._requeue(db, failed)
+
+    def stop(self):
+        """ Stop flushing periodically and write everything that is pending """
+
+        self._running = False
+        self._wakeup.set()
+
+        for _ in range(self.max_retries + 1):
+            self.flush()
+
+            with self._lock:
+                if not self._size:
+                    break
+
+            time.sleep(1)
+
+    def _write(self, database: Database, batch: Dict[str, List]) -> Dict[str, List]:
+        """ Write batch to given database. Return statements that failed
+        because the database was locked. Other failing statements are dropped """
+
+        try:
+            database.execute_batch(batch)
+            return dict()
+        except Exception as e:
+            if self._is_locked(e):
+                return batch
+
+            logging.error(f"Can't write buffered statements to '{database.db_path}': {e}")
+
+        failed = dict()
+
+        # Only drop the statements that fail
+        for sql, rows in batch.items():
+            for args in rows:
+                try:
+                    database.execute(sql, *args)
+                except Exception as e:
+                    if self._is_locked(e):
+                        failed.setdefault(sql, list()).append(args)
+                    else:
+                        logging.error(f"Dropped buffered statement for '{database.db_path}' {args}: {e}")
+
+        return failed
+
+    def _requeue(self, database: Database, batch: Dict[str, List]):
+        """ Add statements to the buffer again, before newer ones """
+
+        with self._lock:
+            _, newer = self._pending.get(database.db_path, (database, dict()))
+
+            for sql, rows in newer.items():
+                batch.setdefault(sql, list()).extend(rows)
+
+            self._pending[database.db_path] = (database, batch)
+            self._size += sum(len(rows) for rows in batch.values()) - \
+                sum(len(rows) for rows in newer.values())
+
+    @staticmethod
+    def _is_locked(error: Exception) -> bool:
+        """ Return TRUE if the error is only temporary because
+        the database is locked by another connection """
+
+        return isinstance(error, sqlite3.OperationalError) and \
+            any(s in str(error).lower() for s in ("locked", "busy"))
+
+
+# Default pragmas for database connections. Can be overwritten
+# with keys of the same name in the 'database' section of the
+# global config
+PRAGMAS = {
+    "auto_vacuum": "INCREMENTAL",
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -8000
+}
+
+_databases: Dict[str, Database] = dict()
+_databases_lock = threading.Lock()
+
+
+def get_database(db_path, timeout=5, pragmas: Dict = None) -> Database:
+    """ Return connection pool for given database file.
+    Pools are created once per path and reused afterwards """
+
+    db_path = os.path.abspath(db_path)
+
+    with _databases_lock:
+        if db_path not in _databases:
+            _databases[db_path] = Database(db_path, timeout=timeout, pragmas=pragmas)
+        return _databases[db_path]
+
+
+def open_database(db_path, config: ConfigManager) -> Database:
+    """ Return connection pool for given database file. Timeout and
+    pragmas will be taken from the 'database' section of the given
+    global config or from the defaults if they are not set """
+
+    timeout = config.get("database", "timeout")
+    db_timeout = timeout if timeout else 5
+
+    pragmas = dict()
+    for pragma, default in PRAGMAS.items():
+        value = config.get("database", pragma)
+        pragmas[pragma] = value if value is not None else default
+
+    return get_database(db_path, timeout=db_timeout, pragmas=pragmas)
+
+
+def read_migrations(mig_path) -> List[Tuple[int, str, str]]:
+    """ Return all migrations (tuples of version, name and SQL script)
+    from given folder. Migrations are SQL scripts that are named
+    '<version>_<description>.sql'. Other files will be ignored """
+
+    migrations = list()
+
+    if not os.path.isdir(mig_path):
+        return migrations
+
+    for filename in os.listdir(mig_path):
+        version = filename.split("_", 1)[0]
+
+        if not filename.lower().endswith(".sql") or not version.isdigit():
+            continue
+
+        with open(os.path.join(mig_path, filename), "r", encoding="utf8") as f:
+            migrations.append((int(version), filename, f.read()))
+
+    return migrations
+
+
+def close_all():
+    """ Close all connections of all database pools """
+
+    with _databases_lock:
+        for database in _databases.values():
+            database.close()
+        _databases.clear()
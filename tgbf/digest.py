@@ -0,0 +1,134 @@
+import re
+import logging
+import threading
+
+import tgbf.emoji as emo
+
+from typing import Callable, Dict, List, Union
+from tgbf.broadcast import Broadcaster, Priority
+
+
+class ErrorEntry:
+
+    def __init__(self, summary: str):
+        """ Occurrences of errors with the same fingerprint """
+
+        self.summary = summary
+        self.count = 0
+        self.total = 1
+
+
+class ErrorDigest:
+
+    # Maximum length of a Telegram message
+    MAX_LENGTH = 4096
+
+    def __init__(self, broadcaster: Broadcaster, admins: Callable[[], List[int]], interval=300):
+        """ Collects errors for the admins. The first occurrence of an error
+        is sent right away. Further errors with the same fingerprint are only
+        counted and sent as one digest every 'interval' seconds (see 'flush').
+        Errors that didn't occur again within a whole interval will be sent
+        right away again next time.
+
+        'admins' needs to return the user IDs that get the messages. Messages
+        are sent by the broadcast queue and not by the reporting thread """
+
+        self.broadcaster = broadcaster
+        self.admins = admins
+        self.interval = interval
+
+        # Fingerprint -> ErrorEntry
+        self._entries: Dict[tuple, ErrorEntry] = dict()
+        self._lock = threading.Lock()
+
+        self.reported = 0
+        self.sent = 0
+
+    def report(self, fingerprint: tuple, summary: str, details: Union[str, Callable[[], str]] = None, **kwargs):
+        """ Report an error. 'summary' is a short description for the digest.
+        'details' is the first message for the admins (default is 'summary').
+        It can be a function so that it is only built if it will be sent.
+        Keyword arguments are passed on to 'send_message' """
+
+        with self._lock:
+            self.reported += 1
+            entry = self._entries.get(fingerprint)
+
+            if entry:
+                entry.count += 1
+                entry.total += 1
+                return
+
+            self._entries[fingerprint] = ErrorEntry(summary)
+
+        if callable(details):
+            try:
+                details = details()
+            except Exception as e:
+                logging.error(f"Can't build error details: {e}")
+                details = None
+
+        self._send(details if details else summary, **kwargs)
+
+    def flush(self):
+        """ Send digest of all errors that occurred again since the last
+        digest and forget errors that didn't occur again """
+
+        with self._lock:
+            repeated = [e for e in self._entries.values() if e.count]
+            self._entries = {f: e for f, e in self._entries.items() if e.count}
+
+            lines = [f"{e.count}x {e.summary} ({e.total} total)" for e in repeated]
+
+            for entry in repeated:
+                entry.count = 0
+
+        if not lines:
+            return
+
+        msg = f"{emo.ALERT} Repeated errors in the last {int(self.interval / 60)} minutes\n\n"
+        self._send(msg + "\n".join(lines), priority=Priority.LOW)
+
+    def get_stats(self) -> Dict:
+        """ Return number of reported errors and sent messages """
+
+        with self._lock:
+            return {
+                "reported": self.reported,
+                "sent": self.sent,
+                "fingerprints": len(self._entries)
+            }
+
+    def _send(self, msg: str, priority: Priority = Priority.NORMAL, **kwargs):
+        """ Queue message for all admins """
+
+        if len(msg) > self.MAX_LENGTH:
+            msg = msg[:self.MAX_LENGTH - 3] + "..."
+            # Cut off text might break markup
+            kwargs.pop("parse_mode", None)
+
+        for admin in self.admins() or list():
+            with self._lock:
+                self.sent += 1
+
+            self.broadcaster.send(admin, msg, priority, **kwargs)
+
+    @staticmethod
+    def fingerprint(error: Union[Exception, str], origin: str = None) -> tuple:
+        """ Return fingerprint of an error. For exceptions, the type and the
+        line that raised it are used. For texts, numbers are ignored """
+
+        if isinstance(error, Exception):
+            tb = error.__traceback__
+
+            while tb and tb.tb_next:
+                tb = tb.tb_next
+
+            if tb:
+                line = f"{tb.tb_frame.f_code.co_filename}:{tb.tb_lineno}"
+            else:
+                line = None
+
+            return origin, type(error).__name__, line
+
+        return origin, re.sub(r"\d+", "#", str(error))[:100]
@@ -1,12 +1,20 @@
 import decimal
 import time
 import logging
-import requests
+import threading
 
-from typing import Union
+from typing import Callable, List, Tuple, Union
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from contracting.db.encoder import decode
 from lamden.crypto.transaction import build_transaction
 from lamden.crypto.wallet import Wallet
+from tgbf.sessions import PooledSession, get_session
+from tgbf.lamden.nonce import nonces
+from tgbf.lamden.hedge import hedging
+from tgbf.singleflight import flights
+
+# Runs reading requests if hedging is enabled
+_hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="HedgedGet")
 
 
 class API:
@@ -47,6 +55,11 @@ class API:
 
         return self._explorer_url
 
+    @property
+    def session(self) -> PooledSession:
+        """ Get shared HTTP session for currently set node """
+        return get_session(self.node_url)
+
     def is_address_valid(self, address: str):
         """ Check if the given address is valid """
         if not len(address) == 64:
@@ -59,30 +72,135 @@ class API:
 
     # ---- Masternode API ----
 
-    def get_nonce(self, address: str):
-        """ Get nonce to use for next transaction """
-        with requests.get(f"{self.node_url}/nonce/{address}") as res:
-            return decode(res.text)
+    def _read_nodes(self) -> List[str]:
+        """ Return URLs of masternodes that a reading request will be sent
+        to. Requests are retried on the next node if the previous one fails """
+        return [self.node_url]
+
+    def _record(self, url: str, success: bool, latency: float = None, error: str = None):
+        """ Called with the result of every reading request """
+        pass
+
+    def _get(self, path: str, params: dict = None):
+        """ Send GET request for given path to the masternode and return
+        the decoded response. Identical requests that are sent at the
+        same time will share one request to the masternode """
+
+        key = ("lamden", self.node_url, path, tuple(sorted((params or dict()).items())))
+        return flights.do(key, self._read, path, params)
+
+    def _read(self, path: str, params: dict = None):
+        """ Send GET request for given path to the masternode and return
+        the decoded response. If hedging is enabled and the first node
+        doesn't answer in time, the same request is sent to the second
+        node too and the first response will be used """
+
+        nodes = self._read_nodes()
+        error = None
+
+        if hedging.enabled and len(nodes) > 1:
+            try:
+                return self._get_hedged(path, params, nodes[0], nodes[1])
+            except Exception as e:
+                error = e
+                nodes = nodes[2:]
+
+        for url in nodes:
+            try:
+                return self._get_from(url, path, params)
+            except Exception as e:
+                error = e
+
+        raise error
+
+    def _get_hedged(self, path: str, params: dict, primary_url: str, backup_url: str):
+        """ Send request to 'primary_url' and after the hedging delay
+        also to 'backup_url'. Return the first successful response
+        and cancel the request that lost """
+
+        cancelled = threading.Event()
+
+        primary = _hedge_executor.submit(self._get_from, primary_url, path, params, cancelled)
+        done, _ = wait([primary], timeout=hedging.delay())
+
+        if done:
+            hedging.count()
+
+            if primary.exception() is None:
+                return primary.result()
+
+            # Primary failed before the hedge would have been sent
+            return self._get_from(backup_url, path, params)
+
+        backup = _hedge_executor.submit(self._get_from, backup_url, path, params, cancelled)
+        pending = {primary, backup}
+        error = None
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                if future.exception() is None:
+                    cancelled.set()
+                    hedging.count(hedged=True, won=future is backup)
+                    return future.result()
+
+                error = future.exception()
+
+        hedging.count(hedged=True)
+        raise error
+
+    def _get_from(self, url: str, path: str, params: dict = None, cancelled: threading.Event = None):
+        """ Send GET request to the given masternode and return the decoded
+        response. If 'cancelled' is set before the response body has been
+        read, the connection will be closed without reading it """
+
+        start = time.monotonic()
+
+        try:
+            with get_session(url).get(f"{url}{path}", params=params, stream=cancelled is not None) as res:
+                if cancelled is not None and cancelled.is_set():
+                    return None
+
+                if res.status_code >= 500:
+                    raise ConnectionError(f"Server error {res.status_code}")
+
+                data = decode(res.text)
+        except Exception as e:
+            if cancelled is None or not cancelled.is_set():
+                self._record(url, False, error=str(e))
+            raise
+
+        latency = time.monotonic() - start
+
+        hedging.add_sample(latency)
+        self._record(url, True, latency)
+        return data
+
+    def get_nonce(self, address: str, node_url: str = None):
+        """ Get nonce to use for next transaction. If 'node_url' is
+        provided, only that masternode will be asked. The processor
+        in the response is only valid for transactions to that node """
+
+        if node_url:
+            return self._get_from(node_url, f"/nonce/{address}")
+        return self._get(f"/nonce/{address}")
 
     def get_latest_block(self):
         """ Get block details for the latest block """
-        with requests.get(f"{self.node_url}/latest_block") as res:
-            return decode(res.text)
+        return self._get("/latest_block")
 
     def get_latest_block_number(self):
         """ Get block number of the latest block """
-        with requests.get(f"{self.node_url}/latest_block_num") as res:
-            return decode(res.text)
+        return self._get("/latest_block_num")
 
     def get_latest_block_hash(self):
         """ Get the hash of the latest block """
-        with requests.get(f"{self.node_url}/latest_block_hash") as res:
-            return decode(res.text)
+        return self._get("/latest_block_hash")
 
     def get_block_details(self, block_number: Union[int, str]):
         """ Get block details for a given block number """
-        with requests.get(f"{self.node_url}/blocks?num={block_number}") as res:
-            return decode(res.text)
+        return self._get(f"/blocks?num={block_number}")
 
     def get_balance(self, token: str = "currency", address: str = None, contract: str = None):
         """ Get balance for a given address or for the current
@@ -97,18 +215,15 @@ class API:
             else:
                 key = self.wallet.verifying_key
 
-        with requests.get(f"{self.node_url}/contracts/{token}/balances?key={key}") as res:
-            return decode(res.text)
+        return self._get(f"/contracts/{token}/balances?key={key}")
 
     def get_contracts(self):
         """ Get all available smart contracts """
-        with requests.get(f"{self.node_url}/contracts") as res:
-            return decode(res.text)
+        return self._get("/contracts")
 
     def get_transaction_details(self, tx_hash: str):
         """ Get transaction details for given tx hash """
-        with requests.get(f"{self.node_url}/tx?hash={tx_hash}") as res:
-            return decode(res.text)
+        return self._get(f"/tx?hash={tx_hash}")
 
     def tx_succeeded(self, tx_hash: str, check_period: float = 3, timeout: float = 60):
         end = int(time.time()) + timeout
@@ -134,44 +249,77 @@ class API:
         return self.post_transaction(100, token, "transfer", kwargs)
 
     def post_transaction(self, stamps: int, contract: str, function: str, kwargs: dict):
-        """ Post a transaction to the chain and trigger given smart contract """
-        nonce = self.get_nonce(self.wallet.verifying_key)
-
-        tx = build_transaction(
-            wallet=self.wallet,
-            processor=nonce["processor"],
-            stamps=stamps,
-            nonce=nonce["nonce"],
-            contract=contract,
-            function=function,
-            kwargs=kwargs)
-
-        logging.info(f"TRANSACTION: {tx}")
-
-        with requests.post(self.node_url, data=tx) as res:
-            logging.info(f"TRANSACTION({stamps}, {contract}, {function}, {kwargs}) -> {res.text}")
-            return decode(res.text)
+        """ Post a transaction to the chain and trigger given smart contract.
+        The nonce will be assigned locally by the shared nonce manager and
+        the transaction is posted to the node that the nonce came from """
+
+        def post(nonce: int, processor: str, node_url: str):
+            tx = build_transaction(
+                wallet=self.wallet,
+                processor=processor,
+                stamps=stamps,
+                nonce=nonce,
+                contract=contract,
+                function=function,
+                kwargs=kwargs)
+
+            logging.info(f"TRANSACTION: {tx}")
+
+            with get_session(node_url).post(node_url, data=tx) as res:
+                logging.info(f"TRANSACTION({stamps}, {contract}, {function}, {kwargs}) -> {res.text}")
+                return decode(res.text)
+
+        return nonces.submit(self, post)
 
     def get_network_constitution(self):
         """ Get the constitution of the network """
-        with requests.get(f"{self.node_url}/constitution") as res:
-            return decode(res.text)
+        return self._get("/constitution")
 
     def get_contract_methods(self, contract: str):
         """ Get methods for a given smart contract """
-        with requests.get(f"{self.node_url}/contracts/{contract}/methods") as res:
-            return decode(res.text)
+        return self._get(f"/contracts/{contract}/methods")
 
     def get_contract_variables(self, contract: str):
         """ Get variables for a given smart contract """
-        with requests.get(f"{self.node_url}/contracts/{contract}/variables") as res:
-            return decode(res.text)
+        return self._get(f"/contracts/{contract}/variables")
 
     def get_contract_variable(self, contract: str, variable: str, key=None):
         """ Get variables for a given smart contract """
         kwargs = {"key": key} if key else None
-        with requests.get(f"{self.node_url}/contracts/{contract}/{variable}", kwargs) as res:
-            return decode(res.text)
+        return self._get(f"/contracts/{contract}/{variable}", kwargs)
+
+    def get_contract_variables_many(self, variables: List[Tuple], max_workers: int = 8):
+        """ Get multiple contract variables at the same time. Every entry
+        in 'variables' is a tuple of (contract, variable) or (contract,
+        variable, key). Return list of results in the same order. If a
+        single request fails, its result will be {"error": <message>} """
+        return self._get_many(self.get_contract_variable, variables, max_workers)
+
+    def get_balances_many(self, balances: List[Tuple], max_workers: int = 8):
+        """ Get multiple balances at the same time. Every entry in 'balances'
+        is a tuple of arguments for 'get_balance' (token, address, contract).
+        Return list of results in the same order. If a single request fails,
+        its result will be {"error": <message>} """
+        return self._get_many(self.get_balance, balances, max_workers)
+
+    def _get_many(self, func: Callable, args_list: List[Tuple], max_workers: int):
+        """ Call given function with every tuple of arguments concurrently
+        (at most 'max_workers' at once) and return results in same order """
+
+        def call(args):
+            try:
+                return func(*args)
+            except Exception as e:
+                logging.warning(f"{func.__name__}{args} failed: {e}")
+                return {"error": str(e)}
+
+        if not args_list:
+            return list()
+        if len(args_list) == 1:
+            return [call(args_list[0])]
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(args_list))) as executor:
+            return list(executor.map(call, args_list))
 
     def approve_contract(self, contract: str, token: str = "currency", amount: float = 900000000000):
         """ Approve smart contract to spend a specific amount of TAU """
@@ -182,12 +330,11 @@ class API:
     def get_approved_amount(self, contract: str, token: str = "currency", var: str = "balances"):
         """ Get amount of TAU that is approved to be spent by smart contract """
         key = f"{self.wallet.verifying_key}:{contract}"
-        with requests.get(f"{self.node_url}/contracts/{token}/{var}?key={key}") as res:
-            return decode(res.text)
+        return self._get(f"/contracts/{token}/{var}?key={key}")
 
     # ---- Block Explorer API ----
 
     def get_top_wallets(self):
         """ Get top 20 wallets by amount of TAU """
-        with requests.get(f"{self.explorer_url}/api/states/topwallets") as res:
+        with get_session(self.explorer_url).get(f"{self.explorer_url}/api/states/topwallets") as res:
             return decode(res.text)
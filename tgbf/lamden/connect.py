@@ -1,51 +1,181 @@
 import os
-import logging
-import requests
+import threading
 import tgbf.constants as c
 
+from typing import Callable
+from concurrent.futures import Future, TimeoutError
 from tgbf.config import ConfigManager as Cfg
 from lamden.crypto.wallet import Wallet
 from tgbf.lamden.api import API
+from tgbf.sessions import get_session
+from tgbf.lamden.tracker import get_tracker
+from tgbf.lamden.nonce import nonces
+from tgbf.lamden.health import monitor
+from tgbf.lamden.hedge import hedging
+from tgbf.lamden.state import contract_state
 
 
 class Connect(API):
 
+    # Resolved node and explorer endpoints
+    _endpoints = None
+    _endpoints_lock = threading.Lock()
+
+    # Wallet for connections without user wallet
+    _anonymous_wallet = None
+
     def __init__(self, wallet: Wallet = None, ping: bool = False):
-        self.cfg = Cfg(os.path.join(c.DIR_CFG, "lamden.json"))
-        self.chain = self.cfg.get("chain")
+        """ Lightweight connection to the Lamden network for the given
+        wallet. Node and explorer endpoints are resolved only once from
+        'lamden.json' and shared by all connections. They will be
+        resolved again if the config file changes or 'ping' is True """
 
-        node_host, node_port, explorer_host, explorer_port = self.connect(ping)
-        wallet = wallet if wallet else Wallet()
+        node_host, node_port, explorer_host, explorer_port = self.get_endpoints(ping)
 
         super().__init__(
             node_host=node_host,
             node_port=node_port,
-            wallet=wallet,
+            wallet=wallet if wallet else self.get_anonymous_wallet(),
             explorer_host=explorer_host,
             explorer_port=explorer_port)
 
-    def connect(self, ping: bool):
-        explorer_dict = self.cfg.get(self.chain)["explorer"]
+    @property
+    def cfg(self) -> Cfg:
+        """ Return Lamden configuration """
+        return self.get_cfg()
+
+    @property
+    def chain(self) -> str:
+        """ Return currently used chain """
+        return self.get_cfg().get("chain")
+
+    @property
+    def node_url(self):
+        """ Get URL of the currently best masternode """
+        return monitor.best() or super().node_url
+
+    def _read_nodes(self):
+        """ Return best masternode first and then the next best
+        nodes that a failed reading request will be retried on """
+
+        retries = self.get_cfg().get("health", "retries")
+        nodes = monitor.nodes()[:1 + (retries if retries is not None else 2)]
+
+        return nodes if nodes else super()._read_nodes()
+
+    def _record(self, url: str, success: bool, latency: float = None, error: str = None):
+        """ Update health status of the node """
+        monitor.record(url, success, latency, error)
+
+    def get_contract_variable(self, contract: str, variable: str, key=None):
+        """ Get variables for a given smart contract. Values are cached
+        until the latest block number changes """
+        return contract_state.get(
+            (contract, variable, key),
+            super().get_contract_variable, contract, variable, key)
+
+    def track_tx(self, tx_hash: str, callback: Callable = None, timeout: float = 60) -> Future:
+        """ Wait for the given transaction in the background. The callback
+        will be called with (success, result) once it's confirmed, failed
+        or the timeout is reached. Use this instead of 'tx_succeeded' so
+        that the calling handler doesn't need to wait """
+        return get_tracker().track(tx_hash, callback=callback, timeout=timeout)
+
+    def tx_succeeded(self, tx_hash: str, check_period: float = 3, timeout: float = 60):
+        """ Wait for the given transaction and return (success, result).
+        The transaction will be checked by the shared tracker together
+        with all other pending transactions """
+
+        try:
+            return self.track_tx(tx_hash, timeout=timeout).result(timeout=timeout + check_period)
+        except TimeoutError:
+            return False, "Timeout reached"
+
+    @classmethod
+    def get_cfg(cls) -> Cfg:
+        """ Return Lamden configuration. Resolved endpoints
+        will be reset if the configuration changes """
+        return Cfg(
+            os.path.join(c.DIR_CFG, "lamden.json"),
+            callback=cls.reset,
+            callback_pass_args=False)
+
+    @classmethod
+    def get_endpoints(cls, ping: bool = False):
+        """ Return node host, node port, explorer host and explorer port """
+
+        with cls._endpoints_lock:
+            if cls._endpoints is None or ping:
+                cls._endpoints = cls.connect(ping)
+            return cls._endpoints
+
+    @classmethod
+    def get_anonymous_wallet(cls) -> Wallet:
+        """ Return wallet that is used if no wallet is provided """
+
+        if cls._anonymous_wallet is None:
+            cls._anonymous_wallet = Wallet()
+        return cls._anonymous_wallet
+
+    @classmethod
+    def reset(cls):
+        """ Resolve endpoints again with next connection
+        and fetch nonces again from the masternode """
+
+        with cls._endpoints_lock:
+            cls._endpoints = None
+
+        # Chain might have changed
+        nonces.reset()
+
+    @classmethod
+    def connect(cls, ping: bool):
+        cfg = cls.get_cfg()
+        chain = cfg.get("chain")
+
+        explorer_dict = cfg.get(chain)["explorer"]
         explorer_host = next(iter(explorer_dict))
         explorer_port = explorer_dict[explorer_host]
 
-        node_list = self.cfg.get(self.chain)["masternodes"]
-        for node in node_list:
-            for node_host, node_port in node.items():
-                try:
-                    if ping:
-                        self.ping(node_host, node_port)
-                    return node_host, node_port, explorer_host, explorer_port
-                except:
-                    msg = f"Can not connect to host '{node_host}' and port '{node_port}'"
-                    logging.warning(msg)
+        nodes = [(h, p) for node in cfg.get(chain)["masternodes"] for h, p in node.items()]
+        urls = [h if p is None else f"{h}:{p}" for h, p in nodes]
+
+        for key in ("interval", "timeout", "max_error_rate"):
+            value = cfg.get("health", key)
+            if value is not None:
+                setattr(monitor, key, value)
+
+        for key in ("enabled", "percentile", "min_delay", "max_delay"):
+            value = cfg.get("hedging", key)
+            if value is not None:
+                setattr(hedging, key, value)
+
+        for key in ("enabled", "interval", "idle_timeout"):
+            value = cfg.get("state", key)
+            if value is not None:
+                setattr(contract_state, key, value)
+
+        monitor.set_nodes(urls)
+
+        if ping:
+            monitor.check()
+
+            if not any(s["healthy"] for s in monitor.get_stats().values()):
+                raise ConnectionError("Can not connect to network")
+
+        best = monitor.best()
+
+        if not best:
+            raise ConnectionError("No masternodes configured")
 
-        raise ConnectionError("Can not connect to network")
+        node_host, node_port = nodes[urls.index(best)]
+        return node_host, node_port, explorer_host, explorer_port
 
     @staticmethod
     def ping(host: str, port: int):
         node = host if port is None else f"{host}:{port}"
-        with requests.get(f"{node}/ping").json() as res:
+        with get_session(node).get(f"{node}/ping") as res:
+            res = res.json()
             if "status" not in res or res["status"] != "online":
                 raise ConnectionError(f"Unexpected result: {res}")
             return res
@@ -0,0 +1,178 @@
+import time
+import logging
+import threading
+
+from typing import Dict, List
+from tgbf.sessions import get_session
+
+
+class NodeHealth:
+
+    # Weight of the newest measurement for average latency and error rate
+    WEIGHT = 0.2
+
+    def __init__(self, url: str):
+        """ Health status of a single masternode """
+
+        self.url = url
+        self.healthy = True
+        self.latency = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.last_error = None
+        self.checked = None
+
+    def record(self, success: bool, latency: float = None, error: str = None):
+        """ Update status with the result of a request """
+
+        self.requests += 1
+        self.error_rate = (1 - self.WEIGHT) * self.error_rate + self.WEIGHT * (0 if success else 1)
+
+        if success:
+            if latency is not None:
+                if self.latency is None:
+                    self.latency = latency
+                else:
+                    self.latency = (1 - self.WEIGHT) * self.latency + self.WEIGHT * latency
+        else:
+            self.errors += 1
+            self.last_error = error
+
+    def score(self, timeout: float) -> float:
+        """ Lower is better. Errors count as requests that took 'timeout' seconds """
+        latency = self.latency if self.latency is not None else timeout / 2
+        return latency + self.error_rate * timeout
+
+
+class NodeMonitor(threading.Thread):
+
+    def __init__(self, interval=30, timeout=3, max_error_rate=0.5):
+        """ Checks the health of all configured masternodes every 'interval'
+        seconds by pinging them. Results of real requests are recorded too.
+        A node is unhealthy if it doesn't answer the ping within 'timeout'
+        seconds or if its error rate is higher than 'max_error_rate'.
+
+        'nodes()' returns all nodes with the best healthy node first so
+        that requests can be sent to it and retried on the next ones """
+
+        threading.Thread.__init__(self, name="NodeMonitor", daemon=True)
+
+        self.interval = interval
+        self.timeout = timeout
+        self.max_error_rate = max_error_rate
+
+        # Node URL -> NodeHealth
+        self._nodes: Dict[str, NodeHealth] = dict()
+
+        self._lock = threading.Lock()
+        self._halt = threading.Event()
+
+    def set_nodes(self, urls: List[str]):
+        """ Set masternodes to watch. Status of known nodes will be kept """
+
+        with self._lock:
+            self._nodes = {url: self._nodes.get(url, NodeHealth(url)) for url in urls}
+
+            if self.ident is None and urls and not self._halt.is_set():
+                self.start()
+
+    def nodes(self) -> List[str]:
+        """ Return URLs of all nodes. Healthy nodes are sorted by their
+        score and come first. Unhealthy nodes keep their configured order """
+
+        with self._lock:
+            nodes = list(self._nodes.values())
+
+        healthy = sorted([n for n in nodes if n.healthy], key=lambda n: n.score(self.timeout))
+        unhealthy = [n for n in nodes if not n.healthy]
+
+        return [n.url for n in healthy + unhealthy]
+
+    def best(self) -> str:
+        """ Return URL of best node or None if there are no nodes """
+        nodes = self.nodes()
+        return nodes[0] if nodes else None
+
+    def record(self, url: str, success: bool, latency: float = None, error: str = None):
+        """ Record result of a request to the given node """
+
+        with self._lock:
+            node = self._nodes.get(url)
+
+            if not node:
+                return
+
+            node.record(success, latency, error)
+
+            if node.error_rate > self.max_error_rate and node.healthy:
+                node.healthy = False
+                logging.warning(f"Masternode '{url}' is unhealthy: {error}")
+
+    def check(self):
+        """ Ping all nodes and update their status """
+
+        with self._lock:
+            nodes = list(self._nodes.values())
+
+        for node in nodes:
+            start = time.monotonic()
+
+            try:
+                with get_session(node.url).get(f"{node.url}/ping", timeout=self.timeout) as res:
+                    status = res.json().get("status")
+
+                if status != "online":
+                    raise ConnectionError(f"Status '{status}'")
+
+                success, error = True, None
+            except Exception as e:
+                success, error = False, str(e)
+
+            with self._lock:
+                node.record(success, time.monotonic() - start, error)
+                node.checked = time.time()
+
+                healthy = success and node.error_rate <= self.max_error_rate
+
+                # Recover faster if node answers again
+                if success and not node.healthy:
+                    node.error_rate = min(node.error_rate, self.max_error_rate)
+                    healthy = True
+
+                if healthy != node.healthy:
+                    state = "healthy again" if healthy else f"unhealthy: {error}"
+                    logging.warning(f"Masternode '{node.url}' is {state}")
+
+                node.healthy = healthy
+
+    def run(self) -> None:
+        """ Check nodes periodically """
+
+        while not self._halt.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logging.error(f"Checking masternodes failed: {e}")
+
+    def stop(self):
+        """ Stop checking nodes """
+        self._halt.set()
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """ Return health status of all nodes with URL as key """
+
+        with self._lock:
+            return {url: {
+                "healthy": n.healthy,
+                "latency": n.latency,
+                "error_rate": n.error_rate,
+                "requests": n.requests,
+                "errors": n.errors,
+                "last_error": n.last_error,
+                "checked": n.checked
+            } for url, n in self._nodes.items()}
+
+
+# Shared by all connections
+monitor = NodeMonitor()
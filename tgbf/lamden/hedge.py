@@ -0,0 +1,67 @@
+import threading
+
+from typing import Dict
+from collections import deque
+
+
+class HedgePolicy:
+
+    def __init__(self, enabled=False, percentile=95, min_delay=0.05, max_delay=2, samples=200):
+        """ Decides when a read request that didn't get an answer yet will
+        be sent to a second masternode. The delay is the given percentile
+        of the latencies of the last 'samples' successful reads, but at
+        least 'min_delay' and at most 'max_delay' seconds """
+
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+
+        self._samples = deque(maxlen=samples)
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def delay(self) -> float:
+        """ Return seconds to wait for the first node before hedging """
+
+        with self._lock:
+            if len(self._samples) < 10:
+                return self.max_delay
+
+            samples = sorted(self._samples)
+
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return min(self.max_delay, max(self.min_delay, samples[index]))
+
+    def add_sample(self, latency: float):
+        """ Remember latency of a successful read """
+
+        with self._lock:
+            self._samples.append(latency)
+
+    def count(self, hedged: bool = False, won: bool = False):
+        """ Count a read request and if it was hedged and the hedge won """
+
+        with self._lock:
+            self.requests += 1
+            self.hedged += int(hedged)
+            self.hedge_wins += int(won)
+
+    def get_stats(self) -> Dict:
+        """ Return how often hedges fired and won """
+
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "hedge_rate": self.hedged / self.requests if self.requests else 0
+            }
+
+
+# Shared by all connections
+hedging = HedgePolicy()
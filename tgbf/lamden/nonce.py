@@ -0,0 +1,115 @@
+import time
+import logging
+import threading
+
+from typing import Callable, Dict
+
+
+class WalletNonce:
+
+    def __init__(self):
+        """ Nonce state of a single wallet """
+
+        self.lock = threading.Lock()
+        self.nonce = None
+        self.processor = None
+        self.node = None
+        self.updated = 0.0
+
+
+class NonceManager:
+
+    def __init__(self, max_age=60):
+        """ Hands out nonces for transactions locally instead of asking
+        the masternode before every transaction. The nonce of a wallet
+        will be fetched once and then increased with every accepted
+        transaction. Transactions of the same wallet are submitted one
+        after the other so that they can't get the same nonce.
+
+        The processor is only valid for the masternode that the nonce came
+        from, so transactions are posted to that node. If the best node
+        changed, the masternode rejects a nonce, or the local nonce wasn't
+        used for 'max_age' seconds (the wallet might have been used
+        somewhere else), it will be fetched again from the best node """
+
+        self.max_age = max_age
+
+        # Wallet address -> WalletNonce
+        self._wallets: Dict[str, WalletNonce] = dict()
+        self._lock = threading.Lock()
+
+    def submit(self, api, post: Callable):
+        """ Submit a transaction for the wallet of the given API connection.
+        'post' will be called with nonce, processor and the URL of the node
+        to post to and needs to return the decoded response of the masternode.
+        If the nonce gets rejected, the transaction will be submitted once
+        more with a fresh nonce """
+
+        address = api.wallet.verifying_key
+        state = self._get_state(address)
+
+        with state.lock:
+            for attempt in range(2):
+                node = api.node_url
+
+                if state.nonce is None or state.node != node or \
+                        time.monotonic() - state.updated > self.max_age:
+                    self._fetch(api, state, node)
+
+                try:
+                    res = post(state.nonce, state.processor, state.node)
+                except Exception:
+                    # Not known if transaction was accepted
+                    state.nonce = None
+                    raise
+
+                if "error" not in res:
+                    state.nonce += 1
+                    state.updated = time.monotonic()
+                    return res
+
+                if not self.is_nonce_error(res["error"]):
+                    return res
+
+                logging.warning(f"Nonce {state.nonce} rejected for {address}: {res['error']}")
+                state.nonce = None
+
+            return res
+
+    def reset(self, address: str = None):
+        """ Forget local nonce of given wallet or of all wallets """
+
+        with self._lock:
+            if address:
+                self._wallets.pop(address, None)
+            else:
+                self._wallets.clear()
+
+    def _get_state(self, address: str) -> WalletNonce:
+        """ Return nonce state for given wallet address """
+
+        with self._lock:
+            if address not in self._wallets:
+                self._wallets[address] = WalletNonce()
+            return self._wallets[address]
+
+    @staticmethod
+    def _fetch(api, state: WalletNonce, node: str):
+        """ Get current nonce and processor from the given masternode """
+
+        state.nonce = None
+        res = api.get_nonce(api.wallet.verifying_key, node_url=node)
+
+        state.nonce = int(res["nonce"])
+        state.processor = res["processor"]
+        state.node = node
+        state.updated = time.monotonic()
+
+    @staticmethod
+    def is_nonce_error(error) -> bool:
+        """ Return TRUE if the masternode rejected the nonce """
+        return "nonce" in str(error).lower()
+
+
+# Shared by all API connections
+nonces = NonceManager()
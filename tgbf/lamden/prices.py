@@ -0,0 +1,113 @@
+import time
+import logging
+import threading
+
+from typing import Dict, List, Tuple
+from concurrent.futures import Future
+from tgbf.lamden.connect import Connect
+
+
+class PriceOracle:
+
+    # Rocketswap contract that holds prices and reserves
+    CONTRACT = "con_rocketswap_official_v1_1"
+
+    def __init__(self, ttl=10):
+        """ Shared cache for Rocketswap token prices and reserves. Values
+        are kept for 'ttl' seconds. If multiple threads ask for the same
+        value at the same time, only one request will be sent to the
+        masternode and all of them get its result.
+
+        Results have the same format as 'get_contract_variable' returns.
+        Errors will not be cached """
+
+        self.ttl = ttl
+
+        # (variable, contract) -> (result, expiry time)
+        self._cache: Dict[Tuple[str, str], Tuple[Dict, float]] = dict()
+        # (variable, contract) -> Future of running request
+        self._pending: Dict[Tuple[str, str], Future] = dict()
+
+        self._lock = threading.Lock()
+
+    def get_price(self, contract: str, max_age: float = None) -> Dict:
+        """ Return price of given token in TAU """
+        return self.get_many([("prices", contract)], max_age)[0]
+
+    def get_reserves(self, contract: str, max_age: float = None) -> Dict:
+        """ Return reserves (TAU, token) of given token """
+        return self.get_many([("reserves", contract)], max_age)[0]
+
+    def get_prices(self, contracts: List[str], max_age: float = None) -> List[Dict]:
+        """ Return prices of all given tokens in the same order """
+        return self.get_many([("prices", c) for c in contracts], max_age)
+
+    def get_many(self, keys: List[Tuple[str, str]], max_age: float = None) -> List[Dict]:
+        """ Return values for all given (variable, contract) tuples. Cached
+        values older than 'max_age' seconds (default is the TTL) and
+        missing values will be retrieved concurrently in one go """
+
+        max_age = self.ttl if max_age is None else max_age
+        now = time.monotonic()
+
+        results = dict()
+        waiting = dict()
+        missing = list()
+
+        with self._lock:
+            for key in keys:
+                cached = self._cache.get(key)
+
+                if cached and cached[1] - self.ttl + max_age > now:
+                    results[key] = cached[0]
+                elif key in self._pending:
+                    waiting[key] = self._pending[key]
+                elif key not in missing:
+                    self._pending[key] = Future()
+                    missing.append(key)
+
+        if missing:
+            self._fetch(missing)
+
+        for key, future in waiting.items():
+            results[key] = future.result()
+
+        with self._lock:
+            for key in missing:
+                results[key] = self._pending.pop(key).result()
+
+        return [results[key] for key in keys]
+
+    def invalidate(self, contract: str = None):
+        """ Remove cached values of given token or of all tokens """
+
+        with self._lock:
+            if contract:
+                self._cache.pop(("prices", contract), None)
+                self._cache.pop(("reserves", contract), None)
+            else:
+                self._cache.clear()
+
+    def _fetch(self, keys: List[Tuple[str, str]]):
+        """ Retrieve given values from the masternode and
+        resolve the futures of everyone that waits for them """
+
+        try:
+            values = Connect().get_contract_variables_many(
+                [(self.CONTRACT, variable, contract) for variable, contract in keys])
+        except Exception as e:
+            logging.error(f"Can't retrieve Rocketswap prices: {e}")
+            values = [{"error": str(e)}] * len(keys)
+
+        expiry = time.monotonic() + self.ttl
+
+        with self._lock:
+            for key, value in zip(keys, values):
+                if "error" not in value:
+                    self._cache[key] = (value, expiry)
+
+                self._pending[key].set_result(value)
+
+
+# Shared by all plugins
+prices = PriceOracle()
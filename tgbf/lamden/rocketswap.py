@@ -1,46 +1,131 @@
-import requests
+import time
+import logging
+
+from typing import Dict
+from tgbf.cache import LRUCache
+from tgbf.sessions import get_session
+from tgbf.singleflight import flights
 
 
 class Rocketswap:
 
     base_url = "https://stats.rocketswap.exchange:2053/api/"
 
+    # Seconds that responses of an endpoint will be cached
+    TTL = {
+        "balances": 10,
+        "token_list": 3600,
+        "token": 600,
+        "get_trade_history": 0,
+        "get_market_summaries_w_token": 60,
+        "user_lp_balance": 10,
+        "get_pairs": 30,
+        "user_staking_info": 10,
+        "staking_meta": 3600
+    }
+
+    # Responses of all instances. URL -> (JSON, ETag, Last-Modified, time)
+    _cache = LRUCache(5000)
+
     def __init__(self, base_url=None):
+        """ Client for the Rocketswap API. Responses are cached (shared by
+        all instances) as long as the TTL of their endpoint allows it. Expired
+        responses will be revalidated with the server if it provided an ETag
+        or modification date. If the server can't be reached, the last cached
+        response will be returned. Don't modify returned data since it's shared.
+
+        Methods with a 'force' argument skip the TTL if it's TRUE, so that
+        callers that poll for changes always get the current response """
+
         self.base_url = base_url if base_url else self.base_url
+        self.session = get_session(self.base_url)
 
     def balances(self, address):
-        with requests.get(self.base_url + "balances/" + address) as res:
-            return res.json()
+        return self._get("balances", "balances/" + address)
 
-    def token_list(self):
-        with requests.get(self.base_url + "token_list") as res:
-            return res.json()
+    def token_list(self, force=False):
+        return self._get("token_list", "token_list", force=force)
 
     def token(self, contract):
-        with requests.get(self.base_url + "token/" + contract) as res:
-            return res.json()
+        return self._get("token", "token/" + contract)
 
     def trade_history(self, take, skip):
         params = {"take": take, "skip": skip}
-        with requests.get(self.base_url + "get_trade_history/", params=params) as res:
-            return res.json()
+        return self._get("get_trade_history", "get_trade_history/", params)
 
-    def get_market_summaries_w_token(self):
-        with requests.get(self.base_url + "get_market_summaries_w_token") as res:
-            return res.json()
+    def get_market_summaries_w_token(self, force=False):
+        return self._get("get_market_summaries_w_token", "get_market_summaries_w_token", force=force)
 
     def user_lp_balance(self, address):
-        with requests.get(self.base_url + "user_lp_balance/" + address) as res:
-            return res.json()
+        return self._get("user_lp_balance", "user_lp_balance/" + address)
 
     def get_pairs(self, contract):
-        with requests.get(self.base_url + "get_pairs/" + contract) as res:
-            return res.json()
+        return self._get("get_pairs", "get_pairs/" + contract)
 
     def user_staking_info(self, address):
-        with requests.get(self.base_url + "user_staking_info/" + address) as res:
-            return res.json()
+        return self._get("user_staking_info", "user_staking_info/" + address)
 
     def staking_meta(self):
-        with requests.get(self.base_url + "staking_meta") as res:
-            return res.json()
+        return self._get("staking_meta", "staking_meta")
+
+    def _get(self, endpoint, path, params: Dict = None, force=False):
+        """ Return response of given endpoint from cache or from the server.
+        Identical requests that are sent at the same time will share one
+        request to the server. If 'force' is TRUE, the cached response will
+        only be used if the server confirms that it's still current """
+
+        key = ("rocketswap", path, tuple(sorted((params or dict()).items())), force)
+        return flights.do(key, self._request, endpoint, path, params, force)
+
+    def _request(self, endpoint, path, params: Dict = None, force=False):
+        """ Return response of given endpoint from cache or from the server """
+
+        url = self.base_url + path
+        ttl = self.TTL.get(endpoint, 0)
+
+        if not ttl:
+            with self.session.get(url, params=params) as res:
+                return res.json()
+
+        key = url + (f"?{sorted(params.items())}" if params else "")
+
+        cached = self._cache.get(key)
+
+        if cached and not force and time.monotonic() - cached[3] < ttl:
+            return cached[0]
+
+        headers = dict()
+        if cached and cached[1]:
+            headers["If-None-Match"] = cached[1]
+        if cached and cached[2]:
+            headers["If-Modified-Since"] = cached[2]
+
+        try:
+            with self.session.get(url, params=params, headers=headers) as res:
+                if res.status_code == 304 and cached:
+                    data = cached[0]
+                elif res.status_code >= 500 and cached:
+                    raise ConnectionError(f"Server error {res.status_code}")
+                elif not res.ok:
+                    # Don't cache errors
+                    return res.json()
+                else:
+                    data = res.json()
+
+                etag = res.headers.get("ETag")
+                modified = res.headers.get("Last-Modified")
+        except Exception as e:
+            if not cached:
+                raise
+
+            logging.warning(f"Using cached response for '{url}': {e}")
+            return cached[0]
+
+        self._cache.set(key, (data, etag, modified, time.monotonic()))
+
+        return data
+
+    @classmethod
+    def clear_cache(cls):
+        """ Remove all cached responses """
+        cls._cache.clear()
@@ -0,0 +1,144 @@
+import time
+import logging
+import threading
+
+from typing import Callable, Dict
+from tgbf.cache import LRUCache
+
+
+class StateCache(threading.Thread):
+
+    def __init__(self, interval=1, idle_timeout=60, max_size=10000):
+        """ Cache for contract variables. Contract state only changes with
+        new blocks, so cached values are used until the latest block number
+        changes. A single background thread checks the latest block number
+        every 'interval' seconds. If that didn't work recently, nothing will
+        be served from the cache.
+
+        If no value was requested for 'idle_timeout' seconds, the thread
+        stops checking until the next value is requested """
+
+        threading.Thread.__init__(self, name="StateCache", daemon=True)
+
+        self.enabled = True
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+
+        # Cache key -> (value, block number)
+        self._cache = LRUCache(max_size)
+        self._block = None
+        self._checked = 0.0
+        self._accessed = 0.0
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._halt = threading.Event()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, fetch: Callable, *args):
+        """ Return cached value for given key if the latest block didn't
+        change since it was retrieved. Otherwise call 'fetch' with the given
+        arguments and cache its result unless it contains an error """
+
+        if not self.enabled:
+            return fetch(*args)
+
+        self._accessed = time.monotonic()
+
+        if self.ident is None and not self._halt.is_set():
+            with self._lock:
+                if self.ident is None:
+                    self.start()
+
+        self._wakeup.set()
+
+        block = self.get_block()
+
+        if block is not None:
+            cached = self._cache.get(key)
+
+            if cached and cached[1] == block:
+                with self._lock:
+                    self.hits += 1
+                return cached[0]
+
+        with self._lock:
+            self.misses += 1
+
+        value = fetch(*args)
+
+        if block is not None and not (isinstance(value, dict) and "error" in value):
+            self._cache.set(key, (value, block))
+
+        return value
+
+    def get_block(self) -> int:
+        """ Return latest block number or None if it's not known for sure """
+
+        with self._lock:
+            if self._block is not None and time.monotonic() - self._checked <= 2 * self.interval:
+                return self._block
+
+    def advance(self, block: int):
+        """ Set latest block number. Cached values will be removed if it changed """
+
+        with self._lock:
+            if block != self._block:
+                self._cache.clear()
+
+            self._block = block
+            self._checked = time.monotonic()
+
+    def clear(self):
+        """ Remove all cached values """
+        self._cache.clear()
+
+    def run(self) -> None:
+        """ Check latest block number until stopped """
+
+        from tgbf.lamden.connect import Connect
+
+        while not self._halt.is_set():
+            if time.monotonic() - self._accessed > self.idle_timeout:
+                # Nothing to do until the next value is requested
+                with self._lock:
+                    self._block = None
+                self._cache.clear()
+
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            try:
+                self.advance(int(Connect().get_latest_block_number()))
+            except Exception as e:
+                logging.warning(f"Can't get latest block number: {e}")
+
+            self._halt.wait(self.interval)
+
+    def stop(self):
+        """ Stop checking the latest block number """
+
+        self._halt.set()
+        self._wakeup.set()
+
+    def get_stats(self) -> Dict:
+        """ Return hit rate, latest block and number of cached values """
+
+        with self._lock:
+            requests = self.hits + self.misses
+
+            return {
+                "enabled": self.enabled,
+                "block": self._block,
+                "entries": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0
+            }
+
+
+# Shared by all connections
+contract_state = StateCache()
@@ -0,0 +1,259 @@
+import time
+import logging
+import threading
+
+from typing import Callable, Dict
+from concurrent.futures import Future, ThreadPoolExecutor
+from tgbf.lamden.state import contract_state
+
+
+class PendingTx:
+
+    def __init__(self, tx_hash: str, timeout: float, callback: Callable = None):
+        """ Transaction that is waiting to be confirmed """
+
+        self.tx_hash = tx_hash
+        self.callback = callback
+        self.future = Future()
+        self.added = time.monotonic()
+        self.deadline = self.added + timeout
+
+
+class TxTracker(threading.Thread):
+
+    def __init__(self, connect: Callable, check_period=2, lookup_after=10, workers=4, on_error: Callable = None):
+        """ Single background thread that waits for the confirmation
+        of all pending transactions. Instead of every handler polling
+        its own transaction, the tracker follows new blocks and resolves
+        all pending transactions that are part of them at once.
+
+        Transactions that weren't found in a block after 'lookup_after'
+        seconds (or if blocks can't be retrieved) will be looked up by
+        hash. 'connect' needs to return a Lamden API connection.
+
+        Callbacks are executed by a pool of 'workers' threads and get
+        the same result that 'tx_succeeded' returns: (success, result).
+        If a callback raises an exception, 'on_error' will be called
+        with the transaction hash, the callback and the exception """
+
+        threading.Thread.__init__(self, name="TxTracker", daemon=True)
+
+        self.connect = connect
+        self.check_period = check_period
+        self.lookup_after = lookup_after
+        self.on_error = on_error
+
+        # Transaction hash -> PendingTx
+        self._pending: Dict[str, PendingTx] = dict()
+        self._last_block = None
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._halt = threading.Event()
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="TxCallback")
+
+    def track(self, tx_hash: str, callback: Callable = None, timeout: float = 60) -> Future:
+        """ Start waiting for the confirmation of the given transaction.
+        Return a future with the result as (success, result) tuple. If a
+        callback is provided, it will be called with success and result """
+
+        tx = PendingTx(tx_hash, timeout, callback)
+
+        with self._lock:
+            if self._halt.is_set():
+                tx.future.set_result((False, "Tracker stopped"))
+                return tx.future
+
+            self._pending[tx_hash] = tx
+
+            # Start thread with first tracked transaction
+            if self.ident is None and not self._halt.is_set():
+                self.start()
+
+        self._wakeup.set()
+        return tx.future
+
+    def run(self) -> None:
+        """ Check pending transactions until stopped """
+
+        while not self._halt.is_set():
+            with self._lock:
+                pending = bool(self._pending)
+
+            if not pending:
+                # Nothing to do until a new transaction gets tracked
+                self._last_block = None
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            # Give the network some time to process the transaction
+            if self._halt.wait(self.check_period):
+                break
+
+            try:
+                self._check()
+            except Exception as e:
+                logging.error(f"Checking pending transactions failed: {e}")
+
+    def stop(self):
+        """ Stop tracking. Pending transactions will be resolved
+        as failed without executing their callbacks """
+
+        with self._lock:
+            self._halt.set()
+            pending = list(self._pending.values())
+            self._pending.clear()
+
+        for tx in pending:
+            tx.future.set_result((False, "Tracker stopped"))
+
+        self._wakeup.set()
+        self._executor.shutdown(wait=False)
+
+    def _check(self):
+        """ Resolve pending transactions from new blocks or by hash """
+
+        lamden = self.connect()
+
+        blocks_ok = self._check_blocks(lamden)
+
+        now = time.monotonic()
+
+        with self._lock:
+            pending = list(self._pending.values())
+
+        for tx in pending:
+            if not blocks_ok or now - tx.added >= self.lookup_after:
+                try:
+                    details = lamden.get_transaction_details(tx.tx_hash)
+                except Exception as e:
+                    logging.warning(f"Can't get transaction {tx.tx_hash}: {e}")
+                    continue
+
+                if "error" not in details:
+                    self._resolve(tx.tx_hash, details)
+                elif details["error"] != "Transaction not found.":
+                    self._finish(tx.tx_hash, False, details["error"])
+
+        now = time.monotonic()
+
+        with self._lock:
+            expired = [tx.tx_hash for tx in self._pending.values() if now >= tx.deadline]
+
+        for tx_hash in expired:
+            self._finish(tx_hash, False, "Timeout reached")
+
+    def _check_blocks(self, lamden) -> bool:
+        """ Resolve pending transactions that are part of new blocks.
+        Return FALSE if blocks couldn't be retrieved """
+
+        try:
+            latest = int(lamden.get_latest_block_number())
+        except Exception as e:
+            logging.warning(f"Can't get latest block number: {e}")
+            return False
+
+        contract_state.advance(latest)
+
+        if self._last_block is None or latest - self._last_block > 10:
+            # Start following blocks. Older transactions will be looked up by hash
+            self._last_block = latest - 1
+
+        for number in range(self._last_block + 1, latest + 1):
+            try:
+                block = lamden.get_block_details(number)
+            except Exception as e:
+                logging.warning(f"Can't get block {number}: {e}")
+                return False
+
+            for subblock in block.get("subblocks", list()):
+                for tx in subblock.get("transactions", list()):
+                    if tx.get("hash") in self._pending:
+                        self._resolve(tx["hash"], tx)
+
+            self._last_block = number
+
+        return True
+
+    def _resolve(self, tx_hash: str, details: Dict):
+        """ Finish transaction based on its details """
+
+        if details.get("status") == 0:
+            self._finish(tx_hash, True, details)
+        else:
+            self._finish(tx_hash, False, details.get("result"))
+
+    def _finish(self, tx_hash: str, success: bool, result):
+        """ Set result of the given transaction and execute its callback """
+
+        with self._lock:
+            tx = self._pending.pop(tx_hash, None)
+
+        if not tx:
+            return
+
+        # Transaction might have changed contract state
+        contract_state.clear()
+
+        tx.future.set_result((success, result))
+
+        if tx.callback:
+            self._executor.submit(self._execute_callback, tx, success, result)
+
+    def _execute_callback(self, tx: PendingTx, success: bool, result):
+        """ Execute callback of given transaction and report errors """
+
+        try:
+            tx.callback(success, result)
+        except Exception as e:
+            logging.error(f"Callback for transaction {tx.tx_hash} failed: {repr(e)}")
+
+            if self.on_error:
+                try:
+                    self.on_error(tx.tx_hash, tx.callback, e)
+                except Exception as ex:
+                    logging.error(f"Can't report failed callback: {ex}")
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+_on_error = None
+
+
+def get_tracker() -> TxTracker:
+    """ Return the shared transaction tracker """
+
+    global _tracker
+
+    with _tracker_lock:
+        # Replace tracker if its thread ended unexpectedly
+        if _tracker is None or (_tracker.ident is not None and not _tracker.is_alive()):
+            from tgbf.lamden.connect import Connect
+            _tracker = TxTracker(Connect, on_error=_on_error)
+        return _tracker
+
+
+def set_error_handler(handler: Callable):
+    """ Set function that will be called with transaction hash, callback
+    and exception if a callback of the shared tracker raises an exception """
+
+    global _on_error
+
+    with _tracker_lock:
+        _on_error = handler
+
+        if _tracker is not None:
+            _tracker.on_error = handler
+
+
+def stop():
+    """ Stop the shared transaction tracker """
+
+    global _tracker
+
+    with _tracker_lock:
+        if _tracker is not None:
+            _tracker.stop()
+            _tracker = None
@@ -1,6 +1,5 @@
 import os
 import hashlib
-import sqlite3
 import logging
 import inspect
 import threading
@@ -8,14 +7,22 @@ from enum import Enum
 
 import tgbf.constants as c
 import tgbf.emoji as emo
+import tgbf.utils as utl
 
 from pathlib import Path
 from typing import List, Dict, Tuple, Callable
-from telegram import ChatAction, Chat, Update, Message, ParseMode
+from concurrent.futures import Future
+from telegram import Update, Message, ParseMode
 from telegram.utils.helpers import escape_markdown as esc_mk
 from telegram.ext import CallbackContext, Handler, CallbackQueryHandler, ConversationHandler
 from telegram.ext.jobqueue import Job
 from tgbf.config import ConfigManager
+from tgbf.breaker import CircuitOpenError
+from tgbf.singleflight import flights
+from tgbf.chataction import actions
+from tgbf.broadcast import Priority
+from tgbf.digest import ErrorDigest
+from tgbf.database import Database, open_database, read_migrations
 from tgbf.tgbot import TelegramBot
 from datetime import datetime, timedelta
 from tgbf.web import EndpointAction
@@ -54,11 +61,6 @@ class TGBFPlugin:
         # Access to Lamden bot wallet
         self._bot_wallet = self._bot.bot_wallet
 
-        # Create global db table for wallets
-        if not self.global_table_exists("wallets"):
-            sql = self.get_global_resource("create_wallets.sql")
-            self.execute_global_sql(sql)
-
     def __enter__(self):
         """ This method gets executed after __init__() but before
         load(). Make sure to return 'self' if you override it """
@@ -190,19 +192,30 @@ class TGBFPlugin:
         from the bot private key """
         return self._bot_wallet
 
-    def add_handler(self, handler: Handler, group: int = None):
+    def add_handler(self, handler: Handler, group: int = None, prefix: str = None):
         """ Will add bot handlers to this plugins list of handlers
-         and also add them to the bot dispatcher """
+         and also add them to the bot dispatcher.
+
+         CallbackQueryHandlers without group are added to the callback
+         router instead. They only get callback queries with data that
+         starts with 'prefix' (default is the plugin name) followed by
+         '|' or nothing else """
+
+        if not group and isinstance(handler, CallbackQueryHandler):
+            self.bot.callback_router.add(prefix if prefix else self.name, handler)
+            self.handlers.append(handler)
+
+            logging.info(f"Plugin '{self.name}': {type(handler).__name__} routed")
+            return
 
         if not group:
             """
-            Make sure that all CallbackQueryHandlers are in their own
-            group so that ALL CallbackQueryHandler callbacks get triggered.
-            But that means that we need to make sure that only the right
-            one gets executed! This is a workaround due to not knowing
-            how to call only the 'right' callback function.
+            Make sure that all ConversationHandlers are in their own
+            group so that ALL of them get triggered. But that means
+            that we need to make sure that only the right one gets
+            executed!
             """
-            if isinstance(handler, (CallbackQueryHandler, ConversationHandler)):
+            if isinstance(handler, ConversationHandler):
                 group = int(hashlib.md5(self.name.encode("utf-8")).hexdigest(), 16)
             else:
                 group = 0
@@ -330,6 +343,41 @@ class TGBFPlugin:
         db_path = os.path.join(os.getcwd(), c.DIR_DAT, c.FILE_DAT)
         return self._get_database_content(db_path, sql, *args)
 
+    def execute_global_sql_many(self, sql, rows):
+        """ Execute raw SQL statement on the global database once
+        for every list of arguments in 'rows'. All statements will
+        be executed in one transaction.
+
+        Following data will be returned
+        If error happens:
+        {"success": False, "data": <error>}
+
+        If successful:
+        {"success": True, "data": <number of changed rows>}
+
+        If database disabled:
+        {"success": False, "data": "Database disabled"} """
+
+        res = {"success": None, "data": None}
+
+        if not self.global_config.get("database", "use_db"):
+            res["data"] = "Database disabled"
+            res["success"] = False
+            return res
+
+        db_path = os.path.join(os.getcwd(), c.DIR_DAT, c.FILE_DAT)
+
+        try:
+            res["data"] = self._get_database(db_path).execute_many(sql, rows)
+            res["success"] = True
+        except Exception as e:
+            res["data"] = str(e)
+            res["success"] = False
+            logging.error(e)
+            self.notify(e)
+
+        return res
+
     def execute_sql(self, sql, *args, plugin="", db_name=""):
         """ Execute raw SQL statement on database for given
         plugin and return the result.
@@ -350,6 +398,42 @@ class TGBFPlugin:
         If database disabled:
         {"success": False, "data": "Database disabled"} """
 
+        db_path = self._get_db_path(plugin=plugin, db_name=db_name)
+        return self._get_database_content(db_path, sql, *args)
+
+    def execute_sql_deferred(self, sql, *args, plugin="", db_name=""):
+        """ Buffer raw SQL statement for database of given plugin.
+        Use this for high-frequency inserts that don't need to be
+        written immediately. Buffered statements will be written
+        in batches (in one transaction per database) by a background
+        thread. The order is only preserved for identical statements.
+
+        param: sql = the SQL query (without result)
+        param: *args = arguments for the SQL query
+        param: plugin = name of plugin that DB belongs too
+        param: db_name = name of DB in case it's not the
+        default (the name of the plugin) """
+
+        if not self.global_config.get("database", "use_db"):
+            return
+
+        db_path = self._get_db_path(plugin=plugin, db_name=db_name)
+        self.bot.write_buffer.add(self._get_database(db_path), sql, *args)
+
+    def flush_sql_deferred(self, plugin="", db_name=""):
+        """ Write all buffered SQL statements for database of given
+        plugin. Use this before reading data that might still be
+        in the buffer of 'execute_sql_deferred' """
+
+        if not self.global_config.get("database", "use_db"):
+            return
+
+        db_path = self._get_db_path(plugin=plugin, db_name=db_name)
+        self.bot.write_buffer.flush(self._get_database(db_path))
+
+    def _get_db_path(self, plugin="", db_name=""):
+        """ Return path to database file of given plugin """
+
         if db_name:
             if not db_name.lower().endswith(".db"):
                 db_name += ".db"
@@ -362,14 +446,16 @@ class TGBFPlugin:
         if plugin:
             plugin = plugin.lower()
             data_path = self.get_dat_path(plugin=plugin)
-            db_path = os.path.join(data_path, db_name)
+            return os.path.join(data_path, db_name)
         else:
-            db_path = os.path.join(self.get_dat_path(), db_name)
+            return os.path.join(self.get_dat_path(), db_name)
 
-        return self._get_database_content(db_path, sql, *args)
+    def _get_database(self, db_path) -> Database:
+        """ Return the connection pool for the given database file """
+        return open_database(db_path, self.global_config)
 
     def _get_database_content(self, db_path, sql, *args):
-        """ Open database connection and execute SQL statement """
+        """ Execute SQL statement on a pooled database connection """
 
         res = {"success": None, "data": None}
 
@@ -379,42 +465,119 @@ class TGBFPlugin:
             res["success"] = False
             return res
 
-        timeout = self.global_config.get("database", "timeout")
-        db_timeout = timeout if timeout else 5
-
         try:
-            # Create directory if it doesn't exist
-            directory = os.path.dirname(db_path)
-            os.makedirs(directory, exist_ok=True)
+            res["data"] = self._get_database(db_path).execute(sql, *args)
+            res["success"] = True
         except Exception as e:
             res["data"] = str(e)
             res["success"] = False
             logging.error(e)
             self.notify(e)
 
-        con = None
-        cur = None
+        return res
+
+    def migrate(self):
+        """ Apply all new migrations from the 'migrations' folder in
+        the resource directory of this plugin to the plugin database.
+        Migrations are SQL scripts named '<version>_<description>.sql'
+        and will be applied in order of their version number """
+
+        mig_path = os.path.join(self.get_res_path(), c.DIR_MIG)
+        self._migrate_database(self._get_db_path(), mig_path)
+
+    def _migrate_database(self, db_path, mig_path):
+        """ Apply migrations from given folder to given database """
+
+        if not self.global_config.get("database", "use_db"):
+            return
 
         try:
-            con = sqlite3.connect(db_path, timeout=db_timeout)
-            cur = con.cursor()
-            cur.execute(sql, args)
-            con.commit()
+            self._get_database(db_path).migrate(read_migrations(mig_path))
+        except Exception as e:
+            msg = f"Migration of '{db_path}' failed: {e}"
+            logging.error(msg)
+            self.notify(msg)
 
-            res["data"] = cur.fetchall()
-            res["success"] = True
+    def maintain(self):
+        """ Apply the retention policies from the plugin config and
+        optimize the plugin database. Will be executed periodically.
+
+        Retention policies are defined per table in the 'retention'
+        section of the plugin config. Following keys are recognized:
+
+        column: Column that defines the age of a row (required)
+        format: 'datetime' (default) or 'unix' (seconds since epoch)
+        max_age_days: Remove rows that are older than this
+        max_rows: Remove oldest rows if there are more rows than this
+        batch_size: Number of rows removed per transaction
+        rollup: Resource file with a SQL statement that aggregates rows
+        before they get removed (see 'Database.delete_before') """
+
+        if not self.global_config.get("database", "use_db"):
+            return
+
+        db_path = self._get_db_path()
+
+        if not Path(db_path).is_file():
+            return
+
+        db = self._get_database(db_path)
+
+        policies = self.config.get("retention")
+
+        if policies and isinstance(policies, dict):
+            for table, policy in policies.items():
+                try:
+                    deleted = self._apply_retention(db, table, policy)
+                    logging.info(f"Plugin '{self.name}': {deleted} rows removed from '{table}'")
+                except Exception as e:
+                    msg = f"Retention for table '{table}' of plugin '{self.name}' failed: {e}"
+                    logging.error(msg)
+                    self.notify(msg)
+
+        vacuum_pages = self.global_config.get("database", "vacuum_pages")
+        convert = self.global_config.get("database", "convert_auto_vacuum")
+
+        try:
+            db.optimize(
+                vacuum_pages=vacuum_pages if vacuum_pages is not None else 1000,
+                convert=bool(convert))
         except Exception as e:
-            res["data"] = str(e)
-            res["success"] = False
-            logging.error(e)
-            self.notify(e)
-        finally:
-            if cur:
-                cur.close()
-            if con:
-                con.close()
+            logging.error(f"Optimizing database of plugin '{self.name}' failed: {e}")
 
-            return res
+    def _apply_retention(self, db: Database, table, policy):
+        """ Remove rows from given table based on given retention policy """
+
+        column = policy["column"]
+        cutoffs = list()
+
+        if policy.get("max_age_days"):
+            oldest = datetime.utcnow() - timedelta(days=policy["max_age_days"])
+
+            if policy.get("format") == "unix":
+                cutoffs.append(utl.to_unix_time(oldest))
+            else:
+                cutoffs.append(oldest.strftime("%Y-%m-%d %H:%M:%S"))
+
+        if policy.get("max_rows"):
+            res = db.execute(
+                f"SELECT {column} FROM {table} ORDER BY {column} DESC LIMIT 1 OFFSET ?",
+                policy["max_rows"] - 1)
+
+            if res:
+                cutoffs.append(res[0][0])
+
+        if not cutoffs:
+            return 0
+
+        rollup = self.get_resource(policy["rollup"]) if policy.get("rollup") else None
+
+        return db.delete_before(
+            table,
+            column,
+            max(cutoffs),
+            batch_size=policy.get("batch_size", 1000),
+            rollup=rollup)
 
     def global_table_exists(self, table_name):
         """ Return TRUE if given table exists in global database, otherwise FALSE """
@@ -447,21 +610,14 @@ class TGBFPlugin:
         if not Path(db_path).is_file():
             return False
 
-        con = sqlite3.connect(db_path)
-        cur = con.cursor()
-        exists = False
-
         statement = self.get_global_resource("table_exists.sql")
 
         try:
-            if cur.execute(statement, [table_name]).fetchone():
-                exists = True
+            return bool(self._get_database(db_path).execute(statement, table_name))
         except Exception as e:
             logging.error(e)
             self.notify(e)
-
-        con.close()
-        return exists
+            return False
 
     def get_res_path(self, plugin=None):
         """ Return path of resource directory for this plugin """
@@ -501,7 +657,7 @@ class TGBFPlugin:
 
     def is_private(self, message: Message):
         """ Check if message was sent in a private chat or not """
-        return self.bot.updater.bot.get_chat(message.chat_id).type == Chat.PRIVATE
+        return self.bot.chats.is_private(message.chat_id, self.bot.updater.bot)
 
     def remove_msg(self, message: Message, after_secs, private=True, public=True):
         """ Remove a Telegram message after a given time """
@@ -522,34 +678,54 @@ class TGBFPlugin:
                 datetime.utcnow() + timedelta(seconds=after_secs),
                 context=f"{message.chat_id}_{message.message_id}")
 
-        if (self.is_private(message) and private) or (not self.is_private(message) and public):
+        is_private = self.is_private(message)
+
+        if (is_private and private) or (not is_private and public):
             remove()
 
+    def enqueue_message(self, chat_id, text, priority: Priority = Priority.NORMAL, **kwargs) -> Future:
+        """ Send a message through the shared broadcast queue that respects
+        the rate limits of Telegram. Return immediately with a future that
+        holds the sent message or the exception if it couldn't be sent.
+        Keyword arguments are passed on to 'send_message' """
+        return self.bot.broadcaster.send(chat_id, text, priority, **kwargs)
+
+    def single_flight(self, key, func: Callable, *args, **kwargs):
+        """ Execute function with given arguments. If a call with the same
+        key is already running (in any plugin), wait for it and return its
+        result instead. Use the 'single_flight' decorator from
+        'tgbf.singleflight' to coalesce all calls of a function """
+        return flights.do(key, func, *args, **kwargs)
+
     def notify(self, some_input, style: Notify = Notify.ERROR):
         """ All admins in global config will get a message with the given text.
-         Primarily used for exceptions but can be used with other inputs too. """
+         Primarily used for exceptions but can be used with other inputs too.
+         The same error will only be sent once, repeated errors are sent as
+         digest. Rejected requests to upstreams that are down will not be sent """
+
+        if isinstance(some_input, CircuitOpenError):
+            return repr(some_input)
+
+        error = some_input
 
         if isinstance(some_input, Exception):
             some_input = repr(some_input)
 
         if self.global_config.get("admin", "notify_on_error"):
-            for admin in self.global_config.get("admin", "ids"):
-                if style == Notify.INFO:
-                    emoji = f"{emo.INFO}"
-                elif style == Notify.WARNING:
-                    emoji = f"{emo.WARNING}"
-                elif style == Notify.ERROR:
-                    emoji = f"{emo.ALERT}"
-                else:
-                    emoji = f"{emo.ALERT}"
-
-                msg = f"{emoji} {some_input}"
+            if style == Notify.INFO:
+                emoji = f"{emo.INFO}"
+            elif style == Notify.WARNING:
+                emoji = f"{emo.WARNING}"
+            elif style == Notify.ERROR:
+                emoji = f"{emo.ALERT}"
+            else:
+                emoji = f"{emo.ALERT}"
 
-                try:
-                    self.bot.updater.bot.send_message(admin, msg)
-                except Exception as e:
-                    error = f"Not possible to notify admin id '{admin}'"
-                    logging.error(f"{error}: {e}")
+            # Sent in the background. Repeated errors will be sent as digest
+            self.bot.errors.report(
+                ErrorDigest.fingerprint(error, self.name),
+                f"[{self.name}] {some_input}"[:200],
+                f"{emoji} {some_input}")
         return some_input
 
     @classmethod
@@ -559,7 +735,7 @@ class TGBFPlugin:
         def _private(self, update: Update, context: CallbackContext, **kwargs):
             if self.config.get("private") == False:
                 return func(self, update, context, **kwargs)
-            if context.bot.get_chat(update.effective_chat.id).type == Chat.PRIVATE:
+            if self.bot.chats.is_private(update.effective_chat.id, context.bot):
                 return func(self, update, context, **kwargs)
 
             if update.message:
@@ -576,7 +752,7 @@ class TGBFPlugin:
         def _public(self, update: Update, context: CallbackContext, **kwargs):
             if self.config.get("public") == False:
                 return func(self, update, context, **kwargs)
-            if context.bot.get_chat(update.effective_chat.id).type != Chat.PRIVATE:
+            if not self.bot.chats.is_private(update.effective_chat.id, context.bot):
                 return func(self, update, context, **kwargs)
 
             if update.message:
@@ -637,20 +813,16 @@ class TGBFPlugin:
 
     @classmethod
     def send_typing(cls, func):
-        """ Decorator for sending typing notification in the Telegram chat """
+        """ Decorator for sending typing notification in the Telegram chat.
+        The notification is sent in the background and refreshed until the
+        method returns. Commands in the same chat share the notification """
         def _send_typing(self, update: Update, context: CallbackContext, **kwargs):
             # Make sure that edited messages will not trigger any functionality
             if update.edited_message:
                 return
 
-            try:
-                context.bot.send_chat_action(
-                    chat_id=update.effective_chat.id,
-                    action=ChatAction.TYPING)
-            except:
-                pass
-
-            return func(self, update, context, **kwargs)
+            with actions.typing(context.bot, update.effective_chat.id):
+                return func(self, update, context, **kwargs)
         return _send_typing
 
     @classmethod
@@ -708,23 +880,159 @@ class TGBFPlugin:
         """ Return address and privkey for given user_id.
         If no wallet exists then it will be created. """
 
-        # Check if user already has a wallet
-        sql = self.get_global_resource("select_wallet.sql")
-        res = self.execute_global_sql(sql, user_id)
+        # Check if wallet is cached
+        wallet = self.bot.wallet_cache.get(user_id)
+
+        if wallet:
+            return wallet
 
         # User already has a wallet
-        if res["data"]:
-            return Wallet(res["data"][0][2])
+        wallet = self._select_wallet(user_id)
+
+        if wallet:
+            return wallet
+
+        # Take pre-generated wallet from pool
+        wallet = self.bot.wallet_pool.claim(user_id)
+
+        if wallet:
+            self.bot.wallet_cache.set(user_id, wallet)
+            logging.info(f"Wallet assigned to {user_id}: {wallet.verifying_key}")
+            return wallet
+
+        # Claim also fails if the wallet was saved in the meantime
+        wallet = self._select_wallet(user_id)
+
+        if wallet:
+            return wallet
 
         # Create new wallet
         wallet = Wallet()
 
         # Save wallet to database
-        self.execute_global_sql(
+        res = self.execute_global_sql(
             self.get_global_resource("insert_wallet.sql"),
             user_id,
             wallet.verifying_key,
             wallet.signing_key)
 
+        if not res["success"]:
+            # Wallet might have been saved in the meantime
+            saved = self._select_wallet(user_id)
+
+            if saved:
+                return saved
+
+            raise Exception(f"Can't save wallet for {user_id}: {res['data']}")
+
+        self.bot.wallet_cache.set(user_id, wallet)
+
         logging.info(f"Wallet created for {user_id}: {wallet.verifying_key} / {wallet.signing_key}")
         return wallet
+
+    def _select_wallet(self, user_id: int) -> Wallet:
+        """ Return saved wallet of given user_id or None if there is none """
+
+        sql = self.get_global_resource("select_wallet.sql")
+        res = self.execute_global_sql(sql, user_id)
+
+        if not res["success"] or not res["data"]:
+            return None
+
+        wallet = Wallet(res["data"][0][2])
+        self.bot.wallet_cache.set(user_id, wallet)
+        return wallet
+
+    def get_wallets(self, user_ids: List[int]) -> Dict[int, Wallet]:
+        """ Return wallets for all given user_ids as a dictionary
+        with user_id as key. Existing wallets will be loaded with
+        one query and missing wallets will be created and saved
+        with one statement """
+
+        wallets = dict()
+        missing = list()
+
+        for user_id in dict.fromkeys(user_ids):
+            wallet = self.bot.wallet_cache.get(user_id)
+
+            if wallet:
+                wallets[user_id] = wallet
+            else:
+                missing.append(user_id)
+
+        if not missing:
+            return wallets
+
+        # Load existing wallets
+        for user_id, privkey in self._select_wallets(missing):
+            wallets[user_id] = Wallet(privkey)
+            self.bot.wallet_cache.set(user_id, wallets[user_id])
+
+        missing = [u for u in missing if u not in wallets]
+
+        # Take pre-generated wallets from pool
+        for user_id, wallet in self.bot.wallet_pool.claim_many(missing).items():
+            wallets[user_id] = wallet
+            self.bot.wallet_cache.set(user_id, wallet)
+            logging.info(f"Wallet assigned to {user_id}: {wallet.verifying_key}")
+
+        new_wallets = {u: Wallet() for u in missing if u not in wallets}
+
+        if not new_wallets:
+            return wallets
+
+        # Save new wallets to database
+        res = self.execute_global_sql_many(
+            self.get_global_resource("insert_wallets.sql"),
+            [[u, w.verifying_key, w.signing_key] for u, w in new_wallets.items()])
+
+        if not res["success"]:
+            # Some wallets might have been saved in the meantime
+            for user_id, privkey in self._select_wallets(list(new_wallets)):
+                wallets[user_id] = Wallet(privkey)
+                self.bot.wallet_cache.set(user_id, wallets[user_id])
+
+            unsaved = [u for u in new_wallets if u not in wallets]
+
+            if unsaved:
+                raise Exception(f"Can't save wallets for {unsaved}: {res['data']}")
+
+            return wallets
+
+        # Wallets created in the meantime weren't inserted. Load them instead
+        if res["data"] != len(new_wallets):
+            for user_id, privkey in self._select_wallets(list(new_wallets)):
+                new_wallets[user_id] = Wallet(privkey)
+
+        for user_id, wallet in new_wallets.items():
+            self.bot.wallet_cache.set(user_id, wallet)
+            logging.info(f"Wallet created for {user_id}: {wallet.verifying_key}")
+
+        wallets.update(new_wallets)
+        return wallets
+
+    def _select_wallets(self, user_ids: List[int]) -> List[Tuple[int, str]]:
+        """ Return list of user_id and privkey for given user_ids """
+
+        sql = self.get_global_resource("select_wallets.sql")
+        rows = list()
+
+        # Stay below the maximum number of SQL variables
+        for i in range(0, len(user_ids), 500):
+            chunk = user_ids[i:i + 500]
+            res = self.execute_global_sql(sql.replace("{{ids}}", ", ".join("?" * len(chunk))), *chunk)
+
+            if res["success"] and res["data"]:
+                rows.extend(res["data"])
+
+        return rows
+
+    def invalidate_wallet(self, user_id=None):
+        """ Remove wallet of given user_id from the wallet cache. If
+        no user_id is provided then the whole cache will be cleared.
+        Needs to be executed after wallets got changed in the DB """
+
+        if user_id is None:
+            self.bot.wallet_cache.clear()
+        else:
+            self.bot.wallet_cache.remove(user_id)
@@ -1,13 +1,14 @@
 import logging
 import tgbf.utils as utl
 import tgbf.emoji as emo
+import tgbf.coingecko as coingecko
 
 from typing import Union
 from telegram import Update, ParseMode, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CommandHandler, CallbackContext, CallbackQueryHandler
 from tgbf.lamden.rocketswap import Rocketswap
 from tgbf.lamden.connect import Connect
-from pycoingecko import CoinGeckoAPI
+from tgbf.lamden.prices import prices
 from tgbf.lamden.api import API
 from tgbf.plugin import TGBFPlugin
 
@@ -73,11 +74,7 @@ class Account(TGBFPlugin):
             )
 
     def get_amount_lhc(self):
-        lhc_price = Connect().get_contract_variable(
-            self.config.get("rocketswap_contract"),
-            "prices",
-            self.config.get("lhc_contract")
-        )
+        lhc_price = prices.get_price(self.config.get("lhc_contract"))
 
         lhc_price = lhc_price["value"] if "value" in lhc_price else 0
         lhc_price = float(str(lhc_price)) if lhc_price else float("0")
@@ -85,11 +82,7 @@ class Account(TGBFPlugin):
         return self.config.get("tau_amount") / lhc_price
 
     def get_tau_value(self, contract: str, amount: Union[int, float]):
-        price = Connect().get_contract_variable(
-            self.config.get("rocketswap_contract"),
-            "prices",
-            contract
-        )
+        price = prices.get_price(contract)
 
         price = price["value"] if "value" in price else 0
         price = float(str(price)) if price else float("0")
@@ -261,22 +254,19 @@ class Account(TGBFPlugin):
 
         # ---- TOKENS ----
 
-        lamden = Connect()
-
         try:
             balances = rs.balances(address)
 
+            # Get prices of all held tokens at once
+            held = [c for c, b in balances["balances"].items() if c != "currency" and b != 0]
+            token_prices = dict(zip(held, prices.get_prices(held)))
+
             for contract, balance in balances["balances"].items():
                 if contract == "currency":
                     token_tau[contract] = int(float(balance))
                 else:
                     if balance != 0:
-                        tau_price = lamden.get_contract_variable(
-                            self.config.get("rocketswap_contract"),
-                            "prices",
-                            contract
-                        )
-
+                        tau_price = token_prices[contract]
                         tau_price = tau_price["value"] if "value" in tau_price else 0
                         tau_price = float(str(tau_price)) if tau_price else float("0")
 
@@ -298,7 +288,7 @@ class Account(TGBFPlugin):
         except:
             pass
 
-        data = CoinGeckoAPI().get_coin_by_id(self.CGID)
+        data = coingecko.market.get_coin(self.CGID)
 
         usd = int(float(data["market_data"]["current_price"]["usd"]) * total_tau_value)
         eur = int(float(data["market_data"]["current_price"]["eur"]) * total_tau_value)
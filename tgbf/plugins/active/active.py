@@ -6,7 +6,6 @@ from tgbf.plugin import TGBFPlugin
 from telegram.ext import MessageHandler, Filters, CallbackContext
 
 
-# TODO: Periodically clean up DB
 class Active(TGBFPlugin):
 
     def load(self):
@@ -34,7 +33,7 @@ class Active(TGBFPlugin):
                 return
 
             sql = self.get_resource("insert_active.sql")
-            self.execute_sql(sql, c.id, u.id, "@" + u.username if u.username else u.first_name)
+            self.execute_sql_deferred(sql, c.id, u.id, "@" + u.username if u.username else u.first_name)
         except Exception as e:
             logging.error(f"ERROR: {e} - UPDATE: {update}")
             self.notify(e)
@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS idx_active_group_date ON active (group_id, date_time)
\ No newline at end of file
@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS idx_active_date ON active (date_time)
\ No newline at end of file
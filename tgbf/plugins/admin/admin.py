@@ -6,6 +6,7 @@ import tgbf.emoji as emo
 from telegram import ParseMode, Update
 from telegram.ext import CallbackContext, CommandHandler
 from tgbf.config import ConfigManager
+from tgbf.database import Database
 from tgbf.plugin import TGBFPlugin
 
 
@@ -42,6 +43,10 @@ class Admin(TGBFPlugin):
             sql = " ".join(context.args)
             res = self.execute_sql(sql, plugin=plugin, db_name=db)
 
+            # Wallets might have been changed
+            if not Database.is_read_only(sql):
+                self.invalidate_wallet()
+
             if res["success"]:
                 if res["data"]:
                     emoji = '\n'.join(str(s) for s in res["data"])
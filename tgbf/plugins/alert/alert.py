@@ -5,7 +5,9 @@ import tgbf.utils as utl
 from telegram import Update, ParseMode, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CommandHandler, CallbackContext, CallbackQueryHandler
 from tgbf.lamden.connect import Connect
+from tgbf.lamden.prices import prices
 from tgbf.plugin import TGBFPlugin
+from tgbf.broadcast import Priority
 
 
 class Alert(TGBFPlugin):
@@ -64,10 +66,7 @@ class Alert(TGBFPlugin):
                     check_msg = f"{emo.HOURGLASS} Calculating one-time payment..."
                     message = update.message.reply_text(check_msg)
 
-                    lhc_price = Connect().get_contract_variable(
-                        self.config.get("rocketswap_contract"),
-                        "prices",
-                        self.config.get("lhc_contract"))
+                    lhc_price = prices.get_price(self.config.get("lhc_contract"))
 
                     lhc_price = lhc_price["value"] if "value" in lhc_price else 0
                     lhc_price = float(str(lhc_price)) if lhc_price else float("0")
@@ -227,9 +226,9 @@ class Alert(TGBFPlugin):
 
                     if previous <= alert_price <= current:
                         self.execute_sql(self.get_resource("delete_alert.sql"), alert[3])
-                        context.bot.send_message(alert[2], f"{emo.GREEN} {alert[0]} crossed {alert[1]}")
+                        self.enqueue_message(alert[2], f"{emo.GREEN} {alert[0]} crossed {alert[1]}", Priority.HIGH)
                         continue
 
                     if previous >= alert_price >= current:
                         self.execute_sql(self.get_resource("delete_alert.sql"), alert[3])
-                        context.bot.send_message(alert[2], f"{emo.RED} {alert[0]} crossed {alert[1]}")
+                        self.enqueue_message(alert[2], f"{emo.RED} {alert[0]} crossed {alert[1]}", Priority.HIGH)
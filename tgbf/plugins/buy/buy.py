@@ -5,6 +5,7 @@ import tgbf.emoji as emo
 from telegram import Update, ParseMode
 from telegram.ext import CommandHandler, CallbackContext
 from tgbf.lamden.connect import Connect
+from tgbf.lamden.prices import prices
 from tgbf.plugin import TGBFPlugin
 
 
@@ -105,7 +106,12 @@ class Buy(TGBFPlugin):
             message.edit_text(f"{emo.ERROR} {e}")
             return
 
-        token_price = lamden.get_contract_variable("con_rocketswap_official_v1_1", "prices", token_contract)
+        token_price = prices.get_price(token_contract)
+
+        if "error" in token_price:
+            logging.error(f"Can't retrieve price for {token_contract}: {token_price['error']}")
+            message.edit_text(f"{emo.ERROR} {token_price['error']}")
+            return
 
         if not token_price["value"]:
             message.edit_text(f"{emo.ERROR} Token not yet listed on Rocketswap")
@@ -147,21 +153,22 @@ class Buy(TGBFPlugin):
         tx_hash = buy["hash"]
         logging.info(f"Buying {token} tx hash {tx_hash}")
 
-        # Wait for transaction to be completed
-        success, result = lamden.tx_succeeded(tx_hash)
+        def tx_done(success, result):
+            if not success:
+                logging.error(f"Transaction not successful: {result}")
+                msg = f"{emo.ERROR} Buying {token} not successful: {result}"
+                message.edit_text(msg)
+                return
 
-        if not success:
-            logging.error(f"Transaction not successful: {result}")
-            msg = f"{emo.ERROR} Buying {token} not successful: {result}"
-            message.edit_text(msg)
-            return
+            bought_amount = result["result"][result["result"].find("'") + 1:result["result"].rfind("'")]
 
-        bought_amount = result["result"][result["result"].find("'") + 1:result["result"].rfind("'")]
+            link = f'<a href="{lamden.explorer_url}/transactions/{tx_hash}">View Transaction on Explorer</a>'
 
-        link = f'<a href="{lamden.explorer_url}/transactions/{tx_hash}">View Transaction on Explorer</a>'
+            message.edit_text(
+                f"{emo.DONE} Received <code>{float(bought_amount):,.2f}</code> {token}\n{link}",
+                parse_mode=ParseMode.HTML,
+                disable_web_page_preview=True
+            )
 
-        message.edit_text(
-            f"{emo.DONE} Received <code>{float(bought_amount):,.2f}</code> {token}\n{link}",
-            parse_mode=ParseMode.HTML,
-            disable_web_page_preview=True
-        )
+        # Continue as soon as the transaction is confirmed
+        lamden.track_tx(tx_hash, tx_done)
@@ -8,6 +8,7 @@ import plotly.io as pio
 import plotly.graph_objs as go
 import tgbf.utils as utl
 import tgbf.emoji as emo
+import tgbf.coingecko as coingecko
 
 from PIL import Image
 from io import BytesIO
@@ -15,7 +16,6 @@ from os.path import join
 from pandas import DataFrame
 from telegram import ParseMode, Update
 from telegram.ext import CommandHandler, CallbackContext
-from pycoingecko import CoinGeckoAPI
 from tgbf.plugin import TGBFPlugin
 
 
@@ -82,8 +82,8 @@ class Chart(TGBFPlugin):
                     base = context.args[0].lower()
 
         try:
-            info = CoinGeckoAPI().get_coin_by_id(self.CGID)
-            market = CoinGeckoAPI().get_coin_market_chart_by_id(self.CGID, base, time)
+            info = coingecko.market.get_coin(self.CGID)
+            market = coingecko.market.get_market_chart(self.CGID, base, time)
         except Exception as e:
             try:
                 error = json.loads(str(e).replace("'", '"'))
@@ -111,34 +111,35 @@ class Collidertau(TGBFPlugin):
         # Get transaction hash
         tx_hash = collide["hash"]
 
-        # Wait for transaction to be completed
-        success, result = lamden.tx_succeeded(tx_hash)
+        def tx_done(success, result):
+            if not success:
+                logging.error(f"Collidertau transaction not successful: {result}")
+                message.edit_text(f"{emo.ERROR} {result}")
+                return
 
-        if not success:
-            logging.error(f"Collidertau transaction not successful: {result}")
-            message.edit_text(f"{emo.ERROR} {result}")
-            return
+            ex_link = f'<a href="{lamden.explorer_url}/transactions/{tx_hash}">View Transaction on Explorer</a>'
 
-        ex_link = f'<a href="{lamden.explorer_url}/transactions/{tx_hash}">View Transaction on Explorer</a>'
+            message.edit_text(f"{emo.STARS} Experiment complete!")
 
-        message.edit_text(f"{emo.STARS} Experiment complete!")
+            if result["result"].upper().startswith("'YOU WON"):
+                won_msg_list = result["result"].split(" ")
+                won_lhc_amount = int(float(won_msg_list[5]))
 
-        if result["result"].upper().startswith("'YOU WON"):
-            won_msg_list = result["result"].split(" ")
-            won_lhc_amount = int(float(won_msg_list[5]))
+                logging.info(f"User WON <code>{won_lhc_amount}</code> {self.TOKEN_SYMBOL}")
+                msg = f"YOU WON <code>{won_lhc_amount}</code> {self.TOKEN_SYMBOL} {emo.MONEY_FACE}"
 
-            logging.info(f"User WON <code>{won_lhc_amount}</code> {self.TOKEN_SYMBOL}")
-            msg = f"YOU WON <code>{won_lhc_amount}</code> {self.TOKEN_SYMBOL} {emo.MONEY_FACE}"
+                cl_path = os.path.join(self.get_res_path(), "discovery.png")
+            else:
+                logging.info(f"User LOST {amount} TAU")
+                msg = f"You lost <code>{amount}</code> TAU {emo.SAD} Try another experiment?"
 
-            cl_path = os.path.join(self.get_res_path(), "discovery.png")
-        else:
-            logging.info(f"User LOST {amount} TAU")
-            msg = f"You lost <code>{amount}</code> TAU {emo.SAD} Try another experiment?"
+                cl_path = os.path.join(self.get_res_path(), "failed.png")
 
-            cl_path = os.path.join(self.get_res_path(), "failed.png")
+            message.reply_photo(
+                photo=open(cl_path, "rb"),
+                caption=f"{msg}\n{ex_link}",
+                parse_mode=ParseMode.HTML
+            )
 
-        message.reply_photo(
-            photo=open(cl_path, "rb"),
-            caption=f"{msg}\n{ex_link}",
-            parse_mode=ParseMode.HTML
-        )
+        # Continue as soon as the transaction is confirmed
+        lamden.track_tx(tx_hash, tx_done)
@@ -6,6 +6,7 @@ import tgbf.utils as utl
 from telegram import Update, ParseMode, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CommandHandler, CallbackContext, CallbackQueryHandler
 from tgbf.lamden.connect import Connect
+from tgbf.lamden.prices import prices
 from tgbf.plugin import TGBFPlugin
 
 
@@ -33,19 +34,23 @@ class Cornticket(TGBFPlugin):
 
             lamden = Connect()
 
-            tau_balance = lamden.get_contract_variable(contract, "tau_balance")
+            tau_balance, corn_balance, user_list, max_entries = lamden.get_contract_variables_many([
+                (contract, "tau_balance"),
+                (contract, "corn_balance"),
+                (contract, "user_list"),
+                (contract, "max_entries")
+            ])
+
             tau_balance = tau_balance["value"] if "value" in tau_balance else 0
             tau_balance = float(str(tau_balance)) if tau_balance else float("0")
             tau_balance = f"{int(tau_balance):,}"
 
-            corn_balance = lamden.get_contract_variable(contract, "corn_balance")
             corn_balance = corn_balance["value"] if "value" in corn_balance else 0
             corn_balance = float(str(corn_balance)) if corn_balance else float("0")
             corn_balance = f"{int(corn_balance):,}"
 
-            user_count = len(lamden.get_contract_variable(contract, "user_list")["value"])
+            user_count = len(user_list["value"])
 
-            max_entries = lamden.get_contract_variable(contract, "max_entries")
             max_entries = max_entries["value"] if "value" in max_entries else 0
 
             update.message.reply_text(
@@ -98,84 +103,89 @@ class Cornticket(TGBFPlugin):
             # Get transaction hash
             tx_hash = ticket["hash"]
 
-            # Wait for transaction to be completed
-            success, result = lamden.tx_succeeded(tx_hash)
-
-            if not success:
-                logging.error(f"Goldticket (draw_winner) transaction not successful: {result}")
-                update.message.reply_text(f"{emo.ERROR} {result}")
-                return
-
-            winner_address = result["result"].replace("'", "")
-
-            last_won_tau = lamden.get_contract_variable(contract, "last_won_tau")
-            last_won_tau = last_won_tau["value"] if "value" in last_won_tau else 0
-            last_won_tau = float(str(last_won_tau)) if last_won_tau else float("0")
-            last_won_tau = f"{int(last_won_tau):,}"
-
-            last_won_corn = lamden.get_contract_variable(contract, "last_won_corn")
-            last_won_corn = last_won_corn["value"] if "value" in last_won_corn else 0
-            last_won_corn = float(str(last_won_corn)) if last_won_corn else float("0")
-            last_won_corn = f"{int(last_won_corn):,}"
-
-            last_reserve_corn = lamden.get_contract_variable(contract, "last_reserve_corn")
-            last_reserve_corn = last_reserve_corn["value"] if "value" in last_reserve_corn else 0
-            last_reserve_corn = float(str(last_reserve_corn)) if last_reserve_corn else float("0")
-            last_reserve_corn = f"{int(last_reserve_corn):,}"
-
-            total_won_tau = lamden.get_contract_variable(contract, "total_won_tau")
-            total_won_tau = total_won_tau["value"] if "value" in total_won_tau else 0
-            total_won_tau = float(str(total_won_tau)) if total_won_tau else float("0")
-            total_won_tau = f"{int(total_won_tau):,}"
-
-            total_won_corn = lamden.get_contract_variable(contract, "total_won_corn")
-            total_won_corn = total_won_corn["value"] if "value" in total_won_corn else 0
-            total_won_corn = float(str(total_won_corn)) if total_won_corn else float("0")
-            total_won_corn = f"{int(total_won_corn):,}"
-
-            total_dev_fund = lamden.get_contract_variable(contract, "dev_tau")
-            total_dev_fund = total_dev_fund["value"] if "value" in total_dev_fund else 0
-            total_dev_fund = float(str(total_dev_fund)) if total_dev_fund else float("0")
-            total_dev_fund = f"{int(total_dev_fund):,}"
-
-            sql = self.get_global_resource("select_user_id.sql")
-            res = self.execute_global_sql(sql, winner_address)
-
-            if res["data"]:
-                user = context.bot.get_chat(int(res["data"][0][0]))
-                if user:
-                    user = "@" + user.username if user.username else user.first_name
+            def tx_done(success, result):
+                if not success:
+                    logging.error(f"Goldticket (draw_winner) transaction not successful: {result}")
+                    update.message.reply_text(f"{emo.ERROR} {result}")
+                    return
+
+                winner_address = result["result"].replace("'", "")
+
+                (last_won_tau, last_won_corn, last_reserve_corn,
+                 total_won_tau, total_won_corn, total_dev_fund) = lamden.get_contract_variables_many([
+                    (contract, "last_won_tau"),
+                    (contract, "last_won_corn"),
+                    (contract, "last_reserve_corn"),
+                    (contract, "total_won_tau"),
+                    (contract, "total_won_corn"),
+                    (contract, "dev_tau")
+                ])
+
+                last_won_tau = last_won_tau["value"] if "value" in last_won_tau else 0
+                last_won_tau = float(str(last_won_tau)) if last_won_tau else float("0")
+                last_won_tau = f"{int(last_won_tau):,}"
+
+                last_won_corn = last_won_corn["value"] if "value" in last_won_corn else 0
+                last_won_corn = float(str(last_won_corn)) if last_won_corn else float("0")
+                last_won_corn = f"{int(last_won_corn):,}"
+
+                last_reserve_corn = last_reserve_corn["value"] if "value" in last_reserve_corn else 0
+                last_reserve_corn = float(str(last_reserve_corn)) if last_reserve_corn else float("0")
+                last_reserve_corn = f"{int(last_reserve_corn):,}"
+
+                total_won_tau = total_won_tau["value"] if "value" in total_won_tau else 0
+                total_won_tau = float(str(total_won_tau)) if total_won_tau else float("0")
+                total_won_tau = f"{int(total_won_tau):,}"
+
+                total_won_corn = total_won_corn["value"] if "value" in total_won_corn else 0
+                total_won_corn = float(str(total_won_corn)) if total_won_corn else float("0")
+                total_won_corn = f"{int(total_won_corn):,}"
+
+                total_dev_fund = total_dev_fund["value"] if "value" in total_dev_fund else 0
+                total_dev_fund = float(str(total_dev_fund)) if total_dev_fund else float("0")
+                total_dev_fund = f"{int(total_dev_fund):,}"
+
+                sql = self.get_global_resource("select_user_id.sql")
+                res = self.execute_global_sql(sql, winner_address)
+
+                if res["data"]:
+                    user = context.bot.get_chat(int(res["data"][0][0]))
+                    if user:
+                        user = "@" + user.username if user.username else user.first_name
+                    else:
+                        user = ""
                 else:
                     user = ""
-            else:
-                user = ""
-
-            first = winner_address[0:6]
-            last = winner_address[len(winner_address)-6:len(winner_address)]
-
-            tx_link = f'<a href="{lamden.explorer_url}/transactions/{tx_hash}">View Transaction on Explorer</a>'
-            ad_link = f'<a href="{lamden.explorer_url}/addresses/{winner_address}">{first}...{last}</a>'
-            br_link = f'<a href="https://www.tauhq.com/addresses/96dae3b6213fb80eac7c6f4fa0fd26f34022741c56773107b20199cb43f5ed62">ADDRESS</a>'
-            lp_link = f'<a href="https://rocketswap.exchange/#/pool-add/con_bitcorn">add your winnings to the LP</a>'
-
-            msg = f"WINNER\n" \
-                  f"{user}\n" \
-                  f"{ad_link}\n\n" \
-                  f"AMOUNT WON\n" \
-                  f"<code>TAU:  {last_won_tau}</code>\n" \
-                  f"<code>CORN: {last_won_corn}</code>\n\n" \
-                  f"AMOUNT SENT TO GOLD RESERVE ({br_link})\n" \
-                  f"<code>CORN: {last_reserve_corn}</code>\n\n" \
-                  f"TOTAL AMOUNT WON TO DATE\n" \
-                  f"<code>TAU:  {total_won_tau}</code>\n" \
-                  f"<code>CORN: {total_won_corn}</code>\n\n" \
-                  f"TOTAL DEV FUND AMOUNT\n" \
-                  f"<code>TAU:  {total_dev_fund}</code>\n\n" \
-                  f"{tx_link}\n\n" \
-                  f"Hey, why not {lp_link} to earn more CORN?"
-
-            winner_video_path = os.path.join(self.get_res_path(), "cornticket_winner.mp4")
-            update.message.reply_video(open(winner_video_path, "rb"), caption=msg, parse_mode=ParseMode.HTML)
+
+                first = winner_address[0:6]
+                last = winner_address[len(winner_address)-6:len(winner_address)]
+
+                tx_link = f'<a href="{lamden.explorer_url}/transactions/{tx_hash}">View Transaction on Explorer</a>'
+                ad_link = f'<a href="{lamden.explorer_url}/addresses/{winner_address}">{first}...{last}</a>'
+                br_link = f'<a href="https://www.tauhq.com/addresses/96dae3b6213fb80eac7c6f4fa0fd26f34022741c56773107b20199cb43f5ed62">ADDRESS</a>'
+                lp_link = f'<a href="https://rocketswap.exchange/#/pool-add/con_bitcorn">add your winnings to the LP</a>'
+
+                msg = f"WINNER\n" \
+                      f"{user}\n" \
+                      f"{ad_link}\n\n" \
+                      f"AMOUNT WON\n" \
+                      f"<code>TAU:  {last_won_tau}</code>\n" \
+                      f"<code>CORN: {last_won_corn}</code>\n\n" \
+                      f"AMOUNT SENT TO GOLD RESERVE ({br_link})\n" \
+                      f"<code>CORN: {last_reserve_corn}</code>\n\n" \
+                      f"TOTAL AMOUNT WON TO DATE\n" \
+                      f"<code>TAU:  {total_won_tau}</code>\n" \
+                      f"<code>CORN: {total_won_corn}</code>\n\n" \
+                      f"TOTAL DEV FUND AMOUNT\n" \
+                      f"<code>TAU:  {total_dev_fund}</code>\n\n" \
+                      f"{tx_link}\n\n" \
+                      f"Hey, why not {lp_link} to earn more CORN?"
+
+                winner_video_path = os.path.join(self.get_res_path(), "cornticket_winner.mp4")
+                update.message.reply_video(open(winner_video_path, "rb"), caption=msg, parse_mode=ParseMode.HTML)
+
+            # Continue as soon as the transaction is confirmed
+            lamden.track_tx(tx_hash, tx_done)
             return
 
         cal_msg = f"{emo.HOURGLASS} Calculating CORN amount..."
@@ -184,11 +194,7 @@ class Cornticket(TGBFPlugin):
 
         lamden = Connect()
 
-        corn_price = lamden.get_contract_variable(
-            "con_rocketswap_official_v1_1",
-            "prices",
-            self.TOKEN_CONTRACT
-        )
+        corn_price = prices.get_price(self.TOKEN_CONTRACT)
 
         corn_price = corn_price["value"] if "value" in corn_price else 0
         corn_price = float(str(corn_price)) if corn_price else float("0")
@@ -319,25 +325,31 @@ class Cornticket(TGBFPlugin):
             # Get transaction hash
             tx_hash = ticket["hash"]
 
-            # Wait for transaction to be completed
-            success, result = lamden.tx_succeeded(tx_hash)
+            def tx_done(success, result):
+                if not success:
+                    logging.error(f"Goldticket transaction not successful: {result}")
+                    message.edit_caption(f"{emo.ERROR} {result}")
+                    return
 
-            if not success:
-                logging.error(f"Goldticket transaction not successful: {result}")
-                message.edit_caption(f"{emo.ERROR} {result}")
-                return
+                ex_link = f'<a href="{lamden.explorer_url}/transactions/{tx_hash}">View Transaction on Explorer</a>'
 
-            ex_link = f'<a href="{lamden.explorer_url}/transactions/{tx_hash}">View Transaction on Explorer</a>'
+                user_list, max_entries = lamden.get_contract_variables_many([
+                    (contract, "user_list"),
+                    (contract, "max_entries")
+                ])
 
-            cur_users = len(lamden.get_contract_variable(contract, "user_list")["value"])
-            max_users = lamden.get_contract_variable(contract, "max_entries")["value"]
+                cur_users = len(user_list["value"])
+                max_users = max_entries["value"]
 
-            message.edit_caption(
-                f"Thanks for entering CORNTICKET. You are entry {cur_users}/{max_users}\n{ex_link}",
-                parse_mode=ParseMode.HTML)
+                message.edit_caption(
+                    f"Thanks for entering CORNTICKET. You are entry {cur_users}/{max_users}\n{ex_link}",
+                    parse_mode=ParseMode.HTML)
 
-            msg = f"{emo.TICKET} Ticket bought"
-            context.bot.answer_callback_query(update.callback_query.id, msg)
+                msg = f"{emo.TICKET} Ticket bought"
+                context.bot.answer_callback_query(update.callback_query.id, msg)
+
+            # Continue as soon as the transaction is confirmed
+            lamden.track_tx(tx_hash, tx_done)
 
     def get_buttons(self, user_id):
         menu = utl.build_menu([
@@ -3,9 +3,15 @@ import sys
 import psutil
 import logging
 import platform
+import tgbf.sessions as sessions
+import tgbf.coingecko as coingecko
 import tgbf.utils as utl
 
 from tgbf.plugin import TGBFPlugin
+from tgbf.lamden.health import monitor
+from tgbf.lamden.hedge import hedging
+from tgbf.lamden.state import contract_state
+from tgbf.singleflight import flights
 from telegram import Update
 from telegram.ext import CallbackContext, CommandHandler
 
@@ -27,10 +33,15 @@ class Debug(TGBFPlugin):
         vi = sys.version_info
         v = f"{vi.major}.{vi.minor}.{vi.micro}"
 
+        try:
+            ip = utl.get_external_ip()
+        except Exception as e:
+            ip = f"N/A ({e})"
+
         msg = f"PID: {os.getpid()}\n" \
               f"Python: {v}\n" \
               f"Open files: {len(open_files)}\n" \
-              f"IP: {utl.get_external_ip()}\n" \
+              f"IP: {ip}\n" \
               f"Network: {platform.node()}\n" \
               f"Machine: {platform.machine()}\n" \
               f"Processor: {platform.processor()}\n" \
@@ -50,6 +61,65 @@ class Debug(TGBFPlugin):
               f"Used RAM: {round(psutil.virtual_memory().used/1000000000, 2)} GB\n" \
               f"RAM Usage: {psutil.virtual_memory().percent}%"
 
+        for host, stats in sessions.get_stats().items():
+            msg += f"\n\nHTTP {host}\n" \
+                   f"Requests: {stats['requests']} ({stats['errors']} errors)\n" \
+                   f"Connections: {stats['active']} active, " \
+                   f"{stats['max_active']} max, {stats['pool_size']} pool\n" \
+                   f"Avg. Time: {stats['avg_time']:.3f} sec\n" \
+                   f"Circuit: {stats['circuit']['state']} ({stats['circuit']['rejected']} rejected)"
+
+            if stats["circuit"]["retry_in"] is not None:
+                msg += f"\nRetry In: {int(stats['circuit']['retry_in'])} sec - " \
+                       f"Last Error: {stats['circuit']['last_error']}"
+
+        for url, node in monitor.get_stats().items():
+            latency = f"{node['latency']:.3f} sec" if node["latency"] is not None else "N/A"
+            msg += f"\n\nMasternode {url}\n" \
+                   f"Healthy: {node['healthy']} - Latency: {latency}\n" \
+                   f"Error Rate: {node['error_rate']:.0%} ({node['errors']}/{node['requests']})"
+
+            if node["last_error"]:
+                msg += f"\nLast Error: {node['last_error']}"
+
+        hedge = hedging.get_stats()
+        if hedge["enabled"]:
+            msg += f"\n\nHedged Requests\n" \
+                   f"Hedged: {hedge['hedged']}/{hedge['requests']} ({hedge['hedge_rate']:.0%})\n" \
+                   f"Hedge Wins: {hedge['hedge_wins']} - Delay: {hedging.delay():.3f} sec"
+
+        cs = contract_state.get_stats()
+        if cs["enabled"]:
+            msg += f"\n\nContract State Cache\n" \
+                   f"Block: {cs['block']} - Entries: {cs['entries']}\n" \
+                   f"Hit Rate: {cs['hit_rate']:.0%} ({cs['hits']} hits, {cs['misses']} misses)"
+
+        ch = self.bot.chats.get_stats()
+        msg += f"\n\nChat Cache\n" \
+               f"Chats: {ch['chats']} - Hit Rate: {ch['hit_rate']:.0%} " \
+               f"({ch['hits']} hits, {ch['misses']} misses)"
+
+        bc = self.bot.broadcaster.get_stats()
+        msg += f"\n\nBroadcast Queue\n" \
+               f"Queued: {sum(bc['queued'].values())} - Sent: {bc['sent']} - Failed: {bc['failed']}\n" \
+               f"Retried: {bc['retried']} - Rate Limited: {bc['rate_limited']}"
+
+        er = self.bot.errors.get_stats()
+        msg += f"\n\nAdmin Errors\n" \
+               f"Reported: {er['reported']} - Sent: {er['sent']} - Distinct: {er['fingerprints']}"
+
+        sf = flights.get_stats()
+        msg += f"\n\nCoalesced Requests\n" \
+               f"Shared: {sf['shared']}/{sf['calls'] + sf['shared']} ({sf['share_rate']:.0%})"
+
+        cg = coingecko.market.get_stats()
+        msg += f"\n\nCoinGecko Cache\n" \
+               f"Hit Rate: {cg['hit_rate']:.0%} ({cg['hits']} hits, {cg['misses']} misses)\n" \
+               f"Stale: {cg['stale']} - Errors: {cg['errors']}"
+
+        for key, age in cg["entries"].items():
+            msg += f"\n{key}: " + (f"{int(age)} sec old" if age is not None else "empty")
+
         chat_info = update.effective_chat
 
         if self.is_private(update.message):
@@ -137,42 +137,43 @@ class Dice(TGBFPlugin):
         # Get transaction hash
         tx_hash = dice["hash"]
 
-        # Wait for transaction to be completed
-        success, result = lamden.tx_succeeded(tx_hash)
-
-        if not success:
-            logging.error(f"Transaction not successful: {result}")
-            msg = f"{bet_msg}\n{emo.ERROR} {esc_mk(result, version=2)}"
-            message.edit_text(msg, parse_mode=ParseMode.MARKDOWN_V2)
-            return
-
-        ex_url = f"{lamden.explorer_url}/transactions/{tx_hash}"
-        con_msg = f"{emo.DONE} [Contract executed]({ex_url})"
-
-        if int(result["result"]) == int(number):
-            amount_back = amount * 5
-            res_msg = f"YOU WON {amount_back} TAU!! {emo.MONEY_FACE}"
-
-            logging.info(f"User WON {amount_back} TAU")
-        else:
-            amount_back = 0
-            res_msg = f"You rolled a {result['result']} and lost {emo.SAD}"
-
-            logging.info(f"User LOST")
-
-        message.edit_text(
-            f"{bet_msg}\n{con_msg}\n\n{esc_mk(res_msg, version=2)}",
-            parse_mode=ParseMode.MARKDOWN_V2)
-
-        """
-        # Insert details into database
-        self.execute_sql(
-            self.get_resource("insert_bet.sql"),
-            usr_id,
-            amount,
-            number,
-            tx_hash,
-            result["result"],
-            amount_back,
-            "-")
-        """
\ No newline at end of file
+        def tx_done(success, result):
+            if not success:
+                logging.error(f"Transaction not successful: {result}")
+                msg = f"{bet_msg}\n{emo.ERROR} {esc_mk(result, version=2)}"
+                message.edit_text(msg, parse_mode=ParseMode.MARKDOWN_V2)
+                return
+
+            ex_url = f"{lamden.explorer_url}/transactions/{tx_hash}"
+            con_msg = f"{emo.DONE} [Contract executed]({ex_url})"
+
+            if int(result["result"]) == int(number):
+                amount_back = amount * 5
+                res_msg = f"YOU WON {amount_back} TAU!! {emo.MONEY_FACE}"
+
+                logging.info(f"User WON {amount_back} TAU")
+            else:
+                amount_back = 0
+                res_msg = f"You rolled a {result['result']} and lost {emo.SAD}"
+
+                logging.info(f"User LOST")
+
+            message.edit_text(
+                f"{bet_msg}\n{con_msg}\n\n{esc_mk(res_msg, version=2)}",
+                parse_mode=ParseMode.MARKDOWN_V2)
+
+            """
+            # Insert details into database
+            self.execute_sql(
+                self.get_resource("insert_bet.sql"),
+                usr_id,
+                amount,
+                number,
+                tx_hash,
+                result["result"],
+                amount_back,
+                "-")
+            """
+
+        # Continue as soon as the transaction is confirmed
+        lamden.track_tx(tx_hash, tx_done)
\ No newline at end of file
@@ -7,7 +7,9 @@ from telegram import Update, ParseMode, InlineKeyboardButton, InlineKeyboardMark
 from telegram.ext import CommandHandler, CallbackContext, CallbackQueryHandler
 from tgbf.lamden.rocketswap import Rocketswap
 from tgbf.lamden.connect import Connect
+from tgbf.lamden.prices import prices
 from tgbf.plugin import TGBFPlugin
+from tgbf.broadcast import Priority
 
 
 class Goldape(TGBFPlugin):
@@ -92,7 +94,7 @@ class Goldape(TGBFPlugin):
 
         rs = Rocketswap()
 
-        for market in rs.get_market_summaries_w_token():
+        for market in rs.get_market_summaries_w_token(force=True):
             if market["contract_name"] not in contract_list:
                 logging.info(f"New listing on Rocketswap found: {market}")
 
@@ -102,7 +104,7 @@ class Goldape(TGBFPlugin):
                 tkn_price = float(market['reserves'][0]) / float(market['reserves'][1])
 
                 try:
-                    self.bot.updater.bot.send_message(
+                    self.enqueue_message(
                         self.config.get("listing_chat_id"),
                         f"<b>NEW LISTING ON ROCKETSWAP</b>\n\n"
                         f"{market['token']['token_name']} ({market['token']['token_symbol']})\n\n"
@@ -114,7 +116,7 @@ class Goldape(TGBFPlugin):
                         f"Current Price:\n"
                         f"<code>{tkn_price:,.8f} TAU</code>",
                         parse_mode=ParseMode.HTML
-                    )
+                    ).add_done_callback(self.listing_notified)
 
                     self.execute_sql(self.get_resource("insert_listing.sql"), market["contract_name"])
                 except Exception as e:
@@ -200,21 +202,15 @@ class Goldape(TGBFPlugin):
 
             msg = f"{emo.STOP} <b>Remove user from APE</b>\n{name} {username}"
 
-            try:
-                # Notify Endogen
-                context.bot.send_message(134166731, msg, parse_mode=ParseMode.HTML)
-            except Exception as e:
-                msg = f"Could not notify Endogen about user leaving Ape: {e}"
-                logging.error(msg)
-                self.notify(msg)
+            # Notify Endogen
+            self.enqueue_message(
+                134166731, msg, Priority.LOW, parse_mode=ParseMode.HTML
+            ).add_done_callback(self.admin_notified("Endogen"))
 
-            try:
-                # Notify MLLR
-                context.bot.send_message(1674997512, msg, parse_mode=ParseMode.HTML)
-            except Exception as e:
-                msg = f"Could not notify MLLR about user leaving Ape: {e}"
-                logging.error(msg)
-                self.notify(msg)
+            # Notify MLLR
+            self.enqueue_message(
+                1674997512, msg, Priority.LOW, parse_mode=ParseMode.HTML
+            ).add_done_callback(self.admin_notified("MLLR"))
 
         # --- SUBSCRIBE ---
         elif action == "SUB":
@@ -280,21 +276,37 @@ class Goldape(TGBFPlugin):
 
             msg = f"{emo.DONE} <b>Add user to APE</b>\n{name} {username}"
 
-            try:
-                # Notify Endogen
-                context.bot.send_message(134166731, msg, parse_mode=ParseMode.HTML)
-            except Exception as e:
-                msg = f"Could not notify Endogen about user leaving Ape: {e}"
-                logging.error(msg)
-                self.notify(msg)
+            # Notify Endogen
+            self.enqueue_message(
+                134166731, msg, Priority.LOW, parse_mode=ParseMode.HTML
+            ).add_done_callback(self.admin_notified("Endogen"))
 
-            try:
-                # Notify MLLR
-                context.bot.send_message(1674997512, msg, parse_mode=ParseMode.HTML)
-            except Exception as e:
-                msg = f"Could not notify MLLR about user leaving Ape: {e}"
-                logging.error(msg)
-                self.notify(msg)
+            # Notify MLLR
+            self.enqueue_message(
+                1674997512, msg, Priority.LOW, parse_mode=ParseMode.HTML
+            ).add_done_callback(self.admin_notified("MLLR"))
+
+    def listing_notified(self, future):
+        """ Notify admins if the new listing couldn't be sent """
+
+        if future.cancelled():
+            return
+
+        if future.exception():
+            self.notify(f"Can't notify about new listing: {future.exception()}")
+
+    def admin_notified(self, name):
+        """ Return callback that notifies admins if 'name' couldn't be notified """
+
+        def _admin_notified(future):
+            if future.cancelled() or not future.exception():
+                return
+
+            msg = f"Could not notify {name} about user leaving Ape: {future.exception()}"
+            logging.error(msg)
+            self.notify(msg)
+
+        return _admin_notified
 
     def get_subscribe_button(self, user_id):
         menu = utl.build_menu([
@@ -311,11 +323,7 @@ class Goldape(TGBFPlugin):
     def get_amount_gold(self):
         lamden = Connect()
 
-        gold_price = lamden.get_contract_variable(
-            "con_rocketswap_official_v1_1",
-            "prices",
-            self.TOKEN_CONTRACT
-        )
+        gold_price = prices.get_price(self.TOKEN_CONTRACT)
 
         gold_price = gold_price["value"] if "value" in gold_price else 0
         gold_price = float(str(gold_price)) if gold_price else float("0")
@@ -102,7 +102,7 @@ class Goldchange(TGBFPlugin):
                                 pretty_perc = "+" + str(price_chg) + "%"
                             else:
                                 pretty_perc = str(price_chg) + "%"
-                            self.bot.updater.bot.send_message(
+                            self.enqueue_message(
                                 self.config.get("listing_chat_id"),
                                 f"<b>LARGE PRICE CHANGE ON ROCKETSWAP</b>\n"
                                 f"Based on average price of last {days_to_avg}d\n\n"
@@ -110,7 +110,7 @@ class Goldchange(TGBFPlugin):
                                 f"<code>Average Price: {float(avg_price):,.8f}</code>\n"
                                 f"<code>Current Price: {float(token_last_price):,.8f}</code>\n",
                                 parse_mode=ParseMode.HTML
-                            )
+                            ).add_done_callback(self.notified)
                             sql = self.get_resource("insert_list.sql")
                             self.execute_sql(
                                 sql,
@@ -188,3 +188,12 @@ class Goldchange(TGBFPlugin):
                         self.execute_sql(sql, token_working)
             # else:
             #     logging.info(token_working + " has no records. Skipping.")
+
+    def notified(self, future):
+        """ Notify admins if the price change couldn't be sent """
+
+        if future.cancelled():
+            return
+
+        if future.exception():
+            self.notify(f"Can't notify about new price change: {future.exception()}")
@@ -1,4 +1,3 @@
-import time
 import logging
 import tgbf.emoji as emo
 import tgbf.utils as utl
@@ -7,6 +6,7 @@ from threading import Thread
 from telegram import Update, ParseMode, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CommandHandler, CallbackContext, CallbackQueryHandler
 from tgbf.lamden.connect import Connect
+from tgbf.lamden.prices import prices
 from tgbf.plugin import TGBFPlugin
 from tgbf.lamden.rocketswap import Rocketswap
 
@@ -42,9 +42,7 @@ class Goldconvert(TGBFPlugin):
 
         threshold = self.config.get("tau_threshold")
 
-        lamden = Connect()
-
-        sell_list = list()
+        candidates = list()
         for contract, balance in balances["balances"].items():
             if contract in ("currency", "con_gold_contract"):
                 continue
@@ -52,44 +50,48 @@ class Goldconvert(TGBFPlugin):
             symbol = self.execute_sql(sql, contract, plugin="tokens")
 
             if symbol and symbol["data"]:
-                price = lamden.get_contract_variable(
-                    "con_rocketswap_official_v1_1",
-                    "prices",
-                    contract)
+                candidates.append((symbol["data"][0][0], contract, balance))
+            else:
+                logging.info(f"Unknown token with contract '{contract}'")
 
-                price = price["value"]
+        # Get prices and reserves of all tokens at once
+        keys = list()
+        for _, contract, _ in candidates:
+            keys.append(("prices", contract))
+            keys.append(("reserves", contract))
 
-                if not price:
-                    continue
+        values = prices.get_many(keys)
 
-                if isinstance(price, dict):
-                    if "__fixed__" in price:
-                        price = price["__fixed__"]
+        sell_list = list()
+        for i, (symbol, contract, balance) in enumerate(candidates):
+            price, liquidity = values[i * 2], values[i * 2 + 1]
 
-                tau_value = float(price) * float(balance)
+            price = price.get("value")
 
-                if not tau_value:
-                    continue
-                if tau_value < threshold:
-                    continue
-                if balance == 0:
-                    continue
+            if not price:
+                continue
 
-                liquidity = lamden.get_contract_variable(
-                    "con_rocketswap_official_v1_1",
-                    "reserves",
-                    contract)
+            if isinstance(price, dict):
+                if "__fixed__" in price:
+                    price = price["__fixed__"]
 
-                liquidity = liquidity["value"]
+            tau_value = float(price) * float(balance)
 
-                if not liquidity:
-                    continue
-                if liquidity[0] <= tau_value:
-                    continue
+            if not tau_value:
+                continue
+            if tau_value < threshold:
+                continue
+            if balance == 0:
+                continue
 
-                sell_list.append([symbol["data"][0][0], contract, balance, tau_value])
-            else:
-                logging.info(f"Unknown token with contract '{contract}'")
+            liquidity = liquidity.get("value")
+
+            if not liquidity:
+                continue
+            if liquidity[0] <= tau_value:
+                continue
+
+            sell_list.append([symbol, contract, balance, tau_value])
 
         # Sort sell-list
         sell_list.sort(key=lambda x: x[0])
@@ -141,13 +143,13 @@ class Goldconvert(TGBFPlugin):
         threads = [None] * len(sell_list)
         results = [None] * len(sell_list)
 
+        # Nonces are assigned locally so all sells can be in flight at once
         for i in range(len(sell_list)):
             threads[i] = Thread(target=self.sell_asset, args=(lamden, sell_list[i], results, i))
             threads[i].start()
-            threads[i].join()
 
-            # Make sure that transactions are processed in order
-            time.sleep(0.1)
+        for thread in threads:
+            thread.join()
 
         message.edit_text(f"{emo.HOURGLASS} Converting to GOLD...")
 
@@ -188,7 +190,17 @@ class Goldconvert(TGBFPlugin):
             message.edit_text(msg)
             return
 
-        gold_price = lamden.get_contract_variable("con_rocketswap_official_v1_1", "prices", self.GOLD_CONTRACT)
+        gold_price = prices.get_price(self.GOLD_CONTRACT)
+
+        if "error" in gold_price or not gold_price["value"]:
+            error = gold_price.get("error", "No price available")
+            logging.error(f"Can't retrieve GOLD price: {error}")
+            message.edit_text(
+                f"{emo.ERROR} Tokens were sold for {total_tau} TAU but "
+                f"GOLD couldn't be bought: {error}")
+            self.notify(f"Tokens of {usr_id} sold but no GOLD bought: {error}")
+            return
+
         gold_price = float(gold_price["value"])
 
         gold_amount_to_buy = total_tau / gold_price
@@ -228,17 +240,18 @@ class Goldconvert(TGBFPlugin):
         tx_hash = buy["hash"]
         logging.info(f"Buying gold tx hash {tx_hash}")
 
-        # Wait for transaction to be completed
-        success, result = lamden.tx_succeeded(tx_hash)
+        def tx_done(success, result):
+            if not success:
+                logging.error(f"Transaction not successful: {result}")
+                msg = f"{emo.ERROR} Buying GOLD not successful: {result}"
+                message.edit_text(msg)
+                return
 
-        if not success:
-            logging.error(f"Transaction not successful: {result}")
-            msg = f"{emo.ERROR} Buying GOLD not successful: {result}"
+            msg = f"{emo.DONE} Tokens converted to GOLD"
             message.edit_text(msg)
-            return
 
-        msg = f"{emo.DONE} Tokens converted to GOLD"
-        message.edit_text(msg)
+        # Continue as soon as the transaction is confirmed
+        lamden.track_tx(tx_hash, tx_done)
 
     def button_confirm(self, label: str):
         menu = utl.build_menu([InlineKeyboardButton(label, callback_data=self.name)])
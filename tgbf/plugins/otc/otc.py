@@ -1,7 +1,6 @@
 import decimal
 import json
 import logging
-import requests
 import tgbf.emoji as emo
 import tgbf.utils as utl
 
@@ -12,6 +11,7 @@ from telegram.ext import CommandHandler, CallbackContext, CallbackQueryHandler,
     MessageHandler, Filters
 from tgbf.lamden.connect import Connect
 from tgbf.plugin import TGBFPlugin
+from tgbf.sessions import get_session
 
 
 # TODO: Contract variables are retrieved manually. Switched to rocketswap.get_contract_variable()
@@ -98,7 +98,7 @@ class Otc(TGBFPlugin):
 
         try:
             url = f"{node_url}/contracts/{offer_token}/metadata"
-            with requests.get(url, params={"key": "token_symbol"}) as res:
+            with get_session(url).get(url, params={"key": "token_symbol"}) as res:
                 context.user_data["offer_token_symbol"] = res.json()["value"]
         except Exception as e:
             msg = f"{emo.ERROR} Can't retrieve token info. Enter contract name again"
@@ -133,7 +133,7 @@ class Otc(TGBFPlugin):
 
         try:
             url = f"{node_url}/contracts/{take_token}/metadata"
-            with requests.get(url, params={"key": "token_symbol"}) as res:
+            with get_session(url).get(url, params={"key": "token_symbol"}) as res:
                 context.user_data["take_token_symbol"] = res.json()["value"]
         except Exception as e:
             msg = f"{emo.ERROR} Can't retrieve token info. Enter contract name again"
@@ -183,7 +183,7 @@ class Otc(TGBFPlugin):
         url = f"{node_url}/contracts/{contract}/fee"
 
         try:
-            with requests.get(url) as res:
+            with get_session(url).get(url) as res:
                 if "error" in res.json():
                     msg = f"{emo.ERROR} Can't retrieve fee details: {res.json()['error']}"
                     update.message.reply_text(msg)
@@ -288,31 +288,30 @@ class Otc(TGBFPlugin):
         # Get transaction hash
         tx_hash = ret["hash"]
 
-        # Wait for transaction to be completed
-        success, result = lamden.tx_succeeded(tx_hash)
+        def tx_done(success, result):
+            if not success:
+                logging.error(f"Tx 'create_offer' on {contract} not successful: {result}")
 
-        if not success:
-            logging.error(f"Tx 'create_offer' on {contract} not successful: {result}")
+                message.delete()
+                update.message.reply_text(
+                    f"{emo.ERROR} {result}",
+                    parse_mode=ParseMode.HTML,
+                    reply_markup=ReplyKeyboardRemove())
+                return
+
+            offer_id = result["result"].replace("'", "")
+
+            trade_url = f"{lamden.explorer_url}/transactions/{tx_hash}"
+            trade_msg = f'{emo.DONE} <a href="{trade_url}">Offer submitted</a>'
 
             message.delete()
             update.message.reply_text(
-                f"{emo.ERROR} {result}",
+                f"{trade_msg}\n\n<code>{offer_id}</code>",
                 parse_mode=ParseMode.HTML,
                 reply_markup=ReplyKeyboardRemove())
 
-            return ConversationHandler.END
-
-        offer_id = result["result"].replace("'", "")
-
-        trade_url = f"{lamden.explorer_url}/transactions/{tx_hash}"
-        trade_msg = f'{emo.DONE} <a href="{trade_url}">Offer submitted</a>'
-
-        message.delete()
-        update.message.reply_text(
-            f"{trade_msg}\n\n<code>{offer_id}</code>",
-            parse_mode=ParseMode.HTML,
-            reply_markup=ReplyKeyboardRemove())
-
+        # Continue as soon as the transaction is confirmed
+        lamden.track_tx(tx_hash, tx_done)
         return ConversationHandler.END
 
     def cancel(self, update: Update, context: CallbackContext):
@@ -332,7 +331,7 @@ class Otc(TGBFPlugin):
         url = f"{lamden.node_url}/contracts/{contract}/data"
 
         try:
-            with requests.get(url, params={"key": otc_id}) as r:
+            with get_session(url).get(url, params={"key": otc_id}) as r:
                 res = r
         except Exception as e:
             logging.error(f"Error retrieving OTC {otc_id}: {e}")
@@ -376,7 +375,7 @@ class Otc(TGBFPlugin):
 
         try:
             url = f"{node_url}/contracts/{otc['take_token']}/metadata"
-            with requests.get(url, params={"key": "token_symbol"}) as r:
+            with get_session(url).get(url, params={"key": "token_symbol"}) as r:
                 res = r
             take_symbol = res.json()["value"]
         except Exception as e:
@@ -387,7 +386,7 @@ class Otc(TGBFPlugin):
 
         try:
             url = f"{node_url}/contracts/{otc['offer_token']}/metadata"
-            with requests.get(url, params={"key": "token_symbol"}) as r:
+            with get_session(url).get(url, params={"key": "token_symbol"}) as r:
                 res = r
             offer_symbol = res.json()["value"]
         except Exception as e:
@@ -499,25 +498,26 @@ class Otc(TGBFPlugin):
                 # Get transaction hash
                 tx_hash = ret["hash"]
 
-                # Wait for transaction to be completed
-                success, result = lamden.tx_succeeded(tx_hash)
+                def tx_done(success, result):
+                    if not success:
+                        logging.error(f"Tx 'cancel_offer' on {contract} not successful: {result}")
+                        message.edit_text(
+                            f"<code>{message.text}</code>\n\n{emo.ERROR} {result}",
+                            parse_mode=ParseMode.HTML)
+                        return
+
+                    trade_url = f"{lamden.explorer_url}/transactions/{tx_hash}"
+                    trade_msg = f'{emo.DONE} <a href="{trade_url}">Trade canceled</a>'
 
-                if not success:
-                    logging.error(f"Tx 'cancel_offer' on {contract} not successful: {result}")
                     message.edit_text(
-                        f"<code>{message.text}</code>\n\n{emo.ERROR} {result}",
+                        f"<code>{message.text}</code>\n\n{trade_msg}",
                         parse_mode=ParseMode.HTML)
-                    return
 
-                trade_url = f"{lamden.explorer_url}/transactions/{tx_hash}"
-                trade_msg = f'{emo.DONE} <a href="{trade_url}">Trade canceled</a>'
+                    msg = f"{emo.DONE} Trade canceled"
+                    context.bot.answer_callback_query(update.callback_query.id, msg)
 
-                message.edit_text(
-                    f"<code>{message.text}</code>\n\n{trade_msg}",
-                    parse_mode=ParseMode.HTML)
-
-                msg = f"{emo.DONE} Trade canceled"
-                context.bot.answer_callback_query(update.callback_query.id, msg)
+                # Continue as soon as the transaction is confirmed
+                lamden.track_tx(tx_hash, tx_done)
 
             # Offer needs to be executed
             else:
@@ -587,25 +587,26 @@ class Otc(TGBFPlugin):
                 # Get transaction hash
                 tx_hash = ret["hash"]
 
-                # Wait for transaction to be completed
-                success, result = lamden.tx_succeeded(tx_hash)
+                def tx_done(success, result):
+                    if not success:
+                        logging.error(f"Tx 'take_offer' on {contract} not successful: {result}")
+                        message.edit_text(
+                            f"<code>{message.text}</code>\n\n{emo.ERROR} {result}",
+                            parse_mode=ParseMode.HTML)
+                        return
+
+                    trade_url = f"{lamden.explorer_url}/transactions/{tx_hash}"
+                    trade_msg = f'{emo.DONE} <a href="{trade_url}">Trade executed</a>'
 
-                if not success:
-                    logging.error(f"Tx 'take_offer' on {contract} not successful: {result}")
                     message.edit_text(
-                        f"<code>{message.text}</code>\n\n{emo.ERROR} {result}",
+                        f"<code>{message.text}</code>\n\n{trade_msg}",
                         parse_mode=ParseMode.HTML)
-                    return
-
-                trade_url = f"{lamden.explorer_url}/transactions/{tx_hash}"
-                trade_msg = f'{emo.DONE} <a href="{trade_url}">Trade executed</a>'
 
-                message.edit_text(
-                    f"<code>{message.text}</code>\n\n{trade_msg}",
-                    parse_mode=ParseMode.HTML)
+                    msg = f"{emo.DONE} Trade executed"
+                    context.bot.answer_callback_query(update.callback_query.id, msg)
 
-                msg = f"{emo.DONE} Trade executed"
-                context.bot.answer_callback_query(update.callback_query.id, msg)
+                # Continue as soon as the transaction is confirmed
+                lamden.track_tx(tx_hash, tx_done)
 
     def button_callback(self, label: str):
         menu = utl.build_menu([InlineKeyboardButton(label, callback_data=self.name)])
@@ -1,9 +1,9 @@
 import tgbf.utils as utl
 import tgbf.emoji as emo
 import logging
+import tgbf.coingecko as coingecko
 
 from tgbf.plugin import TGBFPlugin
-from pycoingecko import CoinGeckoAPI
 from telegram import ParseMode, Update
 from telegram.ext import CommandHandler, CallbackContext
 
@@ -38,7 +38,7 @@ class Price(TGBFPlugin):
                 exchange = context.args[0].lower()
 
         try:
-            data = CoinGeckoAPI().get_coin_by_id(self.CGID)
+            data = coingecko.market.get_coin(self.CGID)
         except Exception as e:
             error = f"{emo.ERROR} Could not retrieve price"
             update.message.reply_text(error)
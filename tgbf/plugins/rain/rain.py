@@ -8,6 +8,7 @@ from telegram.ext import CommandHandler, CallbackContext
 from datetime import datetime, timedelta
 from tgbf.lamden.connect import Connect
 from tgbf.plugin import TGBFPlugin
+from tgbf.broadcast import Priority
 
 
 class Rain(TGBFPlugin):
@@ -95,6 +96,9 @@ class Rain(TGBFPlugin):
 
         chat_id = update.effective_chat.id
 
+        # Make sure that latest messages are saved
+        self.flush_sql_deferred(plugin="active")
+
         # Get all users that messaged until 'last_time'
         sql = self.get_resource("select_active.sql", plugin="active")
         res = self.execute_sql(sql, chat_id, last_time, plugin="active")
@@ -140,6 +144,9 @@ class Rain(TGBFPlugin):
         user_limit = self.config.get("user_limit")
         counter = 0
 
+        # Load or create all needed wallets at once
+        wallets = self.get_wallets([user[0] for user in user_data[:user_limit]])
+
         for user in user_data:
             counter += 1
 
@@ -150,7 +157,7 @@ class Rain(TGBFPlugin):
             to_user_id = user[0]
             to_username = user[1]
 
-            address = self.get_wallet(to_user_id).verifying_key
+            address = wallets[to_user_id].verifying_key
 
             # Add address to list of addresses to rain on
             addresses.append(address)
@@ -226,41 +233,50 @@ class Rain(TGBFPlugin):
         # Get transaction hash
         tx_hash = res["hash"]
 
-        success, result = lamden.tx_succeeded(tx_hash)
+        def notified(to_user_id):
+            def _notified(future):
+                try:
+                    future.result()
+                    logging.info(f"User {to_user_id} notified about rain of {amount_single} {token_name}")
+                except Exception as e:
+                    logging.info(f"User {to_user_id} could not be notified about rain: {e} - {update}")
+            return _notified
+
+        def tx_done(success, result):
+            if not success:
+                message.edit_text(f"{emo.ERROR} {result}")
+                logging.error(f"Transaction not successful: {result}")
+                return
 
-        if not success:
-            message.edit_text(f"{emo.ERROR} {result}")
-            logging.error(f"Transaction not successful: {result}")
-            return
+            url = lamden.explorer_url
+            link = f'<a href="{url}/transactions/{tx_hash}">View Transaction on Explorer</a>'
 
-        url = lamden.explorer_url
-        link = f'<a href="{url}/transactions/{tx_hash}">View Transaction on Explorer</a>'
+            message.edit_text(
+                f"{msg}\n\n{link}",
+                parse_mode=ParseMode.HTML,
+                disable_web_page_preview=True)
 
-        message.edit_text(
-            f"{msg}\n\n{link}",
-            parse_mode=ParseMode.HTML,
-            disable_web_page_preview=True)
+            for user in user_data:
+                to_user_id = user[0]
 
-        for user in user_data:
-            to_user_id = user[0]
+                """
+                # Insert details into database
+                self.execute_sql(
+                    self.get_resource("insert_rain.sql"), 
+                    from_user.id, 
+                    to_user_id, 
+                    amount_single, 
+                    tx_hash)
+                """
 
-            """
-            # Insert details into database
-            self.execute_sql(
-                self.get_resource("insert_rain.sql"), 
-                from_user.id, 
-                to_user_id, 
-                amount_single, 
-                tx_hash)
-            """
-
-            try:
                 # Notify user about tip
-                context.bot.send_message(
+                self.enqueue_message(
                     to_user_id,
                     f"You received <code>{amount_single}</code> {token_name} from {html.escape(from_username)}\n{link}",
+                    Priority.LOW,
                     parse_mode=ParseMode.HTML,
-                    disable_web_page_preview=True)
-                logging.info(f"User {to_user_id} notified about rain of {amount_single} {token_name}")
-            except Exception as e:
-                logging.info(f"User {to_user_id} could not be notified about rain: {e} - {update}")
+                    disable_web_page_preview=True
+                ).add_done_callback(notified(to_user_id))
+
+        # Continue as soon as the transaction is confirmed
+        lamden.track_tx(tx_hash, tx_done)
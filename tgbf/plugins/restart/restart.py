@@ -52,4 +52,5 @@ class Restart(TGBFPlugin):
         m_name = m_name[:m_name.index(".")]
 
         time.sleep(1)
+        self.bot.cleanup()
         os.execl(sys.executable, sys.executable, '-m', m_name, *sys.argv[1:])
@@ -1,14 +1,12 @@
 import tgbf.emoji as emo
-import requests
 import logging
+import tgbf.coingecko as coingecko
 
 from decimal import Decimal
 from tgbf.plugin import TGBFPlugin
-from pycoingecko import CoinGeckoAPI
 from telegram import ParseMode, Update
 from telegram.ext import CommandHandler, CallbackContext
-from tgbf.lamden.connect import Connect
-from contracting.db.encoder import decode
+from tgbf.lamden.prices import prices
 
 
 class Rsprice(TGBFPlugin):
@@ -35,8 +33,6 @@ class Rsprice(TGBFPlugin):
 
         token_symbol = context.args[0].upper()
 
-        lamden = Connect()
-
         sql = self.get_resource("select_contract.sql", plugin="tokens")
         res = self.execute_sql(sql, token_symbol, plugin="tokens")
 
@@ -47,25 +43,14 @@ class Rsprice(TGBFPlugin):
             update.message.reply_text(msg)
             return
 
-        url = self.config.get("price_url")
-        url = f"{lamden.node_url}{url}{contract}"  # TODO: Replace that with API().get_contract_variables()
-
-        try:
-            res = requests.get(url)
-        except Exception as e:
-            logging.error(f"{emo.ERROR} Can not retrieve price for {contract}: {e}")
-            update.message.reply_text(f"{emo.ERROR} {e}")
-            self.notify(e)
-            return
-
-        price = decode(res.text)
+        price = prices.get_price(contract)
 
         if "error" in price:
             msg = f"{emo.ERROR} {price['error']}"
             update.message.reply_text(msg)
             return
 
-        price = decode(res.text)["value"]
+        price = price["value"]
 
         if not price:
             msg = f"{emo.ERROR} Not available on Rocketswap"
@@ -83,14 +68,14 @@ class Rsprice(TGBFPlugin):
             parse_mode=ParseMode.MARKDOWN_V2)
 
         try:
-            data = CoinGeckoAPI().get_coin_by_id(self.CGID)
-            prices = data["market_data"]["current_price"]
+            data = coingecko.market.get_coin(self.CGID)
+            cur_prices = data["market_data"]["current_price"]
 
             value = str()
 
             for c in self.VS_CUR.split(","):
-                if c in prices:
-                    p = f'{(prices[c] * float(price)):.{self.DECIMALS}f}'
+                if c in cur_prices:
+                    p = f'{(cur_prices[c] * float(price)):.{self.DECIMALS}f}'
                     value += f"{c.upper()}: {p}\n"
 
             msg += f"`" \
@@ -5,6 +5,7 @@ import tgbf.emoji as emo
 from telegram import Update, ParseMode
 from telegram.ext import CommandHandler, CallbackContext
 from tgbf.lamden.connect import Connect
+from tgbf.lamden.prices import prices
 from tgbf.plugin import TGBFPlugin
 
 
@@ -101,7 +102,12 @@ class Sell(TGBFPlugin):
             message.edit_text(f"{emo.ERROR} {e}")
             return
 
-        token_price = lamden.get_contract_variable("con_rocketswap_official_v1_1", "prices", token_contract)
+        token_price = prices.get_price(token_contract)
+
+        if "error" in token_price:
+            logging.error(f"Can't retrieve price for {token_contract}: {token_price['error']}")
+            message.edit_text(f"{emo.ERROR} {token_price['error']}")
+            return
 
         if not token_price["value"]:
             message.edit_text(f"{emo.ERROR} Token not yet listed on Rocketswap")
@@ -142,21 +148,22 @@ class Sell(TGBFPlugin):
         tx_hash = sell["hash"]
         logging.info(f"Selling {token} tx hash {tx_hash}")
 
-        # Wait for transaction to be completed
-        success, result = lamden.tx_succeeded(tx_hash)
+        def tx_done(success, result):
+            if not success:
+                logging.error(f"Transaction not successful: {result}")
+                msg = f"{emo.ERROR} Selling {token} not successful: {result}"
+                message.edit_text(msg)
+                return
 
-        if not success:
-            logging.error(f"Transaction not successful: {result}")
-            msg = f"{emo.ERROR} Selling {token} not successful: {result}"
-            message.edit_text(msg)
-            return
+            tau_amount = result["result"][result["result"].find("'") + 1:result["result"].rfind("'")]
 
-        tau_amount = result["result"][result["result"].find("'") + 1:result["result"].rfind("'")]
+            link = f'<a href="{lamden.explorer_url}/transactions/{tx_hash}">View Transaction on Explorer</a>'
 
-        link = f'<a href="{lamden.explorer_url}/transactions/{tx_hash}">View Transaction on Explorer</a>'
+            message.edit_text(
+                f"{emo.DONE} Received <code>{float(tau_amount):,.2f}</code> TAU\n{link}",
+                parse_mode=ParseMode.HTML,
+                disable_web_page_preview=True
+            )
 
-        message.edit_text(
-            f"{emo.DONE} Received <code>{float(tau_amount):,.2f}</code> TAU\n{link}",
-            parse_mode=ParseMode.HTML,
-            disable_web_page_preview=True
-        )
+        # Continue as soon as the transaction is confirmed
+        lamden.track_tx(tx_hash, tx_done)
@@ -122,26 +122,27 @@ class Send(TGBFPlugin):
             parse_mode=ParseMode.HTML,
             disable_web_page_preview=True)
 
-        # Wait for transaction to be completed
-        success, result = lamden.tx_succeeded(tx_hash)
+        def tx_done(success, result):
+            if not success:
+                logging.error(f"Transaction not successful: {result}")
 
-        if not success:
-            logging.error(f"Transaction not successful: {result}")
+                link = f'<a href="{lamden.explorer_url}/transactions/{tx_hash}">TRANSACTION FAILED</a>'
 
-            link = f'<a href="{lamden.explorer_url}/transactions/{tx_hash}">TRANSACTION FAILED</a>'
-
-            message.edit_text(
-                f"{emo.STOP} <del>Sent</del> <code>{amount}</code> {token_name}\n{link}",
-                parse_mode=ParseMode.HTML,
-                disable_web_page_preview=True)
-            return
+                message.edit_text(
+                    f"{emo.STOP} <del>Sent</del> <code>{amount}</code> {token_name}\n{link}",
+                    parse_mode=ParseMode.HTML,
+                    disable_web_page_preview=True)
+                return
 
-        """
-        # Insert details into database
-        self.execute_sql(
-            self.get_resource("insert_send.sql"),
-            from_wallet.verifying_key,
-            to_address,
-            amount,
-            tx_hash)
-        """
+            """
+            # Insert details into database
+            self.execute_sql(
+                self.get_resource("insert_send.sql"),
+                from_wallet.verifying_key,
+                to_address,
+                amount,
+                tx_hash)
+            """
+
+        # Continue as soon as the transaction is confirmed
+        lamden.track_tx(tx_hash, tx_done)
@@ -1,9 +1,9 @@
 import tgbf.emoji as emo
 import tgbf.utils as utl
 import logging
+import tgbf.coingecko as coingecko
 
 from tgbf.plugin import TGBFPlugin
-from pycoingecko import CoinGeckoAPI
 from telegram import ParseMode, Update
 from telegram.ext import CommandHandler, CallbackContext
 
@@ -22,7 +22,7 @@ class Stats(TGBFPlugin):
     @TGBFPlugin.send_typing
     def stats_callback(self, update: Update, context: CallbackContext):
         try:
-            data = CoinGeckoAPI().get_coin_by_id(self.CGID)
+            data = coingecko.market.get_coin(self.CGID)
         except Exception as e:
             error = f"{emo.ERROR} Could not retrieve price"
             update.message.reply_text(error)
@@ -121,37 +121,38 @@ class Tip(TGBFPlugin):
             parse_mode=ParseMode.HTML,
             disable_web_page_preview=True)
 
-        # Wait for transaction to be completed
-        success, result = lamden.tx_succeeded(tx_hash)
+        def tx_done(success, result):
+            if not success:
+                logging.error(f"Transaction not successful: {result}")
 
-        if not success:
-            logging.error(f"Transaction not successful: {result}")
+                failed_link = f'<a href="{lamden.explorer_url}/transactions/{tx_hash}">TRANSACTION FAILED</a>'
 
-            link = f'<a href="{lamden.explorer_url}/transactions/{tx_hash}">TRANSACTION FAILED</a>'
-
-            message.edit_text(
-                f"{emo.STOP} {to_user} <del>received</del> <code>{amount}</code> {token_name}\n{link}",
-                parse_mode=ParseMode.HTML,
-                disable_web_page_preview=True)
-            return
-
-        """
-        # Insert details into database
-        self.execute_sql(
-            self.get_resource("insert_tip.sql"),
-            from_user_id,
-            to_user_id,
-            amount,
-            tx_hash)
-        """
+                message.edit_text(
+                    f"{emo.STOP} {to_user} <del>received</del> <code>{amount}</code> {token_name}\n{failed_link}",
+                    parse_mode=ParseMode.HTML,
+                    disable_web_page_preview=True)
+                return
 
-        try:
-            # Notify user about tip
-            context.bot.send_message(
+            """
+            # Insert details into database
+            self.execute_sql(
+                self.get_resource("insert_tip.sql"),
+                from_user_id,
                 to_user_id,
-                f"You received <code>{amount}</code> {token_name} from {from_user}\n{link}\n\n{usr_msg}",
-                parse_mode=ParseMode.HTML,
-                disable_web_page_preview=True)
-            logging.info(f"User {to_user_id} notified about tip of {amount} {token_name}")
-        except Exception as e:
-            logging.info(f"User {to_user_id} could not be notified about tip: {e} - {update}")
+                amount,
+                tx_hash)
+            """
+
+            try:
+                # Notify user about tip
+                context.bot.send_message(
+                    to_user_id,
+                    f"You received <code>{amount}</code> {token_name} from {from_user}\n{link}\n\n{usr_msg}",
+                    parse_mode=ParseMode.HTML,
+                    disable_web_page_preview=True)
+                logging.info(f"User {to_user_id} notified about tip of {amount} {token_name}")
+            except Exception as e:
+                logging.info(f"User {to_user_id} could not be notified about tip: {e} - {update}")
+
+        # Continue as soon as the transaction is confirmed
+        lamden.track_tx(tx_hash, tx_done)
@@ -28,7 +28,7 @@ class Tokens(TGBFPlugin):
     @TGBFPlugin.send_typing
     def token_callback(self, update: Update, context: CallbackContext):
         if len(context.args) == 1 and context.args[0].lower() == "refresh":
-            for token in Rocketswap().token_list():
+            for token in Rocketswap().token_list(force=True):
                 self.execute_sql(
                     self.get_resource("update_token.sql"),
                     token["token_name"],
@@ -49,7 +49,7 @@ class Tokens(TGBFPlugin):
         else:
             contracts = list()
 
-        for token in Rocketswap().token_list():
+        for token in Rocketswap().token_list(force=True):
             if token["contract_name"] not in contracts:
                 self.execute_sql(
                     self.get_resource("insert_token.sql"),
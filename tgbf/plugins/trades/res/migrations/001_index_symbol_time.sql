@@ -0,0 +1,8 @@
+-- Used by MAX(time) per token (goldchange)
+CREATE INDEX IF NOT EXISTS idx_trades_symbol_time ON trades (token_symbol, time);
+
+-- Used by case insensitive token lookups (rschart)
+CREATE INDEX IF NOT EXISTS idx_trades_symbol_nocase_time ON trades (token_symbol COLLATE NOCASE, time);
+
+-- Used by lookups of latest trades (trades, goldchange)
+CREATE INDEX IF NOT EXISTS idx_trades_time ON trades (time)
\ No newline at end of file
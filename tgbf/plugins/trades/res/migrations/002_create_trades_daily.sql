@@ -0,0 +1,10 @@
+CREATE TABLE IF NOT EXISTS trades_daily (
+    token_symbol TEXT NOT NULL,
+    day DATE NOT NULL,
+    low REAL NOT NULL,
+    high REAL NOT NULL,
+    volume REAL NOT NULL,
+    value REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (token_symbol, day)
+)
\ No newline at end of file
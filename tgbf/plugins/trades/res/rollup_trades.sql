@@ -0,0 +1,11 @@
+INSERT INTO trades_daily (token_symbol, day, low, high, volume, value, count)
+SELECT token_symbol, date(time, 'unixepoch'), MIN(price), MAX(price), SUM(amount), SUM(price * amount), COUNT(*)
+FROM trades
+WHERE time < ?
+GROUP BY token_symbol, date(time, 'unixepoch')
+ON CONFLICT (token_symbol, day) DO UPDATE SET
+    low = MIN(low, excluded.low),
+    high = MAX(high, excluded.high),
+    volume = volume + excluded.volume,
+    value = value + excluded.value,
+    count = count + excluded.count
\ No newline at end of file
@@ -3,6 +3,7 @@ import logging
 from telegram.ext import CallbackContext
 from tgbf.plugin import TGBFPlugin
 from tgbf.lamden.rocketswap import Rocketswap
+from tgbf.lamden.prices import prices
 
 
 class Trades(TGBFPlugin):
@@ -25,15 +26,22 @@ class Trades(TGBFPlugin):
         else:
             last_secs = 0
 
+        insert_sql = self.get_resource("insert_trade.sql")
+
+        rs = Rocketswap()
+
+        try:
+            self._fetch_trades(rs, last_secs, insert_sql)
+        finally:
+            # Write all new trades in one transaction
+            self.flush_sql_deferred()
+
+    def _fetch_trades(self, rs: Rocketswap, last_secs, insert_sql):
         trades = list()
 
         skip = 0
         take = 50
 
-        insert_sql = self.get_resource("insert_trade.sql")
-
-        rs = Rocketswap()
-
         while True:
             res = rs.trade_history(take=take, skip=skip)
 
@@ -49,9 +57,13 @@ class Trades(TGBFPlugin):
                             tx["type"]
                         ]
 
+                        # Price changed with the trade. Retrieve it again next time
+                        if self.config.get("feed_prices"):
+                            prices.invalidate(tx["contract_name"])
+
                         trades.append(tx)
                         self.set_snapshot(trade)
-                        self.execute_sql(insert_sql, *trade)
+                        self.execute_sql_deferred(insert_sql, *trade)
                         logging.info(f"NEW TRADE: {tx}")
                 else:
                     return
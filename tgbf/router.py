@@ -0,0 +1,78 @@
+import threading
+
+from typing import Dict, List, Optional, Tuple
+from telegram import Update
+from telegram.ext import Handler, CallbackContext, Dispatcher
+
+
+class CallbackRouter(Handler):
+
+    # Separates prefix from the rest of the callback data
+    SEPARATOR = "|"
+
+    def __init__(self):
+        """ Single handler for all callback queries. Plugins register their
+        CallbackQueryHandlers with the prefix of their callback data (usually
+        the plugin name). A callback query is passed on to the handlers of
+        its prefix only, so no other plugin sees it """
+
+        super().__init__(callback=None)
+
+        # Prefix -> handlers
+        self._routes: Dict[str, List[Handler]] = dict()
+        self._lock = threading.Lock()
+
+    def add(self, prefix: str, handler: Handler):
+        """ Route callback queries with given prefix to given handler """
+
+        with self._lock:
+            self._routes.setdefault(prefix, list()).append(handler)
+
+    def remove(self, handler: Handler) -> bool:
+        """ Stop routing callback queries to given handler.
+        Return TRUE if the handler was registered """
+
+        with self._lock:
+            for prefix, handlers in list(self._routes.items()):
+                if handler in handlers:
+                    handlers.remove(handler)
+
+                    if not handlers:
+                        del self._routes[prefix]
+                    return True
+
+        return False
+
+    def check_update(self, update: object) -> Optional[Tuple[Handler, object]]:
+        """ Return handler for the prefix of the callback data
+        and the result of its own check or None if there is none """
+
+        if not isinstance(update, Update) or not update.callback_query:
+            return None
+
+        data = update.callback_query.data
+
+        if not data:
+            return None
+
+        with self._lock:
+            handlers = list(self._routes.get(data.split(self.SEPARATOR, 1)[0], list()))
+
+        for handler in handlers:
+            check = handler.check_update(update)
+
+            if check is not None and check is not False:
+                return handler, check
+
+        return None
+
+    def handle_update(
+            self,
+            update: Update,
+            dispatcher: Dispatcher,
+            check_result: Tuple[Handler, object],
+            context: CallbackContext = None):
+        """ Let the routed handler handle the callback query """
+
+        handler, check = check_result
+        return handler.handle_update(update, dispatcher, check, context)
@@ -0,0 +1,184 @@
+import time
+import logging
+import requests
+import threading
+
+from typing import Dict, List
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from tgbf.breaker import CircuitBreaker
+
+
+class PooledSession(requests.Session):
+
+    def __init__(self, host, pool_size=10, timeout=(5, 30), failure_threshold=5, reset_timeout=30):
+        """ HTTP session for a single upstream host. Connections are
+        kept alive and reused (up to 'pool_size' at the same time).
+        If a request doesn't provide a timeout, the default timeout
+        (connect timeout, read timeout) will be used.
+
+        Requests go through a circuit breaker. Connection errors,
+        timeouts and server errors (5xx) count as failures """
+
+        super().__init__()
+
+        self.host = host
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(urlsplit(host).netloc, failure_threshold, reset_timeout)
+
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.errors = 0
+        self.active = 0
+        self.max_active = 0
+        self.total_time = 0.0
+
+    def request(self, method, url, *args, **kwargs):
+        """ Execute request with default timeout and collect usage stats """
+
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+
+        self.breaker.allow()
+
+        with self._lock:
+            self.requests += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+        start = time.monotonic()
+
+        try:
+            res = super().request(method, url, *args, **kwargs)
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            self.breaker.failure(str(e))
+            raise
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.total_time += time.monotonic() - start
+
+        if res.status_code >= 500:
+            self.breaker.failure(f"Server error {res.status_code}")
+        else:
+            self.breaker.success()
+
+        return res
+
+    def get_stats(self) -> Dict:
+        """ Return usage stats of this session """
+
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "active": self.active,
+                "max_active": self.max_active,
+                "pool_size": self.pool_size,
+                "avg_time": self.total_time / self.requests if self.requests else 0,
+                "circuit": self.breaker.get_stats()
+            }
+
+
+# Default settings for new sessions
+_pool_size = 10
+_timeout = (5, 30)
+_failure_threshold = 5
+_reset_timeout = 30
+
+# Host (without scheme) -> settings that differ from the defaults
+_upstreams: Dict[str, Dict] = dict()
+
+# Host -> PooledSession
+_sessions: Dict[str, PooledSession] = dict()
+_sessions_lock = threading.Lock()
+
+
+def configure(
+        pool_size=None,
+        connect_timeout=None,
+        read_timeout=None,
+        failure_threshold=None,
+        reset_timeout=None,
+        upstreams: Dict[str, Dict] = None):
+    """ Change default settings for sessions that will be created.
+    'upstreams' can override 'connect_timeout', 'read_timeout',
+    'failure_threshold' and 'reset_timeout' for single hosts """
+
+    global _pool_size, _timeout, _failure_threshold, _reset_timeout, _upstreams
+
+    if pool_size:
+        _pool_size = pool_size
+    if connect_timeout or read_timeout:
+        _timeout = (connect_timeout or _timeout[0], read_timeout or _timeout[1])
+    if failure_threshold:
+        _failure_threshold = failure_threshold
+    if reset_timeout:
+        _reset_timeout = reset_timeout
+    if upstreams is not None:
+        _upstreams = upstreams
+
+
+def get_host(url) -> str:
+    """ Return scheme and host (with port) of given URL """
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def get_session(url) -> PooledSession:
+    """ Return the shared session for the host of the given URL """
+
+    host = get_host(url)
+
+    with _sessions_lock:
+        if host not in _sessions:
+            cfg = _upstreams.get(urlsplit(host).netloc, dict())
+
+            _sessions[host] = PooledSession(
+                host,
+                pool_size=_pool_size,
+                timeout=(cfg.get("connect_timeout", _timeout[0]), cfg.get("read_timeout", _timeout[1])),
+                failure_threshold=cfg.get("failure_threshold", _failure_threshold),
+                reset_timeout=cfg.get("reset_timeout", _reset_timeout))
+
+        return _sessions[host]
+
+
+def get_stats() -> Dict[str, Dict]:
+    """ Return usage stats for all sessions with host as key """
+
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+
+    return {session.host: session.get_stats() for session in sessions}
+
+
+def warm(urls: List[str]):
+    """ Open a connection to every given URL in the background so
+    that the first real request doesn't need to connect first """
+
+    def _warm():
+        for url in urls:
+            try:
+                get_session(url).head(url)
+            except Exception as e:
+                logging.warning(f"Can't open connection to '{url}': {e}")
+
+    threading.Thread(target=_warm, name="SessionWarmup", daemon=True).start()
+
+
+def close_all():
+    """ Close all sessions and their connections """
+
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
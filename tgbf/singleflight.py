@@ -0,0 +1,86 @@
+import functools
+import threading
+
+from typing import Callable, Dict, Hashable
+from concurrent.futures import Future
+
+
+class SingleFlight:
+
+    def __init__(self):
+        """ Coalesces identical calls. If a call with the same key is
+        already running, the function will not be executed again and
+        the caller gets the result (or exception) of the running call """
+
+        # Key -> Future of running call
+        self._calls: Dict[Hashable, Future] = dict()
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, func: Callable, *args, **kwargs):
+        """ Execute function with given arguments unless a
+        call with the same key is running and return its result """
+
+        with self._lock:
+            future = self._calls.get(key)
+            running = future is not None
+
+            if running:
+                self.shared += 1
+            else:
+                future = Future()
+                self._calls[key] = future
+                self.calls += 1
+
+        if running:
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def get_stats(self) -> Dict:
+        """ Return number of executed calls and calls that shared their result """
+
+        with self._lock:
+            requests = self.calls + self.shared
+
+            return {
+                "calls": self.calls,
+                "shared": self.shared,
+                "running": len(self._calls),
+                "share_rate": self.shared / requests if requests else 0
+            }
+
+
+# Shared by all upstream clients and plugins
+flights = SingleFlight()
+
+
+def single_flight(key: Callable = None):
+    """ Decorator that coalesces concurrent calls of the decorated function.
+    'key' gets the same arguments and returns the key of a call. By default
+    all arguments are used, so they need to be hashable """
+
+    def decorator(func):
+
+        @functools.wraps(func)
+        def _single_flight(*args, **kwargs):
+            if key:
+                call_key = key(*args, **kwargs)
+            else:
+                call_key = (func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())))
+
+            return flights.do(call_key, func, *args, **kwargs)
+        return _single_flight
+    return decorator
@@ -160,3 +160,6 @@ class TGBF:
 
         # Go in idle mode
         self.tgb.bot_idle()
+
+        # Bot stopped, release resources
+        self.tgb.cleanup()
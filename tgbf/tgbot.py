@@ -9,14 +9,31 @@ import traceback
 import tgbf.emoji as emo
 import tgbf.utils as utl
 import tgbf.constants as con
+import tgbf.sessions as sessions
+import tgbf.coingecko as coingecko
+import tgbf.database as database
+import tgbf.lamden.tracker as tracker
 
 from zipfile import ZipFile
 from importlib import reload
-from telegram import ParseMode, Chat, Update
-from telegram.ext import Updater, MessageHandler, Filters, CallbackContext
+from telegram import ParseMode, Update
+from telegram.ext import Updater, MessageHandler, TypeHandler, Filters, CallbackContext
 from telegram.error import InvalidToken, Unauthorized
+from tgbf.cache import LRUCache
+from tgbf.chats import ChatCache
+from tgbf.chataction import actions
+from tgbf.broadcast import Broadcaster
+from tgbf.digest import ErrorDigest
+from tgbf.router import CallbackRouter
+from tgbf.breaker import CircuitOpenError
 from tgbf.config import ConfigManager
 from tgbf.web import FlaskAppWrapper, EndpointAction
+from tgbf.wallets import WalletPool
+from tgbf.lamden.connect import Connect
+from tgbf.lamden.rocketswap import Rocketswap
+from tgbf.lamden.prices import prices
+from tgbf.lamden.health import monitor
+from tgbf.lamden.state import contract_state
 from lamden.crypto.wallet import Wallet
 
 
@@ -29,6 +46,50 @@ class TelegramBot:
 
         self.bot_wallet = Wallet(bot_pk)
 
+        # Cache for Lamden wallets of users
+        wallet_cache_size = self.config.get("wallets", "cache_size")
+        self.wallet_cache = LRUCache(wallet_cache_size if wallet_cache_size else 10000)
+
+        # Type, title and member count of chats
+        chats_ttl = self.config.get("chats", "ttl")
+        chats_size = self.config.get("chats", "cache_size")
+
+        self.chats = ChatCache(
+            ttl=chats_ttl if chats_ttl else 3600,
+            max_size=chats_size if chats_size else 10000)
+
+        # Pre-generated wallets for new users
+        pool_size = self.config.get("wallets", "pool_size")
+        pool_low_water = self.config.get("wallets", "pool_low_water")
+
+        self.wallet_pool = WalletPool(
+            self.config,
+            size=pool_size if pool_size is not None else 100,
+            low_water=pool_low_water if pool_low_water is not None else 20)
+
+        # Create global tables and apply new migrations
+        self._migrate_global()
+
+        # Shared HTTP sessions for upstream APIs
+        sessions.configure(
+            pool_size=self.config.get("http", "pool_size"),
+            connect_timeout=self.config.get("http", "connect_timeout"),
+            read_timeout=self.config.get("http", "read_timeout"),
+            failure_threshold=self.config.get("http", "failure_threshold"),
+            reset_timeout=self.config.get("http", "reset_timeout"),
+            upstreams=self.config.get("http", "upstreams"))
+
+        # Cache for Rocketswap prices and reserves
+        prices_ttl = self.config.get("prices", "ttl")
+        if prices_ttl is not None:
+            prices.ttl = prices_ttl
+
+        # Cache for CoinGecko market data
+        for key in ("coin_ttl", "chart_ttl", "idle_timeout"):
+            value = self.config.get("coingecko", key)
+            if value is not None:
+                setattr(coingecko.market, key, value)
+
         read_timeout = self.config.get("telegram", "read_timeout")
         connect_timeout = self.config.get("telegram", "connect_timeout")
         con_pool_size = self.config.get("telegram", "con_pool_size")
@@ -55,6 +116,38 @@ class TelegramBot:
         self.job_queue = self.updater.job_queue
         self.dispatcher = self.updater.dispatcher
 
+        # Passes every callback query only to the plugin it belongs to
+        self.callback_router = CallbackRouter()
+        self.dispatcher.add_handler(self.callback_router)
+
+        # Rate limited queue for outgoing notifications
+        self.broadcaster = Broadcaster(
+            self.updater.bot,
+            rate=self.config.get("broadcast", "rate") or 30,
+            chat_rate=self.config.get("broadcast", "chat_rate") or 1,
+            group_rate=self.config.get("broadcast", "group_rate") or 0.33,
+            workers=self.config.get("broadcast", "workers") or 4,
+            max_retries=self.config.get("broadcast", "max_retries") or 3)
+
+        # Errors for admins. Repeated errors are sent as digest
+        digest_interval = self.config.get("admin", "digest_interval")
+
+        self.errors = ErrorDigest(
+            self.broadcaster,
+            lambda: self.config.get("admin", "ids"),
+            interval=digest_interval if digest_interval else 300)
+
+        # Failed transaction callbacks (like payouts) go to the admins too
+        tracker.set_error_handler(self._report_tx_error)
+
+        # Buffer for deferred SQL statements
+        buffer_size = self.config.get("database", "buffer_size")
+        buffer_interval = self.config.get("database", "buffer_interval")
+
+        self.write_buffer = database.WriteBuffer(
+            max_rows=buffer_size if buffer_size else 500,
+            interval=buffer_interval if buffer_interval else 5)
+
         # TODO: Reload / restart flask at runtime
         #  https://gist.github.com/nguyenkims/ff0c0c52b6a15ddd16832c562f2cae1d
 
@@ -73,6 +166,51 @@ class TelegramBot:
         self.plugins = list()
         self._load_plugins()
 
+        # Periodically clean up and optimize databases
+        logging.info("Setting up database maintenance...")
+        maintenance_interval = self.config.get("database", "maintenance_interval")
+
+        self.job_queue.run_repeating(
+            self._maintain_databases,
+            maintenance_interval if maintenance_interval else 3600,
+            first=60,
+            name="maintenance")
+
+        # Keep pool of pre-generated wallets filled
+        logging.info("Setting up wallet pool...")
+        pool_interval = self.config.get("wallets", "pool_interval")
+
+        self.job_queue.run_repeating(
+            self._refill_wallet_pool,
+            pool_interval if pool_interval else 60,
+            first=10,
+            name="wallet_pool")
+
+        # Keep CoinGecko market data up to date
+        logging.info("Setting up market data refresh...")
+        refresh_interval = self.config.get("coingecko", "refresh_interval")
+
+        self.job_queue.run_repeating(
+            self._refresh_market_data,
+            refresh_interval if refresh_interval else 30,
+            first=5,
+            name="market_data")
+
+        logging.info("Setting up error digest...")
+        self.job_queue.run_repeating(
+            self._send_error_digest,
+            self.errors.interval,
+            first=self.errors.interval,
+            name="error_digest")
+
+        # Open connections to upstream APIs in the background
+        logging.info("Warming up HTTP connections...")
+        self._warm_sessions()
+
+        # Remember chats of all incoming updates before any other handler runs
+        logging.info("Setting up chat cache...")
+        self.dispatcher.add_handler(TypeHandler(Update, self._cache_chat), group=-1)
+
         # Handler for file downloads (plugin updates)
         logging.info("Setting up MessageHandler for plugin updates...")
         mh = MessageHandler(Filters.document, self._update_plugin)
@@ -116,6 +254,37 @@ class TelegramBot:
         """ Go in idle mode """
         self.updater.idle()
 
+    def cleanup(self):
+        """ Release all resources of the bot. Needs to be
+        executed before the bot shuts down or restarts """
+
+        logging.info("Stopping config file watcher...")
+        ConfigManager.stop_watching()
+
+        logging.info("Writing buffered SQL statements...")
+        self.write_buffer.stop()
+
+        logging.info("Closing database connections...")
+        database.close_all()
+
+        logging.info("Stopping transaction tracker...")
+        tracker.stop()
+
+        logging.info("Stopping masternode health checks...")
+        monitor.stop()
+
+        logging.info("Stopping contract state cache...")
+        contract_state.stop()
+
+        logging.info("Stopping broadcast queue...")
+        self.broadcaster.stop()
+
+        logging.info("Stopping chat actions...")
+        actions.stop()
+
+        logging.info("Closing HTTP connections...")
+        sessions.close_all()
+
     def enable_plugin(self, name):
         """ Load a single plugin """
 
@@ -129,12 +298,14 @@ class TelegramBot:
             with getattr(module, module_name.capitalize())(self) as plugin:
                 active = plugin.config.get("active")
                 if active is not None and active is False:
+                    plugin.config.remove_callback(plugin.callback_cfg_change)
                     msg = f"Plugin '{name}' not enabled"
                     logging.info(msg)
                     return False, msg
 
                 try:
                     plugin.load()
+                    plugin.migrate()
 
                     self.plugins.append(plugin)
                     msg = f"Plugin '{plugin.name}' enabled"
@@ -164,6 +335,9 @@ class TelegramBot:
 
                 # Remove bot handlers
                 for handler in plugin.handlers:
+                    if self.callback_router.remove(handler):
+                        continue
+
                     for group, handler_list in self.dispatcher.handlers.items():
                         if handler in handler_list:
                             self.dispatcher.remove_handler(handler, group)
@@ -172,6 +346,9 @@ class TelegramBot:
                 # Remove plugin from list of all plugins
                 self.plugins.remove(plugin)
 
+                # Stop reacting to config changes
+                plugin.config.remove_callback(plugin.callback_cfg_change)
+
                 try:
                     # Run plugins cleanup method
                     plugin.cleanup()
@@ -198,6 +375,93 @@ class TelegramBot:
         except Exception as e:
             logging.error(e)
 
+    def _maintain_databases(self, context: CallbackContext):
+        """ Apply retention policies and optimize the databases of all plugins """
+
+        for plugin in list(self.plugins):
+            try:
+                plugin.maintain()
+            except Exception as e:
+                logging.error(f"Maintenance of plugin '{plugin.name}' failed: {e}")
+
+    def _migrate_global(self):
+        """ Create table for wallets if it doesn't exist and apply all new
+        migrations from the global resource directory to the global database """
+
+        if not self.config.get("database", "use_db"):
+            return
+
+        db_path = os.path.join(os.getcwd(), con.DIR_DAT, con.FILE_DAT)
+        res_path = os.path.join(os.getcwd(), con.DIR_RES)
+
+        try:
+            db = database.open_database(db_path, self.config)
+
+            with open(os.path.join(res_path, "table_exists.sql"), "r", encoding="utf8") as f:
+                wallets_exist = db.execute(f.read(), "wallets")
+
+            if not wallets_exist:
+                with open(os.path.join(res_path, "create_wallets.sql"), "r", encoding="utf8") as f:
+                    db.execute(f.read())
+
+            db.migrate(database.read_migrations(os.path.join(res_path, con.DIR_MIG)))
+        except Exception as e:
+            logging.error(f"Migration of '{db_path}' failed: {e}")
+
+    def _refill_wallet_pool(self, context: CallbackContext):
+        """ Generate new wallets if the wallet pool is running low """
+
+        try:
+            self.wallet_pool.refill()
+        except Exception as e:
+            logging.error(f"Refilling wallet pool failed: {e}")
+
+    def _refresh_market_data(self, context: CallbackContext):
+        """ Renew expired CoinGecko market data """
+
+        try:
+            coingecko.market.refresh()
+        except Exception as e:
+            logging.error(f"Refreshing market data failed: {e}")
+
+    def _send_error_digest(self, context: CallbackContext):
+        """ Send repeated errors to admins """
+
+        try:
+            self.errors.flush()
+        except Exception as e:
+            logging.error(f"Sending error digest failed: {e}")
+
+    def _report_tx_error(self, tx_hash: str, callback, error: Exception):
+        """ Send exception of a transaction callback to admins """
+
+        if not self.config.get("admin", "notify_on_error"):
+            return
+
+        origin = getattr(callback, "__module__", None)
+        name = getattr(callback, "__qualname__", repr(callback))
+
+        self.errors.report(
+            ErrorDigest.fingerprint(error, origin),
+            f"[{name}] {repr(error)}"[:200],
+            f"{emo.ALERT} Callback for transaction {tx_hash} failed in {name}: {repr(error)}")
+
+    def _warm_sessions(self):
+        """ Open connections to Lamden node, block explorer,
+        Rocketswap and CoinGecko so that the first requests
+        of users don't have to wait for the TLS handshake """
+
+        urls = [Rocketswap.base_url, coingecko.get_api().api_base_url]
+
+        try:
+            node_host, node_port, explorer_host, explorer_port = Connect.get_endpoints()
+            urls.append(f"{node_host}:{node_port}" if node_port else node_host)
+            urls.append(f"{explorer_host}:{explorer_port}" if explorer_port else explorer_host)
+        except Exception as e:
+            logging.warning(f"Can't resolve Lamden endpoints: {e}")
+
+        sessions.warm(urls)
+
     def _update_plugin(self, update: Update, context: CallbackContext):
         """
         Update a plugin by uploading a file to the bot.
@@ -217,7 +481,7 @@ class TelegramBot:
             return
 
         # Check if in a private chat
-        if context.bot.get_chat(update.message.chat_id).type != Chat.PRIVATE:
+        if not self.chats.is_private(update.message.chat_id, context.bot):
             return
 
         # Check if user that triggered the command is allowed to execute it
@@ -269,10 +533,29 @@ class TelegramBot:
             msg = f"{emo.ERROR} {e}"
             update.message.reply_text(msg)
 
+    def _cache_chat(self, update: Update, context: CallbackContext):
+        """ Add or refresh chat of the given update in the chat cache """
+
+        message = update.effective_message
+
+        # Group was upgraded to a supergroup with a new ID
+        if message and message.migrate_to_chat_id:
+            self.chats.remove(message.chat_id)
+
+        self.chats.update(update.effective_chat)
+
     def _handle_tg_errors(self, update: Update, context: CallbackContext):
         """ Handle errors for modules 'telegram' and 'telegram.ext'.
         Log the error and send a telegram message to notify the developer. """
 
+        # Upstream is down. Admins can see the state of all circuits with /debug
+        if isinstance(context.error, CircuitOpenError):
+            logging.warning(f"Request rejected: {context.error}")
+
+            if update and update.effective_message:
+                update.effective_message.reply_text(f"{emo.ERROR} {context.error}")
+            return
+
         # Log the error before we do anything else, so we can see it even if something breaks.
         logging.error(msg="Exception while handling an update:", exc_info=context.error)
 
@@ -286,19 +569,24 @@ class TelegramBot:
             return
 
         # Build the message with some markup and additional information about what happened.
-        # You might need to add some logic to deal with messages longer than the 4096 character limit.
-        message = (
-            f'An exception was raised while handling an update\n'
-            f'<pre>update = {html.escape(json.dumps(update.to_dict(), indent=2, ensure_ascii=False))}'
-            '</pre>\n\n'
-            f'<pre>context.chat_data = {html.escape(str(context.chat_data))}</pre>\n\n'
-            f'<pre>context.user_data = {html.escape(str(context.user_data))}</pre>\n\n'
-            f'<pre>{html.escape(tb_string)}</pre>'
-        )
-
-        for admin in self.config.get("admin", "ids"):
-            # Finally, send the message
-            context.bot.send_message(chat_id=admin, text=message, parse_mode=ParseMode.HTML)
+        # Only needed for the first occurrence. Parts are shortened to stay below 4096 characters
+        def details():
+            update_str = json.dumps(update.to_dict(), indent=2, ensure_ascii=False)
+
+            return (
+                f'An exception was raised while handling an update\n'
+                f'<pre>update = {html.escape(update_str[:1500])}</pre>\n\n'
+                f'<pre>context.chat_data = {html.escape(str(context.chat_data)[:300])}</pre>\n\n'
+                f'<pre>context.user_data = {html.escape(str(context.user_data)[:300])}</pre>\n\n'
+                f'<pre>{html.escape(tb_string[-1500:])}</pre>'
+            )
+
+        # Repeated errors will be sent as digest
+        self.errors.report(
+            ErrorDigest.fingerprint(context.error, "telegram"),
+            f"{type(context.error).__name__}: {context.error}"[:200],
+            details,
+            parse_mode=ParseMode.HTML)
 
         error_msg = f"{emo.ERROR} *Telegram ERROR*: {context.error}"
 
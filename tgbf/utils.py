@@ -151,7 +151,10 @@ def from_unix_time(seconds, millis=False):
 
 
 def get_external_ip():
-    import urllib.request, re
-    site = urllib.request.urlopen("http://checkip.dyndns.org/").read()
-    grab = re.findall(r"[0-9]+(?:\.[0-9]+){3}", site.decode("utf-8"))
+    import re
+    from tgbf.sessions import get_session
+    url = "http://checkip.dyndns.org/"
+    with get_session(url).get(url) as res:
+        site = res.text
+    grab = re.findall(r"[0-9]+(?:\.[0-9]+){3}", site)
     return grab[0] if grab else None
@@ -0,0 +1,108 @@
+import os
+import logging
+import threading
+import tgbf.constants as c
+
+from typing import List, Dict
+from tgbf.config import ConfigManager
+from tgbf.database import Database, open_database
+from lamden.crypto.wallet import Wallet
+
+
+class WalletPool:
+
+    def __init__(self, config: ConfigManager, size=100, low_water=20):
+        """ Pool of pre-generated wallets that are saved in the global
+        database. New users get a wallet from the pool so that no
+        keypair needs to be generated while handling a command.
+
+        If less than 'low_water' wallets are available, refill() will
+        generate new ones until the pool holds 'size' wallets again """
+
+        self.config = config
+        self.size = size
+        self.low_water = low_water
+
+        self._refill_lock = threading.Lock()
+
+    @property
+    def database(self) -> Database:
+        """ Return connection pool for the global database """
+        db_path = os.path.join(os.getcwd(), c.DIR_DAT, c.FILE_DAT)
+        return open_database(db_path, self.config)
+
+    @property
+    def enabled(self) -> bool:
+        """ Return TRUE if the pool can be used """
+        return bool(self.size and self.config.get("database", "use_db"))
+
+    def refill(self):
+        """ Generate new wallets if the pool is running low """
+
+        if not self.enabled:
+            return
+
+        with self._refill_lock:
+            available = self.database.execute(self._get_sql("count_wallet_pool.sql"))[0][0]
+
+            if available >= self.low_water:
+                return
+
+            sql = self._get_sql("insert_wallet_pool.sql")
+
+            # Insert in small chunks to keep transactions short
+            for i in range(available, self.size, 50):
+                wallets = [Wallet() for _ in range(min(50, self.size - i))]
+                self.database.execute_many(sql, [[w.verifying_key, w.signing_key] for w in wallets])
+
+            logging.info(f"Wallet pool refilled with {self.size - available} wallets")
+
+    def claim(self, user_id) -> Wallet:
+        """ Assign a wallet from the pool to the given user. Return the
+        wallet or None if the pool is empty or the user already has a
+        wallet in the database """
+
+        wallets = self.claim_many([user_id])
+        return wallets.get(user_id)
+
+    def claim_many(self, user_ids: List[int]) -> Dict[int, Wallet]:
+        """ Assign wallets from the pool to the given users in one
+        transaction. Return dictionary with user_id as key and the
+        wallet as value for every user that got a wallet assigned """
+
+        if not self.enabled or not user_ids:
+            return dict()
+
+        claimed = dict()
+
+        try:
+            with self.database.transaction() as con:
+                rows = con.execute(self._get_sql("select_wallet_pool.sql"), (len(user_ids),)).fetchall()
+
+                if not rows:
+                    return claimed
+
+                insert_sql = self._get_sql("insert_wallets.sql")
+                used = list()
+
+                for user_id, (rowid, address, privkey) in zip(user_ids, rows):
+                    cur = con.execute(insert_sql, (user_id, address, privkey))
+
+                    # User already has a wallet
+                    if not cur.rowcount:
+                        continue
+
+                    used.append([rowid])
+                    claimed[user_id] = Wallet(privkey)
+
+                con.executemany(self._get_sql("delete_wallet_pool.sql"), used)
+        except Exception as e:
+            logging.error(f"Can't claim wallets from pool: {e}")
+            return dict()
+
+        return claimed
+
+    def _get_sql(self, filename):
+        """ Return content of given file from the global resource directory """
+        with open(os.path.join(os.getcwd(), c.DIR_RES, filename), "r", encoding="utf8") as f:
+            return f.read()